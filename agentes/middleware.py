@@ -1,8 +1,10 @@
 """
 Bloquea el uso de la API (excepto logout y cambio de contraseña) si el usuario
 debe cambiar la contraseña obligatoria tras activación de acceso.
+Funciona con WSGI y ASGI (en ASGI no obliga a pasar las vistas async a un hilo).
 """
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.http import JsonResponse
 
 
@@ -11,33 +13,52 @@ def _path_allowed(path: str) -> bool:
     return p.endswith("/api/auth/logout") or p.endswith("/api/agentes/cambiar_password")
 
 
+def _requiere_verificacion(request) -> bool:
+    return (
+        request.path.startswith("/api/")
+        and request.method != "OPTIONS"
+        and not _path_allowed(request.path)
+    )
+
+
+def _debe_cambiar(user) -> bool:
+    return bool(
+        user
+        and user.is_authenticated
+        and getattr(user, "debe_cambiar_password", False)
+    )
+
+
+def _respuesta_bloqueo():
+    return JsonResponse(
+        {
+            "debe_cambiar_password": True,
+            "mensaje": "Debés cambiar tu contraseña antes de continuar.",
+            "redirect": "/api/agentes/cambiar_password/",
+        },
+        status=403,
+        json_dumps_params={"ensure_ascii": False},
+    )
+
+
 class DebeCambiarPasswordMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        if not request.path.startswith("/api/"):
-            return self.get_response(request)
-
-        if request.method == "OPTIONS":
-            return self.get_response(request)
-
-        user = getattr(request, "user", None)
-        if not user or not user.is_authenticated:
-            return self.get_response(request)
-
-        if not getattr(user, "debe_cambiar_password", False):
-            return self.get_response(request)
-
-        if _path_allowed(request.path):
-            return self.get_response(request)
-
-        return JsonResponse(
-            {
-                "debe_cambiar_password": True,
-                "mensaje": "Debés cambiar tu contraseña antes de continuar.",
-                "redirect": "/api/agentes/cambiar_password/",
-            },
-            status=403,
-            json_dumps_params={"ensure_ascii": False},
-        )
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if _requiere_verificacion(request) and _debe_cambiar(getattr(request, "user", None)):
+            return _respuesta_bloqueo()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if _requiere_verificacion(request) and hasattr(request, "auser"):
+            if _debe_cambiar(await request.auser()):
+                return _respuesta_bloqueo()
+        return await self.get_response(request)
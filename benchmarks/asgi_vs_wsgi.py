@@ -0,0 +1,190 @@
+"""
+Benchmark de lecturas: gunicorn (WSGI, workers sync) contra uvicorn (ASGI, vistas
+async de notas/vistas_async.py) sobre el mismo conjunto de datos.
+
+Cada cliente abre una conexión por petición y, con --envio-lento, manda la
+petición en dos partes separadas por esa pausa (cliente lento: red móvil, proxy
+saturado). Un worker sync queda bloqueado esperando al cliente; el event loop de
+uvicorn sigue atendiendo a los demás.
+
+Usar SIEMPRE una base de prueba (--notas crea datos):
+    pip install gunicorn
+    DATABASE_NAME=gestor_bench python benchmarks/asgi_vs_wsgi.py --notas 2000 --clientes 50 --workers 2 --envio-lento 200
+
+Salida: peticiones por segundo y latencias p50/p95/p99 por servidor.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+LEGAJO_BENCH = '990001'
+RUTAS = [
+    '/api/notas/',
+    '/api/notas/?estado=INGRESADA',
+    '/api/notas/{id}/',
+    '/api/notas/pendientes/',
+    '/api/notas/resumen/',
+    '/api/sectores/',
+]
+
+
+def preparar_datos(cantidad):
+    """Crea el usuario del benchmark, un sector y `cantidad` notas. Returns: (cookie, id)"""
+    import django
+
+    django.setup()
+    from django.test import Client
+    from django.utils import timezone
+
+    from agentes.models import Agente
+    from notas.models import HistorialNota, Nota, Sector
+
+    usuario = Agente.objects.filter(legajo=LEGAJO_BENCH).first()
+    if usuario is None:
+        usuario = Agente.objects.create_user(
+            LEGAJO_BENCH, password=None, apellido='Bench', nombres='Usuario', rol='ADMINISTRADOR'
+        )
+    sector, _ = Sector.objects.get_or_create(numero=9901, defaults={'nombre': 'Sector benchmark'})
+    existentes = Nota.objects.filter(numero_nota__startswith='BENCH-').count()
+    nuevas = [
+        Nota(
+            numero_nota=f'BENCH-{i}',
+            tiene_numero_formal=True,
+            fecha_ingreso=timezone.now(),
+            sector_origen=sector,
+            tema=f'Nota de benchmark {i}',
+            responsable=usuario if i % 3 == 0 else None,
+            estado='ASIGNADA' if i % 3 == 0 else 'INGRESADA',
+            creado_por=usuario,
+        )
+        for i in range(existentes, cantidad)
+    ]
+    Nota.objects.bulk_create(nuevas, batch_size=1000)
+    nota = Nota.objects.filter(numero_nota__startswith='BENCH-').order_by('id').first()
+    HistorialNota.objects.bulk_create(
+        HistorialNota(nota=nota, usuario=usuario, tipo_evento='ACTUALIZACION',
+                      descripcion_cambio=f'Evento {i}')
+        for i in range(20 - nota.historial.count())
+    )
+    cliente = Client()
+    cliente.force_login(usuario)
+    return cliente.cookies['sessionid'].value, nota.id
+
+
+def esperar_puerto(puerto, limite=30):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        with socket.socket() as s:
+            if s.connect_ex(('127.0.0.1', puerto)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f'El servidor no abrió el puerto {puerto}')
+
+
+async def pedir(puerto, ruta, cookie, envio_lento):
+    lector, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+    try:
+        peticion = (
+            f'GET {ruta} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: sessionid={cookie}\r\n'
+            f'Accept: application/json\r\nConnection: close\r\n\r\n'
+        ).encode()
+        if envio_lento:
+            escritor.write(peticion[:20])
+            await escritor.drain()
+            await asyncio.sleep(envio_lento / 1000)
+            peticion = peticion[20:]
+        escritor.write(peticion)
+        await escritor.drain()
+        respuesta = await lector.read()
+        return int(respuesta.split(b' ', 2)[1]) if respuesta else 0
+    finally:
+        escritor.close()
+
+
+async def carga(puerto, rutas, cookie, clientes, duracion, envio_lento):
+    latencias, errores = [], 0
+    fin = time.monotonic() + duracion
+
+    async def cliente(indice):
+        nonlocal errores
+        i = indice
+        while time.monotonic() < fin:
+            inicio = time.monotonic()
+            try:
+                estado = await pedir(puerto, rutas[i % len(rutas)], cookie, envio_lento)
+            except OSError:
+                estado = 0
+            if estado == 200:
+                latencias.append(time.monotonic() - inicio)
+            else:
+                errores += 1
+            i += 1
+
+    await asyncio.gather(*(cliente(i) for i in range(clientes)))
+    return latencias, errores
+
+
+def medir(nombre, comando, puerto, rutas, cookie, args):
+    entorno = dict(os.environ, ALLOWED_HOSTS='127.0.0.1,localhost')
+    proceso = subprocess.Popen(comando, cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL)
+    try:
+        esperar_puerto(puerto)
+        # Calentamiento: conexiones a la base e imports de cada worker.
+        asyncio.run(carga(puerto, rutas, cookie, args.workers * 2, 2, 0))
+        latencias, errores = asyncio.run(
+            carga(puerto, rutas, cookie, args.clientes, args.duracion, args.envio_lento)
+        )
+    finally:
+        proceso.send_signal(signal.SIGTERM)
+        proceso.wait(timeout=30)
+    if not latencias:
+        return f'{nombre:<10} sin respuestas correctas ({errores} errores)'
+    cuantiles = statistics.quantiles(latencias, n=100)
+    return (
+        f'{nombre:<10} {len(latencias) / args.duracion:>8.1f} req/s  '
+        f'p50 {cuantiles[49] * 1000:>7.1f} ms  p95 {cuantiles[94] * 1000:>7.1f} ms  '
+        f'p99 {cuantiles[98] * 1000:>7.1f} ms  errores {errores}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--notas', type=int, default=2000, help='Notas de prueba (default: 2000).')
+    parser.add_argument('--clientes', type=int, default=50, help='Clientes concurrentes.')
+    parser.add_argument('--duracion', type=int, default=20, help='Segundos por servidor.')
+    parser.add_argument('--workers', type=int, default=2, help='Procesos por servidor.')
+    parser.add_argument('--envio-lento', type=int, default=0,
+                        help='Pausa (ms) a mitad del envío de cada petición.')
+    parser.add_argument('--puerto', type=int, default=8750)
+    parser.add_argument('--solo', choices=['gunicorn', 'uvicorn'], help='Medir un solo servidor.')
+    args = parser.parse_args()
+
+    cookie, nota_id = preparar_datos(args.notas)
+    rutas = [ruta.format(id=nota_id) for ruta in RUTAS]
+    servidores = {
+        'gunicorn': [sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+                     '-w', str(args.workers), '-b', f'127.0.0.1:{args.puerto}'],
+        'uvicorn': [sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+                    '--workers', str(args.workers), '--port', str(args.puerto),
+                    '--log-level', 'warning', '--no-access-log'],
+    }
+    print(f'{args.clientes} clientes, {args.duracion} s, {args.workers} workers, '
+          f'envío lento {args.envio_lento} ms, {len(rutas)} rutas')
+    for nombre, comando in servidores.items():
+        if args.solo and nombre != args.solo:
+            continue
+        print(medir(nombre, comando, args.puerto, rutas, cookie, args), flush=True)
+
+
+if __name__ == '__main__':
+    main()
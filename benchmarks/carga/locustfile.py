@@ -0,0 +1,144 @@
+"""
+Escenarios de carga con Locust: cuántos operadores concurrentes soporta el despliegue.
+
+Cada usuario virtual inicia sesión (POST /api/auth/login/) con un usuario creado
+por preparar.py y repite, con pausas de CARGA_PAUSA segundos, los recorridos:
+    dashboard   GET /api/notas/resumen/ (lo único que pide el panel de control)
+    búsqueda    GET /api/notas/?search=... (términos de CARGA_BUSQUEDAS)
+    trámite     crear nota -> ASIGNADA (a sí mismo) -> subir adjunto ->
+                EN_PROCESO -> RESUELTA -> ARCHIVADA
+    sesión      logout y login de nuevo (mide el costo del hash de contraseña)
+
+Cada paso tiene su propio nombre en las estadísticas de Locust; al terminar se
+imprime además una tabla con req/s y p50/p95/p99 por paso.
+
+Uso (servidor local, base de prueba; locust no está en requirements.txt):
+    pip install locust
+    DATABASE_NAME=gestor_bench python benchmarks/carga/preparar.py --usuarios 50   # imprime los export
+    locust -f benchmarks/carga/locustfile.py --headless -u 50 -r 5 -t 2m \\
+        --host http://127.0.0.1:8000 --csv resultados/carga
+
+Con --csv quedan resultados/carga_stats.csv (percentiles por paso) y
+resultados/carga_stats_history.csv (evolución durante la prueba).
+"""
+import itertools
+import os
+import random
+import threading
+
+from locust import HttpUser, between, events, task
+
+PREFIJO_LEGAJO = '991'  # igual que preparar.py
+USUARIOS = int(os.environ.get('CARGA_USUARIOS', 50))
+PASSWORD = os.environ.get('CARGA_PASSWORD', 'carga-2026')
+SECTOR = int(os.environ.get('CARGA_SECTOR', 0))
+BUSQUEDAS = os.environ.get('CARGA_BUSQUEDAS', 'carga,nota,sector,expediente').split(',')
+PAUSA_MIN, PAUSA_MAX = (float(x) for x in os.environ.get('CARGA_PAUSA', '1,3').split(','))
+ADJUNTO = b'%PDF-1.4\n' + b'0' * 20 * 1024  # 20 KB; contenido distinto por subida (ver _subir_adjunto)
+
+_legajos = itertools.cycle(f'{PREFIJO_LEGAJO}{i:05d}' for i in range(USUARIOS))
+_lock = threading.Lock()
+
+
+class Agente(HttpUser):
+    wait_time = between(PAUSA_MIN, PAUSA_MAX)
+
+    def on_start(self):
+        with _lock:
+            self.legajo = next(_legajos)
+        self.iniciar_sesion()
+
+    def iniciar_sesion(self):
+        with self.client.post(
+            '/api/auth/login/',
+            json={'legajo': self.legajo, 'password': PASSWORD},
+            name='login',
+            catch_response=True,
+        ) as respuesta:
+            if respuesta.status_code != 200:
+                respuesta.failure(f'{respuesta.status_code}: {respuesta.text[:200]}')
+                self.usuario_id = None
+                return
+            self.usuario_id = respuesta.json()['usuario']['id']
+
+    @task(6)
+    def dashboard(self):
+        self.client.get('/api/notas/resumen/', name='dashboard')
+
+    @task(4)
+    def buscar(self):
+        termino = random.choice(BUSQUEDAS)
+        self.client.get(f'/api/notas/?search={termino}', name='buscar notas')
+
+    @task(2)
+    def tramitar_nota(self):
+        """Crea una nota y la lleva hasta ARCHIVADA, con un adjunto en el camino."""
+        if self.usuario_id is None:
+            return
+        respuesta = self.client.post(
+            '/api/notas/',
+            json={
+                'sector_origen_id': SECTOR,
+                'tema': f'Carga {self.legajo} {random.randint(0, 10**6)}',
+                'tarea_asignada': 'Prueba de carga',
+                'prioridad': random.choice(['BAJA', 'MEDIA', 'ALTA']),
+            },
+            name='crear nota',
+        )
+        if respuesta.status_code != 201:
+            return
+        nota_id = respuesta.json()['id']
+        if not self._cambiar_estado(nota_id, 'ASIGNADA', responsable_nuevo=self.usuario_id):
+            return
+        self._subir_adjunto(nota_id)
+        for estado in ('EN_PROCESO', 'RESUELTA', 'ARCHIVADA'):
+            if not self._cambiar_estado(nota_id, estado):
+                return
+
+    @task(1)
+    def renovar_sesion(self):
+        self.client.post('/api/auth/logout/', name='logout')
+        self.iniciar_sesion()
+
+    def _cambiar_estado(self, nota_id, estado, **datos):
+        respuesta = self.client.post(
+            f'/api/notas/{nota_id}/cambiar_estado/',
+            json={'estado_nuevo': estado, **datos},
+            name=f'cambiar_estado {estado}',
+        )
+        return respuesta.status_code == 200
+
+    def _subir_adjunto(self, nota_id):
+        # Contenido único: si se repitiera, guardar_blob lo deduplica y no mide la escritura.
+        contenido = ADJUNTO + str(nota_id).encode()
+        self.client.post(
+            '/api/adjuntos/',
+            data={'nota': nota_id, 'nombre_archivo': 'carga.pdf', 'tipo_adjunto': 'OTRO'},
+            files={'archivo': ('carga.pdf', contenido, 'application/pdf')},
+            name='subir adjunto',
+        )
+
+
+@events.init.add_listener
+def _verificar_configuracion(environment, **kwargs):
+    if not SECTOR:
+        raise SystemExit('Falta CARGA_SECTOR: correr benchmarks/carga/preparar.py y exportar sus variables.')
+
+
+@events.quitting.add_listener
+def _resumen(environment, **kwargs):
+    """Tabla compacta por paso (Locust imprime además la suya, más detallada)."""
+    estadisticas = environment.stats
+    print(f'\n{"paso":<26} {"pedidos":>8} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"fallas":>7}')
+    for entrada in sorted(estadisticas.entries.values(), key=lambda e: e.name):
+        print(
+            f'{entrada.name:<26} {entrada.num_requests:>8} {entrada.total_rps:>8.1f} '
+            f'{entrada.get_response_time_percentile(0.5):>8.0f} '
+            f'{entrada.get_response_time_percentile(0.95):>8.0f} '
+            f'{entrada.get_response_time_percentile(0.99):>8.0f} {entrada.num_failures:>7}'
+        )
+    total = estadisticas.total
+    print(f'{"total":<26} {total.num_requests:>8} {total.total_rps:>8.1f} '
+          f'{total.get_response_time_percentile(0.5):>8.0f} '
+          f'{total.get_response_time_percentile(0.95):>8.0f} '
+          f'{total.get_response_time_percentile(0.99):>8.0f} {total.num_failures:>7}')
@@ -0,0 +1,66 @@
+"""
+Crea los usuarios y el sector que usan los escenarios de carga (locustfile.py).
+
+Usuarios con legajo 99100000, 99100001, ... y la misma contraseña; uno de cada
+--cada-supervisor es SUPERVISOR (su dashboard es más costoso), el resto OPERADOR.
+Es idempotente: vuelve a activar y a poner la contraseña de los existentes.
+
+Usar SIEMPRE una base de prueba:
+    DATABASE_NAME=gestor_bench python benchmarks/carga/preparar.py --usuarios 50
+
+Imprime las variables a exportar antes de correr locust.
+"""
+import argparse
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, RAIZ)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+PREFIJO_LEGAJO = '991'
+SECTOR_CARGA = 9902
+
+
+def preparar(usuarios, password, cada_supervisor):
+    """Returns: id del sector de origen para las notas creadas en la prueba."""
+    import django
+
+    django.setup()
+    from agentes.models import Agente, RolChoices
+    from notas.models import Sector
+
+    for i in range(usuarios):
+        rol = RolChoices.SUPERVISOR if i % cada_supervisor == 0 else RolChoices.OPERADOR
+        agente, _ = Agente.objects.get_or_create(
+            legajo=f'{PREFIJO_LEGAJO}{i:05d}',
+            defaults={'apellido': 'Carga', 'nombres': f'Usuario {i}'},
+        )
+        agente.rol = rol
+        agente.usuario_sistema = True
+        agente.is_active = True
+        agente.debe_cambiar_password = False
+        agente.set_password(password)
+        agente.save()
+    sector, _ = Sector.objects.get_or_create(
+        numero=SECTOR_CARGA, defaults={'nombre': 'Sector prueba de carga'}
+    )
+    return sector.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--usuarios', type=int, default=50, help='Usuarios a crear (default: 50).')
+    parser.add_argument('--password', default='carga-2026', help='Contraseña de todos los usuarios.')
+    parser.add_argument('--cada-supervisor', type=int, default=5,
+                        help='Uno de cada N usuarios es SUPERVISOR (default: 5).')
+    args = parser.parse_args()
+
+    sector_id = preparar(args.usuarios, args.password, args.cada_supervisor)
+    print(f'export CARGA_USUARIOS={args.usuarios}')
+    print(f'export CARGA_PASSWORD={args.password}')
+    print(f'export CARGA_SECTOR={sector_id}')
+
+
+if __name__ == '__main__':
+    main()
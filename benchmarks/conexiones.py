@@ -0,0 +1,89 @@
+"""
+Benchmark del costo de abrir conexiones a PostgreSQL por petición.
+
+Levanta gunicorn (hilos, workers gthread) con tres configuraciones de
+config/settings.py y mide latencia de lecturas livianas y cuántas sesiones
+nuevas abrió PostgreSQL (pg_stat_database.sessions, PostgreSQL 14+):
+    sin persistencia  DATABASE_CONN_MAX_AGE=0 (una conexión por petición)
+    persistente       DATABASE_CONN_MAX_AGE=60
+    pool              DATABASE_POOL=True (psycopg[pool])
+
+Usar una base de prueba (crea datos igual que asgi_vs_wsgi.py):
+    DATABASE_NAME=gestor_bench python benchmarks/conexiones.py --clientes 4 --duracion 10
+"""
+import argparse
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+from asgi_vs_wsgi import RAIZ, carga, esperar_puerto, preparar_datos
+
+MODOS = {
+    'sin persistencia': {'DATABASE_CONN_MAX_AGE': '0', 'DATABASE_POOL': 'False'},
+    'persistente': {'DATABASE_CONN_MAX_AGE': '60', 'DATABASE_POOL': 'False'},
+    'pool': {'DATABASE_POOL': 'True'},
+}
+RUTAS = ['/api/sectores/', '/api/notas/{id}/']
+
+
+def sesiones_abiertas():
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_stat_force_next_flush()')
+        cursor.execute(
+            'SELECT sessions FROM pg_stat_database WHERE datname = current_database()'
+        )
+        return cursor.fetchone()[0]
+
+
+def medir(nombre, variables, rutas, cookie, args):
+    entorno = dict(os.environ, ALLOWED_HOSTS='127.0.0.1,localhost', **variables)
+    comando = [
+        sys.executable, '-m', 'gunicorn', 'config.wsgi:application', '-w', '1',
+        '--threads', str(args.clientes), '-b', f'127.0.0.1:{args.puerto}', '--log-level', 'warning',
+    ]
+    proceso = subprocess.Popen(comando, cwd=RAIZ, env=entorno)
+    try:
+        esperar_puerto(args.puerto)
+        asyncio.run(carga(args.puerto, rutas, cookie, args.clientes, 1, 0))
+        antes = sesiones_abiertas()
+        latencias, errores = asyncio.run(
+            carga(args.puerto, rutas, cookie, args.clientes, args.duracion, 0)
+        )
+        time.sleep(1)  # pg_stat_database se actualiza con un segundo de demora como máximo
+        sesiones = sesiones_abiertas() - antes
+    finally:
+        proceso.send_signal(signal.SIGTERM)
+        proceso.wait(timeout=30)
+    if not latencias:
+        return f'{nombre:<17} sin respuestas correctas ({errores} errores)'
+    cuantiles = statistics.quantiles(latencias, n=100)
+    return (
+        f'{nombre:<17} {len(latencias) / args.duracion:>8.1f} req/s  '
+        f'p50 {cuantiles[49] * 1000:>6.1f} ms  p95 {cuantiles[94] * 1000:>6.1f} ms  '
+        f'conexiones nuevas {sesiones:>6}  errores {errores}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--notas', type=int, default=200, help='Notas de prueba (default: 200).')
+    parser.add_argument('--clientes', type=int, default=4, help='Clientes concurrentes (= hilos).')
+    parser.add_argument('--duracion', type=int, default=10, help='Segundos por configuración.')
+    parser.add_argument('--puerto', type=int, default=8751)
+    args = parser.parse_args()
+
+    cookie, nota_id = preparar_datos(args.notas)
+    rutas = [ruta.format(id=nota_id) for ruta in RUTAS]
+    print(f'{args.clientes} clientes, {args.duracion} s por configuración, rutas: {", ".join(rutas)}')
+    for nombre, variables in MODOS.items():
+        print(medir(nombre, variables, rutas, cookie, args), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark del listado de notas: NotaListSerializer (instancias de Nota y Agente,
+SerializerMethodField por fila) contra valores_lista_notas() + filas_lista_notas()
+(.values() con solo las columnas del listado y `atrasada` calculada en la base).
+
+Corre en el proceso, sin servidor: mide CPU (consulta + armado de los dicts,
+sin renderizar JSON) y pico de memoria de Python (tracemalloc) por página. Que
+ambas versiones den el mismo resultado lo verifica ListadoRapidoTests (notas/tests.py).
+
+Usar una base de prueba (crea datos igual que asgi_vs_wsgi.py y completa la
+descripción de esas notas, que el listado no muestra pero el modelo sí carga):
+    DATABASE_NAME=gestor_bench python benchmarks/lista_notas.py --notas 5000 --tamaños 20 500 5000
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from asgi_vs_wsgi import preparar_datos
+
+
+def medir(funcion, repeticiones):
+    """Returns: (mediana de CPU en segundos, pico de memoria en bytes)"""
+    funcion()  # calentamiento: conexión, caches de Django
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.process_time()
+        funcion()
+        tiempos.append(time.process_time() - inicio)
+    tracemalloc.start()
+    funcion()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(tiempos), pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--notas', type=int, default=5000, help='Notas de prueba (default: 5000).')
+    parser.add_argument('--tamaños', type=int, nargs='+', default=[20, 500, 5000],
+                        help='Filas por página a medir (default: 20 500 5000).')
+    parser.add_argument('--descripcion', type=int, default=2000,
+                        help='Largo de la descripción de las notas de prueba (default: 2000).')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    preparar_datos(args.notas)
+    from notas.models import Nota
+    from notas.serializers import NotaListSerializer, filas_lista_notas, valores_lista_notas
+
+    Nota.objects.filter(numero_nota__startswith='BENCH-', descripcion='').update(
+        descripcion='x' * args.descripcion
+    )
+    # Mismo queryset que NotaViewSet.get_queryset() para un usuario que ve todas las notas.
+    queryset = Nota.objects.select_related('responsable', 'creado_por').order_by('-fecha_ingreso', '-id')
+
+    print(f'{"filas":>6} {"versión":<12} {"CPU ms":>9} {"memoria KB":>11}')
+    for tamaño in args.tamaños:
+        def con_serializer():
+            return NotaListSerializer(list(queryset[:tamaño]), many=True).data
+
+        def con_valores():
+            return filas_lista_notas(list(valores_lista_notas(queryset)[:tamaño]))
+
+        cpu_serializer, memoria_serializer = medir(con_serializer, args.repeticiones)
+        cpu_valores, memoria_valores = medir(con_valores, args.repeticiones)
+        print(f'{tamaño:>6} {"serializer":<12} {cpu_serializer * 1000:>9.2f} {memoria_serializer / 1024:>11.0f}')
+        print(
+            f'{tamaño:>6} {"values()":<12} {cpu_valores * 1000:>9.2f} {memoria_valores / 1024:>11.0f}'
+            f'   CPU x{cpu_serializer / cpu_valores:.1f}, memoria x{memoria_serializer / memoria_valores:.1f}',
+            flush=True,
+        )
+
+
+if __name__ == '__main__':
+    main()
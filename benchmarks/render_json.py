@@ -0,0 +1,71 @@
+"""
+Benchmark del render JSON de la API: JSONRenderer de DRF contra ORJSONRenderer
+(config/renderers.py) sobre páginas grandes de NotaListSerializer y sobre las
+filas de filas_lista_notas(), que es lo que hoy devuelve el listado.
+
+Corre en el proceso, sin servidor: los datos se serializan una vez y se mide
+solo el render (CPU), verificando que ambos renderers produzcan los mismos bytes.
+
+Usar una base de prueba (crea datos igual que asgi_vs_wsgi.py):
+    pip install orjson
+    DATABASE_NAME=gestor_bench python benchmarks/render_json.py --notas 5000 --tamaños 100 1000 5000
+"""
+import argparse
+import statistics
+import time
+
+from asgi_vs_wsgi import preparar_datos
+
+
+def medir(renderer, datos, repeticiones):
+    """Returns: mediana de CPU en segundos por render."""
+    renderer.render(datos)
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.process_time()
+        renderer.render(datos)
+        tiempos.append(time.process_time() - inicio)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--notas', type=int, default=5000, help='Notas de prueba (default: 5000).')
+    parser.add_argument('--tamaños', type=int, nargs='+', default=[100, 1000, 5000],
+                        help='Filas por página a medir (default: 100 1000 5000).')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    preparar_datos(args.notas)
+    from rest_framework.renderers import JSONRenderer
+
+    from config.renderers import ORJSONRenderer, orjson
+    from notas.models import Nota
+    from notas.serializers import NotaListSerializer, filas_lista_notas, valores_lista_notas
+
+    if orjson is None:
+        raise SystemExit('orjson no está instalado: ORJSONRenderer usaría JSONRenderer (pip install orjson).')
+    queryset = Nota.objects.select_related('responsable').order_by('-fecha_ingreso', '-id')
+    drf, rapido = JSONRenderer(), ORJSONRenderer()
+
+    print(f'{"filas":>6} {"datos":<12} {"KB":>7} {"DRF ms":>8} {"orjson ms":>10}')
+    for tamaño in args.tamaños:
+        paginas = {
+            'serializer': NotaListSerializer(list(queryset[:tamaño]), many=True).data,
+            'values()': filas_lista_notas(valores_lista_notas(queryset)[:tamaño]),
+        }
+        for nombre, datos in paginas.items():
+            contenido = drf.render(datos)
+            if rapido.render(datos) != contenido:
+                raise SystemExit(f'Salidas distintas con {tamaño} filas ({nombre})')
+            cpu_drf = medir(drf, datos, args.repeticiones)
+            cpu_rapido = medir(rapido, datos, args.repeticiones)
+            print(
+                f'{tamaño:>6} {nombre:<12} {len(contenido) / 1024:>7.0f} {cpu_drf * 1000:>8.2f} '
+                f'{cpu_rapido * 1000:>10.2f}   x{cpu_drf / cpu_rapido:.1f}',
+                flush=True,
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,12 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+El stream de eventos /api/eventos/ (notas/eventos.py) necesita ASGI:
+    uvicorn config.asgi:application --host 127.0.0.1 --port 8000
+
+Con ASGI usar DATABASE_POOL=True: las conexiones persistentes (CONN_MAX_AGE)
+quedan atadas a hilos que no se reutilizan entre peticiones.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -12,5 +18,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Lecturas con ORM async (notas/vistas_async.py); LECTURAS_ASYNC=False las desactiva.
+os.environ.setdefault('LECTURAS_ASYNC', 'True')
+# Sin pool, una conexión por petición en lugar de conexiones huérfanas por hilo.
+os.environ.setdefault('DATABASE_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
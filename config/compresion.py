@@ -0,0 +1,213 @@
+"""
+Compresión de respuestas negociada con Accept-Encoding (config.middleware.CompresionMiddleware).
+
+Algoritmos en orden de preferencia según COMPRESION_ALGORITMOS: zstd
+(pip install zstandard), br (pip install brotli) y gzip; los que no tengan su
+paquete instalado se omiten. Se comprimen JSON, texto, CSV, HTML, JS, XML y
+SVG desde COMPRESION_MINIMO_BYTES; las respuestas en streaming (exportaciones)
+se comprimen parte por parte sin juntar todo en memoria.
+
+No se comprimen:
+- text/event-stream (eventos en vivo: el compresor retendría los mensajes).
+- Archivos servidos con rangos (Accept-Ranges / Content-Range / X-Accel-Redirect).
+- Respuestas que setean cookies (login: session_key en el cuerpo). Con la
+  sesión por cookie, un secreto comprimido junto a texto que controla un tercero
+  es lo que explota BREACH; el resto del cuerpo de la API no lleva secretos (el
+  token CSRF de los formularios de Django va enmascarado por petición) y gzip
+  agrega además bytes aleatorios al encabezado, como GZipMiddleware.
+"""
+import gzip
+import io
+import secrets
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+NIVEL_GZIP = 6
+CALIDAD_BROTLI = 4  # 0-11; más de 5 es lento para contenido generado en cada petición
+NIVEL_ZSTD = 3
+RELLENO_GZIP = 100  # bytes aleatorios máximos en el encabezado gzip (igual que GZipMiddleware)
+
+TIPOS_COMPRIMIBLES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+)
+TIPOS_EXCLUIDOS = ('text/event-stream',)
+
+
+class _CompresorGzip:
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.archivo = gzip.GzipFile(
+            filename=b'a' * secrets.randbelow(RELLENO_GZIP),
+            mode='wb',
+            compresslevel=NIVEL_GZIP,
+            fileobj=self.buffer,
+            mtime=0,
+        )
+
+    def _leer(self):
+        datos = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return datos
+
+    def comprimir(self, datos):
+        self.archivo.write(datos)
+        return self._leer()
+
+    def terminar(self):
+        self.archivo.close()
+        return self._leer()
+
+
+class _CompresorBrotli:
+    def __init__(self):
+        self.compresor = brotli.Compressor(quality=CALIDAD_BROTLI)
+
+    def comprimir(self, datos):
+        return self.compresor.process(datos)
+
+    def terminar(self):
+        return self.compresor.finish()
+
+
+class _CompresorZstd:
+    def __init__(self):
+        self.compresor = zstandard.ZstdCompressor(level=NIVEL_ZSTD).compressobj()
+
+    def comprimir(self, datos):
+        return self.compresor.compress(datos)
+
+    def terminar(self):
+        return self.compresor.flush()
+
+
+def _gzip(datos):
+    return compress_string(datos, max_random_bytes=RELLENO_GZIP)
+
+
+def _brotli(datos):
+    return brotli.compress(datos, quality=CALIDAD_BROTLI)
+
+
+def _zstd(datos):
+    return zstandard.ZstdCompressor(level=NIVEL_ZSTD).compress(datos)
+
+
+# Content-Encoding -> (comprimir todo, clase para streaming, paquete requerido)
+ALGORITMOS = {
+    'zstd': (_zstd, _CompresorZstd, zstandard),
+    'br': (_brotli, _CompresorBrotli, brotli),
+    'gzip': (_gzip, _CompresorGzip, gzip),
+}
+
+
+def algoritmos_disponibles(nombres):
+    """COMPRESION_ALGORITMOS -> nombres utilizables, en el mismo orden."""
+    desconocidos = [nombre for nombre in nombres if nombre not in ALGORITMOS]
+    if desconocidos:
+        raise ImproperlyConfigured(
+            f"COMPRESION_ALGORITMOS: {', '.join(desconocidos)} no soportado (zstd, br, gzip)."
+        )
+    return [nombre for nombre in nombres if ALGORITMOS[nombre][2] is not None]
+
+
+def elegir(accept_encoding, disponibles):
+    """
+    Algoritmo con mayor q en Accept-Encoding; a igual q, el primero de `disponibles`.
+    Returns: nombre o None (el cliente no acepta ninguno).
+    """
+    aceptados = {}
+    for item in accept_encoding.lower().split(','):
+        nombre, *parametros = item.split(';')
+        calidad = 1.0
+        for parametro in parametros:
+            clave, _, valor = parametro.partition('=')
+            if clave.strip() == 'q':
+                try:
+                    calidad = float(valor)
+                except ValueError:
+                    calidad = 0.0
+        aceptados[nombre.strip()] = calidad
+    comodin = aceptados.get('*', 0.0)
+    candidatos = [
+        (aceptados.get(nombre, comodin), -posicion, nombre)
+        for posicion, nombre in enumerate(disponibles)
+    ]
+    calidad, _, nombre = max(candidatos, default=(0.0, 0, None))
+    return nombre if calidad > 0 else None
+
+
+def es_comprimible(response):
+    """Tipo de contenido y encabezados admiten compresión (ver docstring del módulo)."""
+    tipo = response.get('Content-Type', '').lower()
+    if not tipo.startswith(TIPOS_COMPRIMIBLES) or tipo.startswith(TIPOS_EXCLUIDOS):
+        return False
+    encabezados = ('Content-Encoding', 'Content-Range', 'Accept-Ranges', 'X-Accel-Redirect')
+    if any(response.has_header(encabezado) for encabezado in encabezados):
+        return False
+    return not response.cookies
+
+
+def _flujo(clase, partes):
+    compresor = clase()
+    for parte in partes:
+        datos = compresor.comprimir(parte)
+        if datos:
+            yield datos
+    yield compresor.terminar()
+
+
+async def _aflujo(clase, partes):
+    compresor = clase()
+    async for parte in partes:
+        datos = compresor.comprimir(parte)
+        if datos:
+            yield datos
+    yield compresor.terminar()
+
+
+def comprimir(request, response, disponibles, minimo):
+    """Comprime `response` si corresponde. Returns: la misma respuesta."""
+    if not es_comprimible(response):
+        return response
+    if not response.streaming and len(response.content) < minimo:
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    nombre = elegir(request.META.get('HTTP_ACCEPT_ENCODING', ''), disponibles)
+    if nombre is None:
+        return response
+    funcion, clase, _ = ALGORITMOS[nombre]
+    if response.streaming:
+        if response.is_async:
+            response.streaming_content = _aflujo(clase, response.streaming_content)
+        else:
+            response.streaming_content = _flujo(clase, response.streaming_content)
+        del response.headers['Content-Length']
+    else:
+        contenido = funcion(response.content)
+        if len(contenido) >= len(response.content):
+            return response
+        response.content = contenido
+        response.headers['Content-Length'] = str(len(contenido))
+    # La representación cambia: un ETag fuerte pasa a débil (RFC 9110 8.8.1).
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response.headers['ETag'] = 'W/' + etag
+    response.headers['Content-Encoding'] = nombre
+    return response
@@ -0,0 +1,253 @@
+"""
+Métricas por petición (config.middleware.MetricasMiddleware): duración total,
+consultas y tiempo de base, tiempo de serialización de DRF y tamaño de la
+respuesta, por vista y acción (ej. NotaViewSet.cambiar_estado).
+
+Cada respuesta lleva un encabezado Server-Timing y los totales se exponen en
+/api/metrics/ en formato de texto de Prometheus. Con METRICAS_HABILITADAS=False
+(default) el middleware se quita de la cadena y no se instala nada.
+
+La serialización se mide en BaseSerializer.data: incluye las consultas que los
+serializers disparen (N+1), que también suman en el tiempo de base.
+
+Cada proceso acumula sus propios totales. Con varios workers, METRICAS_DIRECTORIO
+hace que cada uno vuelque los suyos a un archivo y /api/metrics/ sume todos.
+"""
+import bisect
+import hmac
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, JsonResponse
+from rest_framework import serializers
+
+LIMITES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # segundos
+INTERVALO_VOLCADO = 5  # segundos entre volcados a METRICAS_DIRECTORIO
+
+# Posiciones en la lista de valores de cada serie
+PETICIONES, DURACION, CONSULTAS, DURACION_DB, SERIALIZACION, BYTES = range(6)
+CUBETAS = 6  # a partir de acá, una cuenta por límite de LIMITES más +Inf
+
+_medicion = ContextVar('medicion', default=None)
+
+
+class Medicion:
+    """Acumulados de la petición en curso (compartidos con los hilos de sync_to_async)."""
+
+    __slots__ = ('consultas', 'db', 'serializacion', 'serializando')
+
+    def __init__(self):
+        self.consultas = 0
+        self.db = 0.0
+        self.serializacion = 0.0
+        self.serializando = False
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.db += time.perf_counter() - inicio
+        medicion.consultas += 1
+
+
+def _instalar_en_conexion(sender, connection, **kwargs):
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_consulta)
+
+
+_data_original = serializers.BaseSerializer.data
+
+
+def _data_medida(self):
+    medicion = _medicion.get()
+    if medicion is None or medicion.serializando:
+        return _data_original.fget(self)
+    medicion.serializando = True
+    inicio = time.perf_counter()
+    try:
+        return _data_original.fget(self)
+    finally:
+        medicion.serializacion += time.perf_counter() - inicio
+        medicion.serializando = False
+
+
+def instrumentar():
+    """Instala la medición de consultas y serializers (una vez por proceso)."""
+    if serializers.BaseSerializer.data is not _data_original:
+        return
+    connection_created.connect(_instalar_en_conexion, dispatch_uid='metricas')
+    for conexion in connections.all(initialized_only=True):
+        _instalar_en_conexion(None, conexion)
+    # Serializer.data y ListSerializer.data llaman a super().data
+    serializers.BaseSerializer.data = property(_data_medida)
+
+
+def iniciar_medicion():
+    """Returns: (Medicion, token para terminar_medicion)"""
+    medicion = Medicion()
+    return medicion, _medicion.set(medicion)
+
+
+def terminar_medicion(token):
+    _medicion.reset(token)
+
+
+def nombre_vista(request):
+    """'NotaViewSet.cambiar_estado', 'auditoria_list', ... o 'sin_ruta' (404)."""
+    resolucion = getattr(request, 'resolver_match', None)
+    if resolucion is None:
+        return 'sin_ruta'
+    funcion = resolucion.func
+    clase = getattr(funcion, 'cls', None)
+    acciones = getattr(funcion, 'actions', None)
+    if clase is not None and acciones:
+        metodo = request.method.lower()
+        return f"{clase.__name__}.{acciones.get(metodo, metodo)}"
+    if clase is not None:
+        return clase.__name__
+    return getattr(funcion, '__name__', resolucion.view_name or 'sin_nombre')
+
+
+def server_timing(duracion, medicion):
+    return (
+        f'total;dur={duracion * 1000:.1f}, '
+        f'db;dur={medicion.db * 1000:.1f};desc="{medicion.consultas} consultas", '
+        f'serializacion;dur={medicion.serializacion * 1000:.1f}'
+    )
+
+
+class Registro:
+    """Totales por (vista, método, estado) del proceso."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+        self.ultimo_volcado = 0.0
+
+    def registrar(self, clave, duracion, medicion, tamaño):
+        with self.lock:
+            valores = self.series.get(clave)
+            if valores is None:
+                valores = self.series[clave] = [0] * (CUBETAS + len(LIMITES) + 1)
+            valores[PETICIONES] += 1
+            valores[DURACION] += duracion
+            valores[CONSULTAS] += medicion.consultas
+            valores[DURACION_DB] += medicion.db
+            valores[SERIALIZACION] += medicion.serializacion
+            valores[BYTES] += tamaño
+            valores[CUBETAS + bisect.bisect_left(LIMITES, duracion)] += 1
+        if settings.METRICAS_DIRECTORIO and time.monotonic() - self.ultimo_volcado > INTERVALO_VOLCADO:
+            self.volcar()
+
+    def copia(self):
+        with self.lock:
+            return {clave: list(valores) for clave, valores in self.series.items()}
+
+    def volcar(self):
+        """Escribe los totales del proceso en METRICAS_DIRECTORIO/<pid>.json."""
+        self.ultimo_volcado = time.monotonic()
+        directorio = settings.METRICAS_DIRECTORIO
+        os.makedirs(directorio, exist_ok=True)
+        destino = os.path.join(directorio, f'{os.getpid()}.json')
+        temporal = f'{destino}.{threading.get_ident()}.tmp'
+        with open(temporal, 'w') as archivo:
+            json.dump([[*clave, valores] for clave, valores in self.copia().items()], archivo)
+        os.replace(temporal, destino)
+
+    def totales(self):
+        """Totales del proceso, más los de otros procesos si hay METRICAS_DIRECTORIO."""
+        if not settings.METRICAS_DIRECTORIO:
+            return self.copia()
+        self.volcar()
+        totales = {}
+        for nombre in os.listdir(settings.METRICAS_DIRECTORIO):
+            if not nombre.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(settings.METRICAS_DIRECTORIO, nombre)) as archivo:
+                    filas = json.load(archivo)
+            except (OSError, ValueError):
+                continue
+            for vista, metodo, estado, valores in filas:
+                acumulado = totales.setdefault((vista, metodo, estado), [0] * len(valores))
+                for i, valor in enumerate(valores):
+                    acumulado[i] += valor
+        return totales
+
+
+registro = Registro()
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(vista, metodo, estado, **extra):
+    pares = {'vista': vista, 'metodo': metodo, 'estado': estado, **extra}
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in pares.items()) + '}'
+
+
+def formato_prometheus(totales):
+    lineas = []
+    contadores = (
+        ('gestor_peticiones_total', 'Peticiones atendidas.', PETICIONES),
+        ('gestor_db_consultas_total', 'Consultas SQL ejecutadas.', CONSULTAS),
+        ('gestor_db_duracion_segundos_total', 'Tiempo en consultas SQL.', DURACION_DB),
+        ('gestor_serializacion_duracion_segundos_total', 'Tiempo en serializers de DRF.', SERIALIZACION),
+        ('gestor_respuesta_bytes_total', 'Bytes de respuesta (sin contar streaming).', BYTES),
+    )
+    ordenadas = sorted(totales.items())
+    for nombre, ayuda, posicion in contadores:
+        lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} counter']
+        lineas += [f'{nombre}{_etiquetas(*clave)} {valores[posicion]:g}' for clave, valores in ordenadas]
+    nombre = 'gestor_peticion_duracion_segundos'
+    lineas += [f'# HELP {nombre} Duración total de la petición.', f'# TYPE {nombre} histogram']
+    for clave, valores in ordenadas:
+        acumulado = 0
+        for limite, cantidad in zip((*LIMITES, '+Inf'), valores[CUBETAS:]):
+            acumulado += cantidad
+            lineas.append(f'{nombre}_bucket{_etiquetas(*clave, le=limite)} {acumulado}')
+        lineas.append(f'{nombre}_sum{_etiquetas(*clave)} {valores[DURACION]:g}')
+        lineas.append(f'{nombre}_count{_etiquetas(*clave)} {valores[PETICIONES]}')
+    return '\n'.join(lineas) + '\n'
+
+
+def _autorizado(request):
+    token = settings.METRICAS_TOKEN
+    encabezado = request.headers.get('Authorization', '')
+    if token and hmac.compare_digest(encabezado, f'Bearer {token}'):
+        return True
+    usuario = getattr(request, 'user', None)
+    return bool(usuario and usuario.is_authenticated and getattr(usuario, 'rol', None) == 'ADMINISTRADOR')
+
+
+def metricas_prometheus(request):
+    """
+    GET /api/metrics/ (text/plain, formato Prometheus)
+    Acceso: Authorization: Bearer <METRICAS_TOKEN> o sesión de ADMINISTRADOR.
+    """
+    if not settings.METRICAS_HABILITADAS:
+        return JsonResponse(
+            {'error': 'Métricas deshabilitadas', 'detalle': 'Configure METRICAS_HABILITADAS=True.'},
+            status=404,
+        )
+    if not _autorizado(request):
+        return JsonResponse(
+            {'error': 'No autorizado', 'detalle': 'Requiere METRICAS_TOKEN o rol ADMINISTRADOR.'},
+            status=403,
+        )
+    return HttpResponse(
+        formato_prometheus(registro.totales()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
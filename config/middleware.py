@@ -1,9 +1,140 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import compresion, metricas
+from .routers import COOKIE_ESCRITURA, primaria_forzada, replica_configurada
+
+
 class CSRFExemptAPIMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
         if request.path.startswith('/api/'):
             setattr(request, '_dont_enforce_csrf_checks', True)
         return self.get_response(request)
 
+
+class ReplicaMiddleware:
+    """
+    Lecturas propias con réplica (config/routers.py): si el usuario escribió hace
+    menos de DATABASE_REPLICA_VENTANA segundos, sus lecturas van a 'default'.
+    """
+
+    sync_capable = True
+    async_capable = True
+    METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with primaria_forzada(COOKIE_ESCRITURA in request.COOKIES):
+            response = self.get_response(request)
+        return self._marcar_escritura(request, response)
+
+    async def __acall__(self, request):
+        with primaria_forzada(COOKIE_ESCRITURA in request.COOKIES):
+            response = await self.get_response(request)
+        return self._marcar_escritura(request, response)
+
+    def _marcar_escritura(self, request, response):
+        if (
+            replica_configurada()
+            and request.method not in self.METODOS_SEGUROS
+            and response.status_code < 400
+        ):
+            response.set_cookie(
+                COOKIE_ESCRITURA,
+                '1',
+                max_age=settings.DATABASE_REPLICA_VENTANA,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class MetricasMiddleware:
+    """
+    Mide cada petición (config/metricas.py) y agrega el encabezado Server-Timing.
+    Con METRICAS_HABILITADAS=False no se carga.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICAS_HABILITADAS:
+            raise MiddlewareNotUsed
+        metricas.instrumentar()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion, token = metricas.iniciar_medicion()
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metricas.terminar_medicion(token)
+        return self._registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        medicion, token = metricas.iniciar_medicion()
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metricas.terminar_medicion(token)
+        return self._registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    def _registrar(self, request, response, medicion, duracion):
+        tamaño = 0 if response.streaming else len(response.content)
+        clave = (metricas.nombre_vista(request), request.method, str(response.status_code))
+        metricas.registro.registrar(clave, duracion, medicion, tamaño)
+        response['Server-Timing'] = metricas.server_timing(duracion, medicion)
+        return response
+
+
+class CompresionMiddleware:
+    """
+    Comprime las respuestas con zstd, br o gzip según Accept-Encoding
+    (config/compresion.py). Con COMPRESION_HABILITADA=False no se carga.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.COMPRESION_HABILITADA:
+            raise MiddlewareNotUsed
+        self.algoritmos = compresion.algoritmos_disponibles(settings.COMPRESION_ALGORITMOS)
+        self.minimo = settings.COMPRESION_MINIMO_BYTES
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        return compresion.comprimir(request, response, self.algoritmos, self.minimo)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return compresion.comprimir(request, response, self.algoritmos, self.minimo)
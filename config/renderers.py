@@ -0,0 +1,72 @@
+"""
+Renderer y parser JSON de la API con orjson (REST_FRAMEWORK en settings).
+
+Producen el mismo JSON que JSONRenderer/JSONParser de DRF: fechas, horas,
+Decimal, textos traducibles (lazy), UUID, QuerySet, etc. pasan por el mismo
+encoders.JSONEncoder.default de DRF, la salida es compacta y UTF-8 y se escapan
+U+2028/U+2029.
+
+Única diferencia: un float inf o NaN se escribe como null, mientras que DRF
+falla ("Out of range float values are not JSON compliant"). Detectarlos
+obligaría a recorrer cada respuesta en Python; la API no genera esos valores.
+
+Se usan las clases de DRF tal cual:
+- con ?format=json&indent o 'Accept: application/json; indent=4';
+- con enteros de más de 64 bits;
+- con cuerpos inválidos (mismo mensaje de error);
+- sin orjson instalado.
+"""
+import io
+import re
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Fechas y horas al encoder de DRF (recorta microsegundos, UTC como 'Z').
+    OPCIONES = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+_por_defecto = JSONEncoder().default
+# orjson convierte en float los enteros de más de 64 bits; json los deja exactos.
+_ENTERO_LARGO = re.compile(rb'\d{19}')
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            contenido = orjson.dumps(data, default=_por_defecto, option=OPCIONES)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in contenido or b'\xe2\x80\xa9' in contenido:
+            contenido = contenido.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return contenido
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        contenido = stream.read()
+        if _ENTERO_LARGO.search(contenido):
+            return super().parse(io.BytesIO(contenido), media_type, parser_context)
+        try:
+            return orjson.loads(contenido)
+        except orjson.JSONDecodeError:
+            # JSON inválido o fuera de lo que orjson acepta: mismo resultado/error que DRF.
+            return super().parse(io.BytesIO(contenido), media_type, parser_context)
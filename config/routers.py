@@ -0,0 +1,75 @@
+"""
+Réplica de lectura opcional (alias 'replica' en DATABASES).
+
+Solo las vistas marcadas con lectura_en_replica (reportes, auditoría y listado
+de notas) leen de la réplica; el resto de las lecturas y todas las escrituras
+van a 'default'. Después de una escritura, ReplicaMiddleware deja una cookie
+que hace que ese usuario lea de 'default' durante DATABASE_REPLICA_VENTANA
+segundos, así ve sus propios cambios aunque la réplica venga atrasada.
+
+Sin alias 'replica' el router no cambia nada.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA = 'replica'
+COOKIE_ESCRITURA = 'escritura_reciente'
+
+_en_replica = ContextVar('en_replica', default=False)
+_forzar_primaria = ContextVar('forzar_primaria', default=False)
+
+
+def replica_configurada():
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def en_replica():
+    """Las lecturas dentro del bloque van a la réplica (si hay y no está forzada la primaria)."""
+    token = _en_replica.set(True)
+    try:
+        yield
+    finally:
+        _en_replica.reset(token)
+
+
+@contextmanager
+def primaria_forzada(forzar=True):
+    """Las lecturas dentro del bloque van a 'default' aunque se pida la réplica."""
+    token = _forzar_primaria.set(forzar)
+    try:
+        yield
+    finally:
+        _forzar_primaria.reset(token)
+
+
+def lectura_en_replica(funcion):
+    """Decorador para vistas de solo lectura que toleran unos segundos de atraso."""
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        with en_replica():
+            return funcion(*args, **kwargs)
+
+    return envoltura
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _en_replica.get() and not _forzar_primaria.get() and replica_configurada():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explícito: un objeto leído de la réplica se guarda igual en 'default'.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La réplica tiene los mismos datos que 'default'.
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA}:
+            return True
+        return None
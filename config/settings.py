@@ -55,20 +55,30 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.middleware.MetricasMiddleware',
+    'notas.middleware.ConsultasLentasMiddleware',
+    'config.middleware.CompresionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'config.middleware.CSRFExemptAPIMiddleware',
+    'config.middleware.ReplicaMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'agentes.middleware.DebeCambiarPasswordMiddleware',
+    'notas.middleware.PerfiladoMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
 
+# GET de notas/sectores con vistas async (notas/vistas_async.py). config/asgi.py
+# lo activa; con WSGI conviene dejarlo apagado (cada vista async necesitaría su
+# propio event loop por petición).
+LECTURAS_ASYNC = os.environ.get('LECTURAS_ASYNC', 'False') == 'True'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -99,9 +109,52 @@ DATABASES = {
         'PASSWORD': os.environ.get('DATABASE_PASSWORD', ''),
         'HOST': os.environ.get('DATABASE_HOST', 'localhost'),
         'PORT': os.environ.get('DATABASE_PORT', '5432'),
+        # Segundos que un hilo conserva su conexión (0 = una conexión por petición).
+        'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+        # Verifica la conexión reutilizada al inicio de cada petición (reconecta si se cortó).
+        'CONN_HEALTH_CHECKS': os.environ.get('DATABASE_CONN_HEALTH_CHECKS', 'True') == 'True',
+        'OPTIONS': {},
     }
 }
 
+# Pool de conexiones de psycopg 3 (psycopg[pool]); reemplaza a CONN_MAX_AGE.
+# Conviene con ASGI (uvicorn): cada petición async corre en un hilo nuevo y una
+# conexión persistente por hilo no se reutilizaría.
+#
+# Dimensionamiento: cada proceso tiene su propio pool (o una conexión por hilo
+# sin pool), así que el total es
+#     procesos web x DATABASE_POOL_MAX (o x hilos) + procesar_jobs (TRABAJOS_CONCURRENCIA)
+#     + sincronizar_correo + 1 LISTEN por proceso uvicorn (/api/eventos/)
+# y debe quedar por debajo de max_connections de PostgreSQL menos las reservadas
+# (superuser_reserved_connections, conexiones de mantenimiento). Más conexiones
+# que ~2-4 por núcleo del servidor de base no agregan rendimiento: si el total no
+# alcanza, bajar DATABASE_POOL_MAX y dejar que las peticiones esperen
+# DATABASE_POOL_TIMEOUT segundos por una conexión libre.
+if os.environ.get('DATABASE_POOL', 'False') == 'True':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DATABASE_POOL_MIN', 2)),
+        'max_size': int(os.environ.get('DATABASE_POOL_MAX', 10)),
+        'timeout': int(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+    }
+
+# Réplica de lectura opcional (config/routers.py): reportes, auditoría y listado
+# de notas. Cuenta aparte en el dimensionamiento de conexiones de arriba.
+if os.environ.get('DATABASE_REPLICA_HOST') or os.environ.get('DATABASE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('DATABASE_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.environ.get('DATABASE_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.environ.get('DATABASE_REPLICA_PORT', DATABASES['default']['PORT']),
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        # La base de test no tiene replicación: 'replica' usa la de 'default'.
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['config.routers.ReplicaRouter']
+# Segundos que un usuario lee de 'default' después de escribir (lecturas propias).
+DATABASE_REPLICA_VENTANA = int(os.environ.get('DATABASE_REPLICA_VENTANA', 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -144,6 +197,69 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Descarga de adjuntos vía Nginx (X-Accel-Redirect). Vacío = Django sirve el archivo.
+# Requiere en Nginx una location interna que apunte a MEDIA_ROOT, por ejemplo:
+#   location /protegido/ { internal; alias /srv/gestor-notas/media/; }
+ADJUNTOS_X_ACCEL_PREFIX = os.environ.get('ADJUNTOS_X_ACCEL_PREFIX', '')
+
+# Cola de trabajos en segundo plano (comando procesar_jobs)
+TRABAJOS_CONCURRENCIA = int(os.environ.get('TRABAJOS_CONCURRENCIA', 2))  # hilos por worker
+TRABAJOS_MAX_INTENTOS = int(os.environ.get('TRABAJOS_MAX_INTENTOS', 5))
+TRABAJOS_ESPERA_BASE = 30  # segundos; se duplica en cada reintento
+TRABAJOS_ESPERA_MAXIMA = 3600
+TRABAJOS_TIEMPO_MAXIMO = 1800  # segundos EN_PROCESO antes de considerar caído al worker
+
+# Correo saliente (SMTP). Si el servidor no responde, los mails esperan en la bandeja de salida.
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'False') == 'True'
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_TIMEOUT = 30
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@gestor-notas.com')
+
+# Notificaciones por mail (notas/notificaciones.py)
+CORREO_DESPACHO = os.environ.get('CORREO_DESPACHO', '')  # destinatario principal
+CORREO_MAX_POR_MINUTO = int(os.environ.get('CORREO_MAX_POR_MINUTO', 60))
+CORREO_LOTE = 50  # mails reservados por vuelta con la misma conexión SMTP
+CORREO_MAX_INTENTOS = 5
+
+# Correo entrante (IMAP): respuestas que se asocian a las notas (comando sincronizar_correo)
+IMAP_HOST = os.environ.get('IMAP_HOST', '')
+IMAP_PORT = int(os.environ.get('IMAP_PORT', 993))
+IMAP_SSL = os.environ.get('IMAP_SSL', 'True') == 'True'
+IMAP_USUARIO = os.environ.get('IMAP_USUARIO', '')
+IMAP_PASSWORD = os.environ.get('IMAP_PASSWORD', '')
+IMAP_CARPETA = os.environ.get('IMAP_CARPETA', 'INBOX')
+IMAP_TAMAÑO_MAXIMO = 50 * 1024 * 1024  # mails más grandes se omiten (bytes)
+
+# Tamaño máximo de un adjunto subido por partes (bytes, default 1 GB)
+ADJUNTOS_TAMAÑO_MAXIMO = int(os.environ.get('ADJUNTOS_TAMANO_MAXIMO', 1024 * 1024 * 1024))
+
+# Métricas por petición: Server-Timing y /api/metrics/ (config/metricas.py)
+METRICAS_HABILITADAS = os.environ.get('METRICAS_HABILITADAS', 'False') == 'True'
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')  # Bearer para el scraper de Prometheus
+# Directorio compartido por los workers para sumar sus totales (vacío = solo el proceso)
+METRICAS_DIRECTORIO = os.environ.get('METRICAS_DIRECTORIO', '')
+
+# Compresión de respuestas según Accept-Encoding (config/compresion.py). zstd y br
+# requieren pip install zstandard / brotli; sin el paquete se usa el siguiente.
+COMPRESION_HABILITADA = os.environ.get('COMPRESION_HABILITADA', 'True') == 'True'
+COMPRESION_ALGORITMOS = os.environ.get('COMPRESION_ALGORITMOS', 'zstd,br,gzip').split(',')
+COMPRESION_MINIMO_BYTES = int(os.environ.get('COMPRESION_MINIMO_BYTES', 1024))
+
+# Consultas lentas (notas/consultas_lentas.py): log con vista y pila; una muestra
+# se guarda con EXPLAIN ANALYZE en ConsultaLenta (admin). 0 = desactivado.
+CONSULTAS_LENTAS_UMBRAL_MS = int(os.environ.get('CONSULTAS_LENTAS_UMBRAL_MS', 500))
+CONSULTAS_LENTAS_MUESTREO = float(os.environ.get('CONSULTAS_LENTAS_MUESTREO', 0.1))
+CONSULTAS_LENTAS_MAXIMO = 500  # planes conservados (buffer circular)
+
+# Perfilado a pedido de un ADMINISTRADOR ('X-Perfilar: 1' o ?perfilar=1), ver
+# notas/perfilado.py. Motor: 'cprofile' o 'pyinstrument' (pip install pyinstrument).
+PERFILADO_HABILITADO = os.environ.get('PERFILADO_HABILITADO', 'False') == 'True'
+PERFILADO_MOTOR = os.environ.get('PERFILADO_MOTOR', 'cprofile')
+PERFILADO_MAXIMO = 50  # perfiles conservados (buffer circular)
+
 # Modelo de usuario personalizado
 AUTH_USER_MODEL = 'agentes.Agente'
 
@@ -177,11 +293,12 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # orjson si está instalado; si no, JSONRenderer/JSONParser de DRF (config/renderers.py)
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'config.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'config.renderers.ORJSONParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ],
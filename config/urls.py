@@ -16,11 +16,14 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
 
+from .metricas import metricas_prometheus
+
+# Los adjuntos no se sirven como media pública: se descargan desde
+# /api/adjuntos/{id}/descargar/, que verifica permisos.
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/metrics/', metricas_prometheus, name='metricas'),
     path('api/', include('notas.urls')),
     path('api/', include('agentes.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
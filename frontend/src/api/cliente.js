@@ -140,3 +140,19 @@ export async function patch(url, data) {
   }
   return response
 }
+
+/**
+ * PUT con cuerpo binario (Blob). Para las partes de una subida por partes.
+ * @param {string} url
+ * @param {Blob} cuerpo
+ * @param {Record<string, string>} [headers] - ej. Content-Range
+ * @returns {Promise<object>} JSON
+ */
+export async function putBinario(url, cuerpo, headers = {}) {
+  const response = await request(url, {
+    method: 'PUT',
+    body: cuerpo,
+    headers: { 'Content-Type': 'application/octet-stream', ...headers },
+  })
+  return parseJson(response)
+}
@@ -0,0 +1,55 @@
+import { onMounted, onUnmounted } from 'vue'
+
+const BASE_URL = import.meta.env.VITE_API_BASE_URL || ''
+
+/**
+ * Escucha /api/eventos/ (Server-Sent Events) mientras el componente está montado.
+ * Los eventos que llegan juntos (ej. cambio de estado masivo) se agrupan en una
+ * sola llamada a `alRecibir` con la lista de eventos.
+ * EventSource reconecta solo y el servidor reenvía lo perdido (Last-Event-ID).
+ * Si el servidor no ofrece eventos (501 sin ASGI, 503 sin PostgreSQL) EventSource
+ * queda cerrado y se pasa a llamar `alRecibir([])` cada `intervaloSondeo` ms.
+ * @param {(eventos: object[]) => void} alRecibir
+ * @param {{ filtro?: (evento: object) => boolean, espera?: number, intervaloSondeo?: number }} opciones
+ */
+export function useEventosNotas(
+  alRecibir,
+  { filtro = () => true, espera = 500, intervaloSondeo = 30000 } = {},
+) {
+  let fuente = null
+  let pendientes = []
+  let temporizador = null
+  let sondeo = null
+
+  function despachar() {
+    const eventos = pendientes
+    pendientes = []
+    temporizador = null
+    if (eventos.length) alRecibir(eventos)
+  }
+
+  onMounted(() => {
+    if (typeof EventSource === 'undefined') return
+    fuente = new EventSource(`${BASE_URL}/api/eventos/`, { withCredentials: true })
+    fuente.addEventListener('historial', (mensaje) => {
+      const evento = JSON.parse(mensaje.data)
+      if (!filtro(evento)) return
+      pendientes.push(evento)
+      if (!temporizador) temporizador = setTimeout(despachar, espera)
+    })
+    fuente.addEventListener('error', () => {
+      // Un corte de red deja el estado en CONNECTING (reintenta solo); una
+      // respuesta que no es text/event-stream lo deja en CLOSED.
+      if (fuente.readyState !== EventSource.CLOSED) return
+      fuente.close()
+      fuente = null
+      sondeo = setInterval(() => alRecibir([]), intervaloSondeo)
+    })
+  })
+
+  onUnmounted(() => {
+    if (fuente) fuente.close()
+    clearTimeout(temporizador)
+    clearInterval(sondeo)
+  })
+}
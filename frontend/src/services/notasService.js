@@ -1,13 +1,62 @@
-import { get, post, patch, postFormData } from '@/api/cliente'
+import { get, post, patch, postFormData, putBinario } from '@/api/cliente'
+
+/** Archivos más grandes que esto se suben por partes (reanudable). */
+export const UMBRAL_SUBIDA_POR_PARTES = 8 * 1024 * 1024
+const TAMANO_PARTE = 4 * 1024 * 1024
+const REINTENTOS_PARTE = 3
+
+async function sha256Hex(blob) {
+  if (!globalThis.crypto?.subtle) return ''
+  const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer())
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('')
+}
+
+/**
+ * Sube un archivo grande por partes. Si una parte falla, consulta el offset
+ * alcanzado en el servidor y reintenta desde ahí.
+ * @param {number} notaId
+ * @param {File} file
+ * @param {{nombre_archivo?: string, tipo_adjunto?: string}} [datos]
+ * @returns {Promise<object>} Adjunto creado
+ */
+async function subirAdjuntoPorPartes(notaId, file, datos = {}) {
+  const carga = await post(`/api/notas/${notaId}/adjuntos/cargas/`, {
+    nombre_archivo: file.name,
+    tamaño_bytes: file.size,
+    tipo_mime: file.type,
+    ...datos,
+  })
+  const url = `/api/cargas-adjuntos/${carga.id}/`
+  let recibidos = carga.recibidos
+  let fallos = 0
+  while (recibidos < file.size) {
+    const parte = file.slice(recibidos, Math.min(recibidos + TAMANO_PARTE, file.size))
+    const headers = {
+      'Content-Range': `bytes ${recibidos}-${recibidos + parte.size - 1}/${file.size}`,
+    }
+    const hash = await sha256Hex(parte)
+    if (hash) headers['X-Contenido-Sha256'] = hash
+    try {
+      recibidos = (await putBinario(url, parte, headers)).recibidos
+      fallos = 0
+    } catch (error) {
+      if (++fallos > REINTENTOS_PARTE) throw error
+      recibidos = error.data?.recibidos ?? (await get(url)).recibidos
+    }
+  }
+  return post(`${url}completar/`)
+}
 
 export const notasService = {
   getNotas: (params = '') => get(`/api/notas/${params}`),
   getPendientes: () => get('/api/notas/pendientes/'),
   getAtrasadas: () => get('/api/notas/atrasadas/'),
+  getResumen: () => get('/api/notas/resumen/'),
   getNota: (id) => get(`/api/notas/${id}/`),
   crearNota: (data) => post('/api/notas/', data),
   cambiarEstado: (id, data) => post(`/api/notas/${id}/cambiar_estado/`, data),
   subirAdjunto: (id, formData) => postFormData(`/api/notas/${id}/adjuntos/`, formData),
+  subirAdjuntoPorPartes,
 }
 
 export const sectoresService = {
@@ -27,5 +76,6 @@ export const usuariosService = {
 export const reportesService = {
   getReportesPorSector: () => get('/api/reportes/notas-por-sector/'),
   getReportesPorOperador: () => get('/api/reportes/notas-por-operador/'),
-  getAuditoria: () => get('/api/auditoria/'),
+  /** @param {string} [params] ej. '' o '?usuario=3&desde=2026-03-01' */
+  getAuditoria: (params = '') => get(`/api/auditoria/${params}`),
 }
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
 from .models import (
     Sector,
@@ -8,7 +9,17 @@ from .models import (
     Adjunto,
     LegajoDocumento,
     DistribucionResolucion,
+    NotaArchivada,
+    Trabajo,
+    EstadoTrabajoChoices,
+    MailNota,
+    EstadoMailChoices,
+    BuzonCorreo,
+    MailRecibido,
+    ConsultaLenta,
+    PerfilPeticion,
 )
+from .perfilado import consultas_repetidas
 
 
 @admin.register(Sector)
@@ -266,3 +277,163 @@ class DistribucionResolucionAdmin(admin.ModelAdmin):
     autocomplete_fields = ['nota', 'sector_destino', 'enviado_por']
     readonly_fields = ['fecha_envio']
     ordering = ['-fecha_envio']
+
+
+@admin.register(NotaArchivada)
+class NotaArchivadaAdmin(admin.ModelAdmin):
+    """Administración del archivo frío de notas (solo lectura)."""
+    list_display = ['numero_nota', 'tema', 'prioridad', 'responsable', 'fecha_ingreso', 'fecha_archivo']
+    list_filter = ['prioridad', 'fecha_archivo']
+    search_fields = ['numero_nota', 'tema', 'remitente', 'tarea_asignada']
+    ordering = ['-fecha_archivo']
+    exclude = ['registros']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Trabajo)
+class TrabajoAdmin(admin.ModelAdmin):
+    """Cola de trabajos en segundo plano (solo lectura; los ejecuta procesar_jobs)."""
+    list_display = ['id', 'tipo', 'estado', 'intentos', 'ejecutar_despues', 'fecha_creacion', 'fecha_fin']
+    list_filter = ['estado', 'tipo']
+    ordering = ['-id']
+    readonly_fields = [
+        'tipo', 'datos', 'estado', 'intentos', 'max_intentos', 'ejecutar_despues',
+        'error', 'fecha_creacion', 'fecha_inicio', 'fecha_fin',
+    ]
+    actions = ['reintentar']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.action(description='Reintentar trabajos con error')
+    def reintentar(self, request, queryset):
+        cantidad = queryset.filter(estado=EstadoTrabajoChoices.ERROR).update(
+            estado=EstadoTrabajoChoices.PENDIENTE, intentos=0, ejecutar_despues=timezone.now()
+        )
+        self.message_user(request, f'{cantidad} trabajos vueltos a la cola.')
+
+
+@admin.register(MailNota)
+class MailNotaAdmin(admin.ModelAdmin):
+    """Bandeja de salida de notificaciones (solo lectura)."""
+    list_display = ['asunto', 'nota', 'estado', 'intentos', 'proximo_intento', 'fecha_creacion', 'fecha_envio']
+    list_filter = ['estado', 'tipo_evento']
+    search_fields = ['asunto', 'nota__numero_nota', 'message_id']
+    ordering = ['-fecha_creacion']
+    readonly_fields = [
+        'nota', 'tipo_evento', 'asunto', 'cuerpo', 'destinatarios', 'cc', 'message_id',
+        'estado', 'intentos', 'proximo_intento', 'error', 'fecha_creacion', 'fecha_envio',
+    ]
+    actions = ['reintentar']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.action(description='Reintentar mails con error')
+    def reintentar(self, request, queryset):
+        from .notificaciones import programar_envio
+
+        cantidad = queryset.filter(estado=EstadoMailChoices.ERROR).update(
+            estado=EstadoMailChoices.PENDIENTE, intentos=0, proximo_intento=timezone.now()
+        )
+        if cantidad:
+            programar_envio()
+        self.message_user(request, f'{cantidad} mails vueltos a la bandeja de salida.')
+
+
+@admin.register(BuzonCorreo)
+class BuzonCorreoAdmin(admin.ModelAdmin):
+    """Estado de sincronización de las carpetas IMAP."""
+    list_display = ['servidor', 'usuario', 'carpeta', 'uidvalidity', 'ultimo_uid', 'ultima_sincronizacion']
+    readonly_fields = ['uidvalidity', 'ultima_sincronizacion']
+
+
+@admin.register(MailRecibido)
+class MailRecibidoAdmin(admin.ModelAdmin):
+    """Mails recibidos por IMAP (solo lectura)."""
+    list_display = ['asunto', 'remitente', 'nota', 'fecha', 'fecha_recepcion']
+    list_filter = ['buzon', ('nota', admin.EmptyFieldListFilter)]
+    search_fields = ['asunto', 'remitente', 'nota__numero_nota', 'message_id']
+    ordering = ['-fecha_recepcion']
+    readonly_fields = [
+        'buzon', 'uid', 'message_id', 'in_reply_to', 'remitente', 'asunto',
+        'cuerpo', 'fecha', 'fecha_recepcion',
+    ]
+    raw_id_fields = ['nota']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ConsultaLenta)
+class ConsultaLentaAdmin(admin.ModelAdmin):
+    """Consultas lentas muestreadas con su plan (solo lectura; buffer circular)."""
+    list_display = ['fecha', 'duracion_ms', 'vista', 'base', 'sql_resumido']
+    list_filter = ['base', 'vista']
+    search_fields = ['vista', 'sql']
+    ordering = ['-id']
+    readonly_fields = ['fecha', 'vista', 'base', 'duracion_ms', 'sql', 'pila', 'plan']
+
+    @admin.display(description='SQL')
+    def sql_resumido(self, obj):
+        return obj.sql[:120]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PerfilPeticion)
+class PerfilPeticionAdmin(admin.ModelAdmin):
+    """Perfiles de peticiones pedidos con X-Perfilar (solo lectura; buffer circular)."""
+    list_display = ['fecha', 'metodo', 'ruta', 'vista', 'estado', 'duracion_ms', 'cantidad_consultas', 'usuario']
+    list_filter = ['vista', 'motor']
+    search_fields = ['ruta', 'vista']
+    ordering = ['-id']
+    fields = [
+        'fecha', 'usuario', 'metodo', 'ruta', 'vista', 'estado', 'duracion_ms', 'motor',
+        'consultas_repetidas', 'perfil_formateado', 'consultas_formateadas',
+    ]
+    readonly_fields = fields
+
+    @admin.display(description='Consultas')
+    def cantidad_consultas(self, obj):
+        return len(obj.consultas)
+
+    @admin.display(description='Consultas repetidas (posible N+1)')
+    def consultas_repetidas(self, obj):
+        filas = consultas_repetidas(obj.consultas)
+        if not filas:
+            return '-'
+        return format_html('<pre>{}</pre>', '\n\n'.join(f'{n}x  {sql}' for n, sql in filas))
+
+    @admin.display(description='Perfil')
+    def perfil_formateado(self, obj):
+        return format_html('<pre>{}</pre>', obj.perfil)
+
+    @admin.display(description='Consultas SQL')
+    def consultas_formateadas(self, obj):
+        return format_html(
+            '<pre>{}</pre>',
+            '\n\n'.join(
+                f"{c['duracion_ms']:.1f} ms [{c['base']}]  {c['sql']}\n    {c['parametros']}"
+                for c in obj.consultas
+            ),
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
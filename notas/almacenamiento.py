@@ -0,0 +1,131 @@
+"""
+Almacenamiento de adjuntos direccionado por contenido.
+
+Cada archivo se guarda en MEDIA_ROOT/blobs/{hash[:2]}/{hash[2:4]}/{hash}, donde
+hash es el SHA-256 del contenido. Dos adjuntos con el mismo contenido comparten
+el mismo archivo en disco (ArchivoBlob lleva la cuenta de referencias) y dos
+archivos con el mismo nombre original ya no se pisan.
+
+registrar_blob() mueve el archivo dentro de la transacción que crea la fila:
+si esa transacción se revierte, el archivo queda en disco sin ArchivoBlob.
+limpiar_blobs los encuentra con archivos_huerfanos().
+"""
+import hashlib
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import ArchivoBlob, CargaAdjunto
+
+DIRECTORIO_BLOBS = 'blobs'
+DIRECTORIO_TEMPORAL = os.path.join(DIRECTORIO_BLOBS, 'tmp')
+
+
+def ruta_absoluta(ruta_relativa):
+    """Ruta en disco a partir de una ruta relativa a MEDIA_ROOT."""
+    return os.path.join(settings.MEDIA_ROOT, ruta_relativa)
+
+
+def archivo_temporal():
+    """
+    Crea un archivo temporal dentro de MEDIA_ROOT (mismo sistema de archivos que
+    los blobs, así os.replace() es atómico). Returns: objeto archivo abierto 'wb'.
+    """
+    directorio = ruta_absoluta(DIRECTORIO_TEMPORAL)
+    os.makedirs(directorio, exist_ok=True)
+    return tempfile.NamedTemporaryFile(dir=directorio, delete=False)
+
+
+def registrar_blob(ruta_temporal, sha256, tamaño):
+    """
+    Registra el contenido de un archivo temporal ya hasheado.
+    Si el hash ya existe se descarta el temporal y se suma una referencia;
+    si no, el temporal se mueve a su ruta definitiva.
+    Returns: ArchivoBlob
+    """
+    with transaction.atomic():
+        blob, creado = ArchivoBlob.objects.select_for_update().get_or_create(
+            sha256=sha256,
+            defaults={'tamaño_bytes': tamaño, 'referencias': 1},
+        )
+        destino = ruta_absoluta(blob.ruta)
+        if creado or not os.path.exists(destino):
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            os.replace(ruta_temporal, destino)
+        else:
+            os.remove(ruta_temporal)
+        if not creado:
+            ArchivoBlob.objects.filter(pk=sha256).update(referencias=F('referencias') + 1)
+            blob.refresh_from_db(fields=['referencias'])
+    return blob
+
+
+def guardar_blob(archivo):
+    """
+    Guarda un archivo subido (UploadedFile) calculando el SHA-256 mientras se
+    escriben los chunks, sin una segunda lectura. Returns: ArchivoBlob
+    """
+    sha256 = hashlib.sha256()
+    tamaño = 0
+    with archivo_temporal() as destino:
+        for chunk in archivo.chunks():
+            sha256.update(chunk)
+            destino.write(chunk)
+            tamaño += len(chunk)
+    try:
+        return registrar_blob(destino.name, sha256.hexdigest(), tamaño)
+    except Exception:
+        if os.path.exists(destino.name):
+            os.remove(destino.name)
+        raise
+
+
+def liberar_blob(blob):
+    """Resta una referencia al contenido (el archivo se borra con limpiar_blobs)."""
+    ArchivoBlob.objects.filter(pk=blob.pk, referencias__gt=0).update(
+        referencias=F('referencias') - 1
+    )
+
+
+def archivos_huerfanos(horas):
+    """
+    Archivos de MEDIA_ROOT/blobs sin cambios en las últimas `horas` horas que
+    nada registra: contenidos (y sus miniaturas) sin ArchivoBlob, por ejemplo
+    de una transacción revertida, y temporales que no son de ninguna
+    CargaAdjunto. La antigüedad mínima evita tocar archivos de transacciones
+    todavía en curso. Returns: rutas relativas a MEDIA_ROOT, ordenadas.
+    """
+    limite = time.time() - horas * 3600
+    temporales = set(CargaAdjunto.objects.values_list('ruta_temporal', flat=True))
+    por_hash = {}
+    huerfanos = []
+    for directorio, _, nombres in os.walk(ruta_absoluta(DIRECTORIO_BLOBS)):
+        for nombre in nombres:
+            ruta = os.path.join(directorio, nombre)
+            try:
+                if os.path.getmtime(ruta) >= limite:
+                    continue
+            except FileNotFoundError:
+                continue
+            relativa = os.path.relpath(ruta, settings.MEDIA_ROOT)
+            if os.path.dirname(relativa) == DIRECTORIO_TEMPORAL:
+                if relativa not in temporales:
+                    huerfanos.append(relativa)
+            else:
+                # {hash}, {hash}.miniatura.png, {hash}.vista.png
+                por_hash.setdefault(nombre.split('.')[0], []).append(relativa)
+    hashes = list(por_hash)
+    registrados = set()
+    for inicio in range(0, len(hashes), 1000):
+        registrados.update(
+            ArchivoBlob.objects.filter(sha256__in=hashes[inicio:inicio + 1000])
+            .values_list('sha256', flat=True)
+        )
+    for sha256, rutas in por_hash.items():
+        if sha256 not in registrados:
+            huerfanos.extend(rutas)
+    return sorted(huerfanos)
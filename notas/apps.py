@@ -4,4 +4,10 @@ from django.apps import AppConfig
 class NotasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notas'
-    verbose_name = 'Notas'
\ No newline at end of file
+    verbose_name = 'Notas'
+
+    def ready(self):
+        # Registra las tareas de la cola de trabajos (notas/trabajos.py).
+        from . import consultas_lentas, miniaturas, notificaciones  # noqa: F401
+
+        consultas_lentas.instalar()
@@ -0,0 +1,132 @@
+"""
+Archivo frío de notas ARCHIVADAS.
+
+Las notas archivadas hace más de N meses no vuelven a modificarse, pero siguen
+ocupando notas_nota, notas_historialnota y notas_adjunto (índices y seq scans).
+archivar_nota() las mueve a NotaArchivada con su historial, adjuntos y
+relaciones; restaurar_nota() las devuelve a las tablas activas con los mismos ids.
+Los archivos en disco no se mueven: solo cambian de tabla las filas.
+
+Los mails enviados y recibidos de la nota (MODELOS_VINCULADOS) se quedan en sus
+tablas: al borrar la nota su FK pasa a NULL, el archivo guarda cuáles eran y
+restaurar_nota() los vuelve a vincular, así las respuestas siguen asociándose
+por hilo.
+"""
+import json
+from datetime import date, datetime, time
+
+from django.core import serializers as django_serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import (
+    Adjunto,
+    DistribucionResolucion,
+    EstadoChoices,
+    HistorialNota,
+    MailNota,
+    MailRecibido,
+    Nota,
+    NotaAgente,
+    NotaArchivada,
+)
+from .particiones import sumar_meses
+
+# Filas con FK a la nota (on_delete=SET_NULL) que no se archivan, solo se revinculan.
+MODELOS_VINCULADOS = (MailNota, MailRecibido)
+
+
+def notas_archivables(meses):
+    """
+    Notas ARCHIVADAS sin cambios desde hace más de `meses` meses.
+
+    Solo se consideran notas creadas antes del año en curso: la numeración interna
+    cuenta las notas del año en notas_nota, y mover notas del año actual
+    provocaría números repetidos. Se excluyen las notas vinculadas a legajos
+    (DocumentoLegajo protege la nota y el adjunto; LegajoDocumento perdería el vínculo).
+    """
+    ahora = timezone.localtime()
+    año, mes = sumar_meses(ahora.year, ahora.month, -meses)
+    limite = ahora.replace(year=año, month=mes, day=min(ahora.day, 28))
+    inicio_año = timezone.make_aware(datetime(ahora.year, 1, 1))
+    return (
+        Nota.objects.filter(
+            estado=EstadoChoices.ARCHIVADA,
+            ultima_modificacion__lt=limite,
+            fecha_creacion__lt=inicio_año,
+        )
+        .exclude(documentos_legajo_virtual__isnull=False)
+        .exclude(documentos_legajo__isnull=False)
+        .order_by("id")
+    )
+
+
+def _a_json(data):
+    """Convierte la salida de un serializer DRF a tipos JSON nativos."""
+    return json.loads(JSONRenderer().render(data))
+
+
+def _valor_json(valor):
+    """
+    Codifica fechas con precisión completa (DjangoJSONEncoder trunca a milisegundos
+    y alteraría el orden del historial al restaurar).
+    """
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    return DjangoJSONEncoder().default(valor)
+
+
+@transaction.atomic
+def archivar_nota(nota):
+    """Mueve una nota (y sus filas dependientes) al archivo frío."""
+    from .serializers import NotaDetalleSerializer, NotaListSerializer
+
+    historial = list(HistorialNota.objects.filter(nota=nota))
+    adjuntos = list(Adjunto.objects.filter(nota=nota))
+    agentes = list(NotaAgente.objects.filter(nota=nota))
+    distribuciones = list(DistribucionResolucion.objects.filter(nota=nota))
+    vinculados = [
+        objeto for modelo in MODELOS_VINCULADOS for objeto in modelo.objects.filter(nota=nota)
+    ]
+    registros = django_serializers.serialize(
+        "python", [nota] + agentes + historial + adjuntos + distribuciones + vinculados
+    )
+
+    archivada = NotaArchivada.objects.create(
+        id=nota.pk,
+        numero_nota=nota.numero_nota,
+        tema=nota.tema,
+        tarea_asignada=nota.tarea_asignada,
+        remitente=nota.remitente,
+        prioridad=nota.prioridad,
+        fecha_ingreso=nota.fecha_ingreso,
+        responsable_id=nota.responsable_id,
+        creado_por_id=nota.creado_por_id,
+        resumen=_a_json(NotaListSerializer(nota).data),
+        detalle=_a_json(NotaDetalleSerializer(nota).data),
+        registros=json.loads(json.dumps(registros, default=_valor_json)),
+    )
+    # El borrado en cascada elimina historial, adjuntos, agentes y distribuciones;
+    # los mails quedan sin nota hasta que se restaure.
+    nota.delete()
+    return archivada
+
+
+@transaction.atomic
+def restaurar_nota(archivada):
+    """Devuelve una nota archivada a las tablas activas con sus ids originales."""
+    nota_id = archivada.pk
+    objetos = django_serializers.deserialize("python", archivada.registros)
+    for objeto in objetos:
+        if isinstance(objeto.object, MODELOS_VINCULADOS):
+            # Siguen en su tabla (y pudieron cambiar de estado): solo se revinculan.
+            type(objeto.object).objects.filter(pk=objeto.object.pk, nota__isnull=True).update(
+                nota_id=nota_id
+            )
+            continue
+        # save() de un objeto deserializado es "raw": conserva fechas auto_now/auto_now_add.
+        objeto.save()
+    archivada.delete()
+    return Nota.objects.get(pk=nota_id)
@@ -0,0 +1,200 @@
+"""
+Subida de adjuntos por partes (reanudable).
+
+Protocolo:
+1. POST /api/notas/{id}/adjuntos/cargas/ con nombre_archivo, tamaño_bytes y,
+   opcionalmente, sha256 del archivo completo -> crea la CargaAdjunto.
+2. PUT /api/cargas-adjuntos/{carga}/ con el contenido crudo de una parte y
+   Content-Range: bytes {inicio}-{fin}/{total}. Las partes se envían en orden;
+   si la conexión se corta, GET /api/cargas-adjuntos/{carga}/ informa `recibidos`
+   y la subida continúa desde ese offset.
+3. POST /api/cargas-adjuntos/{carga}/completar/ -> verifica el SHA-256 y crea el Adjunto.
+
+Cada parte se copia del socket al archivo temporal en bloques de TAMAÑO_BLOQUE:
+la memoria usada no depende del tamaño del archivo.
+"""
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.http import UnreadablePostError
+from django.utils import timezone
+
+from .almacenamiento import archivo_temporal, registrar_blob, ruta_absoluta
+from .miniaturas import programar_miniaturas
+from .models import Adjunto, CargaAdjunto
+
+TAMAÑO_BLOQUE = 64 * 1024
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+class ErrorCarga(Exception):
+    """Error de protocolo de la subida por partes; `status` es el código HTTP."""
+
+    def __init__(self, mensaje, status=400, recibidos=None):
+        super().__init__(mensaje)
+        self.status = status
+        self.recibidos = recibidos
+
+
+def tamaño_maximo():
+    return getattr(settings, 'ADJUNTOS_TAMAÑO_MAXIMO', 1024 * 1024 * 1024)
+
+
+def iniciar_carga(nota, usuario, nombre_archivo, tamaño_bytes, tipo_mime='',
+                  tipo_adjunto=None, sha256=''):
+    """Crea la sesión de subida y su archivo temporal vacío. Returns: CargaAdjunto"""
+    if tamaño_bytes > tamaño_maximo():
+        raise ErrorCarga('El archivo supera el tamaño máximo permitido', status=413)
+    with archivo_temporal() as temporal:
+        pass
+    datos = {}
+    if tipo_adjunto:
+        datos['tipo_adjunto'] = tipo_adjunto
+    return CargaAdjunto.objects.create(
+        nota=nota,
+        usuario=usuario,
+        nombre_archivo=nombre_archivo,
+        tipo_mime=tipo_mime or 'application/octet-stream',
+        tamaño_bytes=tamaño_bytes,
+        sha256=sha256.lower(),
+        ruta_temporal=os.path.relpath(temporal.name, settings.MEDIA_ROOT),
+        **datos,
+    )
+
+
+def parsear_content_range(encabezado):
+    """'bytes 0-1048575/5000000' -> (inicio, fin, total|None)."""
+    coincidencia = _CONTENT_RANGE.match((encabezado or '').strip())
+    if not coincidencia:
+        raise ErrorCarga('Content-Range inválido (formato: bytes inicio-fin/total)')
+    inicio, fin, total = coincidencia.groups()
+    inicio, fin = int(inicio), int(fin)
+    if fin < inicio:
+        raise ErrorCarga('Content-Range inválido')
+    return inicio, fin, None if total == '*' else int(total)
+
+
+def escribir_parte(carga, flujo, content_range, sha256_parte=''):
+    """
+    Escribe una parte en el archivo temporal leyendo `flujo` por bloques.
+    La parte debe empezar exactamente en `carga.recibidos` (409 si no).
+    Si la conexión se corta, se conserva lo recibido para reanudar desde ahí.
+    Con `sha256_parte` se verifica la parte y, si no coincide, se descarta.
+    Returns: bytes recibidos en total.
+    """
+    inicio, fin, total = parsear_content_range(content_range)
+    if flujo is None:
+        raise ErrorCarga('La parte no tiene contenido (falta Content-Length)', status=411)
+    if total is not None and total != carga.tamaño_bytes:
+        raise ErrorCarga('El total no coincide con el tamaño declarado')
+    if fin >= carga.tamaño_bytes:
+        raise ErrorCarga('La parte excede el tamaño declarado', status=416)
+    if inicio != carga.recibidos:
+        raise ErrorCarga(
+            'La parte no empieza en el offset esperado', status=409, recibidos=carga.recibidos
+        )
+
+    pendiente = fin - inicio + 1
+    hash_parte = hashlib.sha256()
+    escritos = 0
+    with open(ruta_absoluta(carga.ruta_temporal), 'r+b') as destino:
+        destino.seek(inicio)
+        try:
+            while pendiente > 0:
+                bloque = flujo.read(min(TAMAÑO_BLOQUE, pendiente))
+                if not bloque:
+                    break
+                hash_parte.update(bloque)
+                destino.write(bloque)
+                escritos += len(bloque)
+                pendiente -= len(bloque)
+        except UnreadablePostError:
+            pass
+
+    if sha256_parte and (pendiente or hash_parte.hexdigest() != sha256_parte.lower()):
+        raise ErrorCarga(
+            'El SHA-256 de la parte no coincide', status=422, recibidos=carga.recibidos
+        )
+
+    # Update condicional: si otra petición avanzó el offset, esta parte se descarta.
+    actualizadas = CargaAdjunto.objects.filter(pk=carga.pk, recibidos=inicio).update(
+        recibidos=inicio + escritos, ultima_actividad=timezone.now()
+    )
+    if not actualizadas:
+        carga.refresh_from_db(fields=['recibidos'])
+        raise ErrorCarga(
+            'La subida avanzó desde otra petición', status=409, recibidos=carga.recibidos
+        )
+    carga.recibidos = inicio + escritos
+    if pendiente:
+        raise ErrorCarga('Parte incompleta', recibidos=carga.recibidos)
+    return carga.recibidos
+
+
+def _sha256_archivo(ruta, tamaño):
+    sha256 = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        while tamaño > 0:
+            bloque = archivo.read(min(TAMAÑO_BLOQUE, tamaño))
+            if not bloque:
+                break
+            sha256.update(bloque)
+            tamaño -= len(bloque)
+    return sha256.hexdigest()
+
+
+def completar_carga(carga, subido_por):
+    """
+    Verifica que el archivo esté completo y su SHA-256, lo registra en el
+    almacenamiento por hash y crea el Adjunto. La carga se bloquea durante
+    todo el proceso: un reintento de completar/ espera al primero y después
+    recibe 404 (la carga ya no existe). Returns: Adjunto
+    """
+    with transaction.atomic():
+        carga = CargaAdjunto.objects.select_for_update().filter(pk=carga.pk).first()
+        if carga is None:
+            raise ErrorCarga('La subida ya se completó o fue cancelada', status=404)
+        if carga.recibidos != carga.tamaño_bytes:
+            raise ErrorCarga(
+                'La subida no está completa', status=409, recibidos=carga.recibidos
+            )
+        ruta = ruta_absoluta(carga.ruta_temporal)
+        # Descarta restos de una parte interrumpida que hubieran quedado más allá del total.
+        os.truncate(ruta, carga.tamaño_bytes)
+        sha256 = _sha256_archivo(ruta, carga.tamaño_bytes)
+        if carga.sha256 and sha256 != carga.sha256:
+            raise ErrorCarga('El SHA-256 del archivo no coincide', status=422)
+
+        blob = registrar_blob(ruta, sha256, carga.tamaño_bytes)
+        adjunto = Adjunto.objects.create(
+            nota_id=carga.nota_id,
+            nombre_archivo=carga.nombre_archivo,
+            ruta_almacenamiento=blob.ruta,
+            blob=blob,
+            tipo_mime=carga.tipo_mime,
+            tamaño_bytes=blob.tamaño_bytes,
+            tipo_adjunto=carga.tipo_adjunto,
+            subido_por=subido_por,
+        )
+        programar_miniaturas(adjunto)
+        carga.delete()
+    return adjunto
+
+
+def cancelar_carga(carga):
+    """Elimina la sesión de subida y su archivo temporal."""
+    ruta = ruta_absoluta(carga.ruta_temporal)
+    carga.delete()
+    if os.path.exists(ruta):
+        os.remove(ruta)
+
+
+def cargas_vencidas(horas):
+    """Subidas sin actividad en las últimas `horas` horas."""
+    return CargaAdjunto.objects.filter(
+        ultima_actividad__lt=timezone.now() - timedelta(hours=horas)
+    )
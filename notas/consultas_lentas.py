@@ -0,0 +1,132 @@
+"""
+Registro de consultas lentas.
+
+Toda consulta que supere CONSULTAS_LENTAS_UMBRAL_MS se registra en el logger
+'notas.consultas_lentas' con la vista que la originó y la pila de llamadas del
+proyecto. Una muestra (CONSULTAS_LENTAS_MUESTREO) de los SELECT lentos en
+PostgreSQL se encola para que procesar_jobs obtenga su plan con
+EXPLAIN (ANALYZE, BUFFERS) y lo guarde en ConsultaLenta (visible en el admin).
+
+El EXPLAIN ANALYZE vuelve a ejecutar la consulta: se hace fuera de la petición,
+en una transacción que se revierte y con statement_timeout.
+"""
+import logging
+import random
+import time
+import traceback
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.backends.signals import connection_created
+
+from config.metricas import nombre_vista
+
+from .models import ConsultaLenta
+from .trabajos import encolar, tarea
+
+logger = logging.getLogger(__name__)
+
+LINEAS_PILA = 12  # frames del proyecto que se guardan
+TIEMPO_MAXIMO_EXPLAIN = 60  # segundos
+
+peticion_actual = ContextVar('peticion_actual', default=None)
+# Evita registrar las consultas que hace el propio registro (encolar, EXPLAIN).
+_registrando = ContextVar('registrando_consulta_lenta', default=False)
+
+
+def _pila():
+    raiz = str(settings.BASE_DIR)
+    frames = [
+        f for f in traceback.extract_stack()[:-3]
+        if f.filename.startswith(raiz) and 'site-packages' not in f.filename
+    ]
+    return ''.join(traceback.format_list(frames[-LINEAS_PILA:]))
+
+
+def _vista():
+    peticion = peticion_actual.get()
+    if peticion is None:
+        return ''
+    if getattr(peticion, 'resolver_match', None) is None:
+        # Consultas de los middlewares (sesión, usuario) antes de resolver la URL.
+        return peticion.path
+    return nombre_vista(peticion)
+
+
+def _registrar(sql, params, many, conexion, duracion_ms):
+    vista = _vista()
+    pila = _pila()
+    logger.warning(
+        "Consulta lenta (%.0f ms) en %s [%s]: %s\n%s",
+        duracion_ms, vista or '-', conexion.alias, sql, pila,
+    )
+    if (
+        many
+        or conexion.vendor != 'postgresql'
+        or not sql.lstrip()[:6].upper() == 'SELECT'
+        or random.random() >= settings.CONSULTAS_LENTAS_MUESTREO
+    ):
+        return
+    # Savepoint: si no se puede encolar, la transacción de la petición sigue sana.
+    with transaction.atomic():
+        encolar(
+            'explicar_consulta',
+            max_intentos=1,
+            base=conexion.alias,
+            sql=conexion.ops.compose_sql(sql, params),
+            vista=vista,
+            duracion_ms=duracion_ms,
+            pila=pila,
+        )
+
+
+def medir_consulta(execute, sql, params, many, context):
+    if _registrando.get():
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    resultado = execute(sql, params, many, context)
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    if duracion_ms >= settings.CONSULTAS_LENTAS_UMBRAL_MS:
+        token = _registrando.set(True)
+        try:
+            _registrar(sql, params, many, context['connection'], duracion_ms)
+        except Exception:
+            logger.exception("No se pudo registrar la consulta lenta")
+        finally:
+            _registrando.reset(token)
+    return resultado
+
+
+def _instalar_en_conexion(sender, connection, **kwargs):
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+def instalar():
+    """Activa el registro en todas las conexiones (NotasConfig.ready)."""
+    if settings.CONSULTAS_LENTAS_UMBRAL_MS > 0:
+        connection_created.connect(_instalar_en_conexion, dispatch_uid='consultas_lentas')
+
+
+@tarea('explicar_consulta')
+def explicar_consulta(base, sql, vista, duracion_ms, pila):
+    """Guarda el plan real de una consulta lenta en el buffer circular ConsultaLenta."""
+    if base not in connections:
+        base = 'default'
+    token = _registrando.set(True)
+    try:
+        with transaction.atomic(using=base):
+            with connections[base].cursor() as cursor:
+                cursor.execute(f'SET LOCAL statement_timeout = {TIEMPO_MAXIMO_EXPLAIN * 1000}')
+                cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {sql}')
+                plan = '\n'.join(fila[0] for fila in cursor.fetchall())
+            transaction.set_rollback(True, using=base)
+    except DatabaseError as e:
+        plan = f'No se pudo obtener el plan: {e}'
+    finally:
+        _registrando.reset(token)
+    consulta = ConsultaLenta.objects.create(
+        vista=vista[:200], base=base, duracion_ms=duracion_ms, sql=sql, pila=pila, plan=plan
+    )
+    ConsultaLenta.objects.filter(id__lte=consulta.id - settings.CONSULTAS_LENTAS_MAXIMO).delete()
@@ -0,0 +1,349 @@
+"""
+Correo entrante: respuestas por mail que se asocian a las notas.
+
+El comando sincronizar_correo lee la carpeta IMAP de forma incremental: BuzonCorreo
+guarda UIDVALIDITY y el último UID procesado, y cada vuelta solo pide los mensajes
+con UID mayor (nunca se vuelve a descargar la carpeta entera). Entre vueltas usa
+IDLE si el servidor lo soporta (ver idle()), así los mails nuevos llegan sin sondeo.
+
+Cada mensaje se asocia a una nota por:
+1. Hilo: In-Reply-To / References apuntan a un mail enviado (MailNota) o a un
+   mail recibido ya asociado.
+2. Asunto: contiene un número de nota existente (ej. "Nota 138-I12-2025 resuelta").
+
+Cada mensaje se descarga y se parsea entero en memoria (de a uno, hasta
+IMAP_TAMAÑO_MAXIMO; los más grandes se omiten). Sus adjuntos se guardan en el
+almacenamiento por hash y se registra el evento RESPUESTA_EMAIL en el historial.
+"""
+import hashlib
+import imaplib
+import logging
+import os
+import re
+import select
+import time
+from email import policy
+from email.parser import BytesParser
+from email.utils import parseaddr, parsedate_to_datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .almacenamiento import archivo_temporal, registrar_blob
+from .miniaturas import programar_miniaturas
+from .models import (
+    Adjunto,
+    BuzonCorreo,
+    MailNota,
+    MailRecibido,
+    Nota,
+    TipoEventoChoices,
+)
+from .utils import crear_registro_historial
+
+logger = logging.getLogger(__name__)
+
+LARGO_MAXIMO_CUERPO = 100_000
+# RFC 2177: el servidor puede cortar un IDLE a los 30 minutos.
+TIEMPO_MAXIMO_IDLE = 29 * 60
+
+# "Nota 138-I12-2025", "Nota N° 45/2025" o un número con formato {sector}-{numero}-{año}.
+_NUMERO_EN_ASUNTO = re.compile(
+    r'\bNota\s+(?:N[°º.]?\s*)?([\w][\w./-]*\w)|\b(\d+-I?\d+-\d{4})\b', re.IGNORECASE
+)
+_MESSAGE_ID = re.compile(r'<[^<>\s]+>')
+_FETCH_UID = re.compile(rb'UID (\d+)')
+_FETCH_TAMAÑO = re.compile(rb'RFC822\.SIZE (\d+)')
+
+
+class ErrorCorreo(Exception):
+    """Error de comunicación con el servidor IMAP."""
+
+
+def _ids_referenciados(mensaje):
+    ids = []
+    for encabezado in ('In-Reply-To', 'References'):
+        for valor in mensaje.get_all(encabezado, []):
+            ids.extend(_MESSAGE_ID.findall(str(valor)))
+    return list(dict.fromkeys(ids))
+
+
+def buscar_nota(mensaje):
+    """Nota a la que responde el mensaje, o None. Primero por hilo y después por asunto."""
+    ids = _ids_referenciados(mensaje)
+    if ids:
+        for modelo in (MailNota, MailRecibido):
+            nota_id = (
+                modelo.objects.filter(message_id__in=ids, nota__isnull=False)
+                .values_list('nota_id', flat=True)
+                .first()
+            )
+            if nota_id:
+                return Nota.objects.filter(pk=nota_id).first()
+    numeros = {
+        numero
+        for grupos in _NUMERO_EN_ASUNTO.findall(str(mensaje.get('Subject', '')))
+        for numero in grupos
+        if numero
+    }
+    if numeros:
+        return Nota.objects.filter(numero_nota__in=numeros).order_by('-id').first()
+    return None
+
+
+def _escribir_contenido(parte, destino):
+    """
+    Escribe en `destino` el contenido decodificado de una parte MIME.
+    El email parser ya tiene la parte completa en memoria; se decodifica una sola vez.
+    Returns: hash, tamaño.
+    """
+    contenido = parte.get_payload(decode=True) or b''
+    destino.write(contenido)
+    return hashlib.sha256(contenido).hexdigest(), len(contenido)
+
+
+def guardar_adjuntos(mensaje, nota):
+    """Crea un Adjunto de la nota por cada archivo adjunto del mensaje. Returns: lista."""
+    adjuntos = []
+    for parte in mensaje.iter_attachments():
+        if parte.is_multipart():
+            continue
+        nombre = parte.get_filename() or 'adjunto'
+        with archivo_temporal() as destino:
+            sha256, tamaño = _escribir_contenido(parte, destino)
+        try:
+            blob = registrar_blob(destino.name, sha256, tamaño)
+        except Exception:
+            if os.path.exists(destino.name):
+                os.remove(destino.name)
+            raise
+        adjunto = Adjunto.objects.create(
+            nota=nota,
+            nombre_archivo=os.path.basename(nombre)[:255],
+            ruta_almacenamiento=blob.ruta,
+            blob=blob,
+            tipo_mime=parte.get_content_type(),
+            tamaño_bytes=tamaño,
+        )
+        programar_miniaturas(adjunto)
+        adjuntos.append(adjunto)
+    return adjuntos
+
+
+def _texto(mensaje):
+    cuerpo = mensaje.get_body(preferencelist=('plain', 'html'))
+    if cuerpo is None:
+        return ''
+    try:
+        return cuerpo.get_content()[:LARGO_MAXIMO_CUERPO]
+    except (LookupError, ValueError):
+        return ''
+
+
+def _fecha(mensaje):
+    try:
+        fecha = parsedate_to_datetime(str(mensaje['Date']))
+    except (TypeError, ValueError):
+        return None
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha, timezone.get_default_timezone())
+    return fecha
+
+
+def procesar_mensaje(buzon, uid, crudo):
+    """
+    Registra un mensaje recibido y, si corresponde a una nota, guarda sus
+    adjuntos y el evento en el historial. La marca del buzón avanza en la misma
+    transacción: un corte a mitad de camino no pierde ni duplica mensajes.
+    Returns: MailRecibido, o None si ya se había procesado.
+    """
+    mensaje = BytesParser(policy=policy.default).parsebytes(crudo)
+    message_id = (_MESSAGE_ID.findall(str(mensaje.get('Message-ID', ''))) or [None])[0]
+    if message_id is None:
+        message_id = f'<{buzon.uidvalidity}.{uid}@{buzon.servidor}>'
+    with transaction.atomic():
+        BuzonCorreo.objects.filter(pk=buzon.pk).update(ultimo_uid=uid)
+        # Tras un cambio de UIDVALIDITY se releen mensajes que ya estaban registrados.
+        if MailRecibido.objects.filter(message_id=message_id[:255]).exists():
+            buzon.ultimo_uid = uid
+            return None
+        nota = buscar_nota(mensaje)
+        nombre, direccion = parseaddr(str(mensaje.get('From', '')))
+        mail = MailRecibido.objects.create(
+            buzon=buzon,
+            uid=uid,
+            message_id=message_id[:255],
+            in_reply_to=(_MESSAGE_ID.findall(str(mensaje.get('In-Reply-To', ''))) or [''])[0][:255],
+            nota=nota,
+            remitente=(direccion or nombre)[:255],
+            asunto=str(mensaje.get('Subject', ''))[:255],
+            cuerpo=_texto(mensaje),
+            fecha=_fecha(mensaje),
+        )
+        if nota is not None:
+            adjuntos = guardar_adjuntos(mensaje, nota)
+            descripcion = f'Respuesta por mail de {mail.remitente}: {mail.asunto}'
+            if adjuntos:
+                descripcion += f' ({len(adjuntos)} adjunto(s))'
+            crear_registro_historial(
+                nota,
+                None,
+                TipoEventoChoices.RESPUESTA_EMAIL,
+                descripcion_cambio=descripcion,
+            )
+    buzon.ultimo_uid = uid
+    return mail
+
+
+def idle(conexion, segundos):
+    """
+    IDLE (RFC 2177) hasta `segundos`: vuelve apenas el servidor avisa EXISTS.
+
+    Usa IMAP4.idle() si existe (Python 3.14+). En versiones anteriores imaplib
+    no tiene IDLE y el comando se envía a mano; para eso hace falta la API
+    privada conexion._new_tag() (la etiqueta que imaplib espera en la respuesta
+    final), que imaplib no cambió en años pero no está documentada. Este es el
+    único lugar que depende de ella.
+    """
+    if hasattr(conexion, 'idle'):
+        with conexion.idle(duration=segundos) as respuestas:
+            for tipo, _ in respuestas:
+                if tipo == 'EXISTS':
+                    break
+        return
+    etiqueta = conexion._new_tag()
+    conexion.send(etiqueta + b' IDLE\r\n')
+    respuesta = conexion.readline()
+    if not respuesta.startswith(b'+'):
+        raise ErrorCorreo(f'IDLE rechazado: {respuesta!r}')
+    limite = time.monotonic() + segundos
+    while (restante := limite - time.monotonic()) > 0:
+        pendiente = getattr(conexion.sock, 'pending', lambda: 0)()
+        if not pendiente and not select.select([conexion.sock], [], [], restante)[0]:
+            break
+        linea = conexion.readline()
+        if not linea:
+            raise ErrorCorreo('El servidor cerró la conexión')
+        if linea.rstrip().upper().endswith(b'EXISTS'):
+            break
+    conexion.send(b'DONE\r\n')
+    while True:
+        linea = conexion.readline()
+        if not linea:
+            raise ErrorCorreo('El servidor cerró la conexión')
+        if linea.startswith(etiqueta):
+            break
+
+
+class SincronizadorImap:
+    """Conexión IMAP a una carpeta y su marca de sincronización (BuzonCorreo)."""
+
+    def __init__(self, host=None, puerto=None, usuario=None, password=None,
+                 carpeta=None, ssl=None):
+        self.host = host or settings.IMAP_HOST
+        self.puerto = puerto or settings.IMAP_PORT
+        self.usuario = usuario or settings.IMAP_USUARIO
+        self.password = password if password is not None else settings.IMAP_PASSWORD
+        self.carpeta = carpeta or settings.IMAP_CARPETA
+        self.ssl = settings.IMAP_SSL if ssl is None else ssl
+        self.conexion = None
+        self.buzon, _ = BuzonCorreo.objects.get_or_create(
+            servidor=self.host, usuario=self.usuario, carpeta=self.carpeta
+        )
+
+    def conectar(self):
+        clase = imaplib.IMAP4_SSL if self.ssl else imaplib.IMAP4
+        self.conexion = clase(self.host, self.puerto, timeout=60)
+        self.conexion.login(self.usuario, self.password)
+        estado, _ = self.conexion.select(self.carpeta, readonly=True)
+        if estado != 'OK':
+            raise ErrorCorreo(f'No se pudo abrir la carpeta {self.carpeta}')
+        _, datos = self.conexion.response('UIDVALIDITY')
+        uidvalidity = int(datos[0]) if datos and datos[0] else None
+        if uidvalidity != self.buzon.uidvalidity:
+            # Los UID anteriores ya no identifican los mismos mensajes: se relee la
+            # carpeta y procesar_mensaje descarta los ya registrados por Message-ID.
+            if self.buzon.uidvalidity is not None:
+                logger.warning(
+                    'UIDVALIDITY de %s cambió (%s -> %s): se relee la carpeta',
+                    self.buzon, self.buzon.uidvalidity, uidvalidity,
+                )
+            self.buzon.uidvalidity = uidvalidity
+            self.buzon.ultimo_uid = 0
+            self.buzon.save(update_fields=['uidvalidity', 'ultimo_uid'])
+
+    def desconectar(self):
+        if self.conexion is None:
+            return
+        try:
+            self.conexion.logout()
+        except (imaplib.IMAP4.error, OSError):
+            pass
+        self.conexion = None
+
+    def _comando(self, *args):
+        estado, datos = self.conexion.uid(*args)
+        if estado != 'OK':
+            raise ErrorCorreo(f'{args[0]} falló: {datos}')
+        return datos
+
+    def mensajes_nuevos(self):
+        """UID y tamaño de los mensajes posteriores a la marca. Returns: [(uid, tamaño)]"""
+        datos = self._comando('FETCH', f'{self.buzon.ultimo_uid + 1}:*', '(UID RFC822.SIZE)')
+        nuevos = []
+        for linea in datos:
+            if isinstance(linea, tuple):
+                linea = linea[0]
+            if not linea:
+                continue
+            uid = _FETCH_UID.search(linea)
+            tamaño = _FETCH_TAMAÑO.search(linea)
+            # "n:*" devuelve el último mensaje aunque su UID sea menor que n.
+            if uid and int(uid.group(1)) > self.buzon.ultimo_uid:
+                nuevos.append((int(uid.group(1)), int(tamaño.group(1)) if tamaño else 0))
+        return sorted(nuevos)
+
+    def sincronizar(self):
+        """
+        Descarga y procesa los mensajes nuevos de a uno (la memoria depende del
+        mensaje más grande, no de la carpeta). Returns: (procesados, asociados).
+        """
+        procesados = asociados = 0
+        for uid, tamaño in self.mensajes_nuevos():
+            if tamaño > settings.IMAP_TAMAÑO_MAXIMO:
+                logger.warning('Mail UID %s omitido: %s bytes supera el máximo', uid, tamaño)
+                self._omitir(uid)
+                continue
+            datos = self._comando('FETCH', str(uid), '(BODY.PEEK[])')
+            crudo = next((d[1] for d in datos if isinstance(d, tuple)), None)
+            if crudo is None:
+                # Se borró entre el listado y la descarga: no se vuelve a pedir.
+                logger.warning('Mail UID %s omitido: el servidor no devolvió el contenido', uid)
+                self._omitir(uid)
+                continue
+            mail = procesar_mensaje(self.buzon, uid, crudo)
+            if mail is None:
+                continue
+            procesados += 1
+            asociados += bool(mail.nota_id)
+        BuzonCorreo.objects.filter(pk=self.buzon.pk).update(ultima_sincronizacion=timezone.now())
+        return procesados, asociados
+
+    def _omitir(self, uid):
+        """Avanza la marca del buzón sin registrar el mensaje."""
+        BuzonCorreo.objects.filter(pk=self.buzon.pk).update(ultimo_uid=uid)
+        self.buzon.ultimo_uid = uid
+
+    def admite_idle(self):
+        return 'IDLE' in self.conexion.capabilities
+
+    def esperar(self, segundos):
+        """
+        Espera mensajes nuevos hasta `segundos`: con IDLE (RFC 2177) vuelve apenas
+        el servidor avisa EXISTS; sin IDLE simplemente duerme.
+        """
+        if not self.admite_idle():
+            time.sleep(segundos)
+            return
+        idle(self.conexion, min(segundos, TIEMPO_MAXIMO_IDLE))
@@ -0,0 +1,156 @@
+"""
+Respuestas de descarga de adjuntos.
+
+Con ADJUNTOS_X_ACCEL_PREFIX configurado, Django solo valida permisos y Nginx
+transfiere el archivo (X-Accel-Redirect), incluyendo rangos y sendfile.
+Sin Nginx (desarrollo), se sirve con FileResponse / StreamingHttpResponse,
+con soporte de Range (un solo rango), ETag y If-None-Match.
+"""
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+from .almacenamiento import ruta_absoluta
+
+TAMAÑO_CHUNK = 64 * 1024
+_RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangoNoSatisfacible(Exception):
+    """El rango pedido queda fuera del archivo (HTTP 416)."""
+
+
+def _etag_archivo(stat):
+    return f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+
+def parsear_rango(encabezado, tamaño):
+    """
+    Interpreta un encabezado Range de un solo rango ('bytes=0-499', 'bytes=500-',
+    'bytes=-500'). Returns: (inicio, fin) inclusivos, o None si no aplica
+    (sin encabezado o varios rangos: se sirve el archivo completo).
+    """
+    if not encabezado:
+        return None
+    coincidencia = _RANGO.match(encabezado.strip())
+    if not coincidencia:
+        return None
+    inicio, fin = coincidencia.groups()
+    if not inicio and not fin:
+        return None
+    if not inicio:
+        largo = int(fin)
+        if largo == 0:
+            raise RangoNoSatisfacible()
+        return max(tamaño - largo, 0), tamaño - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamaño - 1) if fin else tamaño - 1
+    if inicio >= tamaño or inicio > fin:
+        raise RangoNoSatisfacible()
+    return inicio, fin
+
+
+def _leer_rango(ruta, inicio, largo):
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(inicio)
+        while largo > 0:
+            chunk = archivo.read(min(TAMAÑO_CHUNK, largo))
+            if not chunk:
+                break
+            largo -= len(chunk)
+            yield chunk
+
+
+def respuesta_adjunto(request, adjunto, como_descarga=False):
+    """
+    Construye la respuesta HTTP que entrega el archivo del adjunto.
+    El ETag es el hash del contenido si está en el almacenamiento por hash.
+    Returns: None si el archivo no existe en disco.
+    """
+    return respuesta_archivo(
+        request,
+        adjunto.ruta_almacenamiento,
+        adjunto.nombre_archivo,
+        adjunto.tipo_mime,
+        etag=f'"{adjunto.blob_id}"' if adjunto.blob_id else None,
+        como_descarga=como_descarga,
+    )
+
+
+def respuesta_miniatura(request, adjunto, vista_previa=False):
+    """Entrega la miniatura (o la vista previa) PNG del adjunto. Returns: None si no existe."""
+    blob = adjunto.blob
+    if blob is None or not blob.tiene_miniaturas:
+        return None
+    sufijo = 'vista' if vista_previa else 'miniatura'
+    return respuesta_archivo(
+        request,
+        blob.ruta_vista_previa if vista_previa else blob.ruta_miniatura,
+        f'{adjunto.nombre_archivo}.{sufijo}.png',
+        'image/png',
+        etag=f'"{blob.sha256}-{sufijo}"',
+    )
+
+
+def respuesta_archivo(request, ruta_relativa, nombre_archivo, tipo_mime,
+                      etag=None, como_descarga=False):
+    """
+    Entrega un archivo de MEDIA_ROOT. Sin `etag` se usa tamaño y fecha de modificación.
+    Returns: None si el archivo no existe en disco.
+    """
+    ruta = os.path.realpath(ruta_absoluta(ruta_relativa))
+    if not ruta.startswith(os.path.realpath(settings.MEDIA_ROOT) + os.sep):
+        return None
+    try:
+        stat = os.stat(ruta)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+    etag = etag or _etag_archivo(stat)
+    encabezados = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'private, no-cache',
+        'Content-Disposition': content_disposition_header(como_descarga, nombre_archivo),
+    }
+    tipo = tipo_mime or 'application/octet-stream'
+
+    if etag in [e.strip() for e in request.headers.get('If-None-Match', '').split(',')]:
+        respuesta = HttpResponse(status=304)
+        respuesta['ETag'] = etag
+        return respuesta
+
+    prefijo = getattr(settings, 'ADJUNTOS_X_ACCEL_PREFIX', '')
+    if prefijo:
+        respuesta = HttpResponse(content_type=tipo)
+        respuesta['X-Accel-Redirect'] = f"{prefijo.rstrip('/')}/{ruta_relativa}"
+        for nombre, valor in encabezados.items():
+            respuesta[nombre] = valor
+        return respuesta
+
+    try:
+        rango = parsear_rango(request.headers.get('Range'), stat.st_size)
+    except RangoNoSatisfacible:
+        respuesta = HttpResponse(status=416)
+        respuesta['Content-Range'] = f'bytes */{stat.st_size}'
+        return respuesta
+    # If-Range: si el ETag cambió, se entrega el archivo completo
+    if rango and request.headers.get('If-Range', etag) != etag:
+        rango = None
+
+    if rango is None:
+        respuesta = FileResponse(open(ruta, 'rb'), content_type=tipo)
+    else:
+        inicio, fin = rango
+        largo = fin - inicio + 1
+        respuesta = StreamingHttpResponse(
+            _leer_rango(ruta, inicio, largo), status=206, content_type=tipo
+        )
+        respuesta['Content-Length'] = str(largo)
+        respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{stat.st_size}'
+    for nombre, valor in encabezados.items():
+        respuesta[nombre] = valor
+    return respuesta
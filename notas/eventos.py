@@ -0,0 +1,257 @@
+"""
+Stream de eventos en vivo (Server-Sent Events) en /api/eventos/.
+
+Cada fila nueva de HistorialNota se publica con NOTIFY (trigger de la migración
+0011). Cada proceso ASGI mantiene una sola conexión LISTEN, sin importar cuántos
+clientes estén conectados, y reparte los eventos a las colas de los clientes
+según las mismas reglas de visibilidad que NotaViewSet.get_queryset().
+
+Si el cliente se reconecta con Last-Event-ID (el navegador lo envía solo), los
+eventos perdidos se reenvían desde la base. Un cliente que no consume sus
+eventos se desconecta y recupera lo perdido al reconectarse.
+
+Requiere PostgreSQL y un servidor ASGI (ej. uvicorn config.asgi:application).
+Bajo WSGI cada cliente retendría un worker mientras está conectado, así que el
+endpoint responde 501 y el frontend pasa a consultar por intervalos.
+"""
+import asyncio
+import json
+import logging
+
+import psycopg
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .models import HistorialNota
+from .particiones import es_postgresql
+
+logger = logging.getLogger(__name__)
+
+CANAL = 'notas_historial'
+INTERVALO_LATIDO = 15  # segundos entre comentarios keep-alive
+ESPERA_RECONEXION = 5  # segundos antes de reabrir el LISTEN tras un error
+TAMAÑO_COLA = 200  # eventos pendientes por cliente antes de desconectarlo
+MAXIMO_REENVIO = 500  # eventos reenviados por Last-Event-ID
+
+
+class Suscripcion:
+    """Cola de eventos de un cliente conectado."""
+
+    def __init__(self):
+        self.cola = asyncio.Queue(TAMAÑO_COLA)
+        self.desbordada = False
+
+    def entregar(self, evento):
+        try:
+            self.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.cerrar()
+
+    def cerrar(self):
+        """Marca la suscripción para que el stream termine (el cliente se reconecta)."""
+        if self.desbordada:
+            return
+        self.desbordada = True
+        if self.cola.full():
+            self.cola.get_nowait()
+        self.cola.put_nowait(None)
+
+
+class Difusor:
+    """Conexión LISTEN compartida por todos los clientes de un event loop."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.suscripciones = set()
+        self.escucha = None  # tarea que abre la conexión y lee las notificaciones
+        self.conectada = None  # futuro que se resuelve al quedar hecho el LISTEN
+
+    async def suscribir(self):
+        suscripcion = Suscripcion()
+        self.suscripciones.add(suscripcion)
+        try:
+            if self.escucha is None:
+                self.conectada = self.loop.create_future()
+                self.escucha = asyncio.ensure_future(self._escuchar(self.conectada))
+            await asyncio.shield(self.conectada)
+        except BaseException:
+            self.desuscribir(suscripcion)
+            raise
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        self.suscripciones.discard(suscripcion)
+        if not self.suscripciones:
+            self._cerrar()
+
+    async def _escuchar(self, conectada):
+        conexion = None
+        try:
+            try:
+                conexion = await _conectar()
+            except Exception as e:
+                # Lo reciben los clientes que esperan en suscribir().
+                conectada.set_exception(e)
+                return
+            conectada.set_result(None)
+            async for notificacion in conexion.notifies():
+                try:
+                    evento = json.loads(notificacion.payload)
+                except ValueError:
+                    continue
+                for suscripcion in list(self.suscripciones):
+                    suscripcion.entregar(evento)
+        except psycopg.Error as e:
+            logger.warning("Se perdió la conexión LISTEN: %s", e)
+            # Los clientes se reconectan y recuperan lo perdido con Last-Event-ID.
+            for suscripcion in list(self.suscripciones):
+                suscripcion.cerrar()
+        finally:
+            if self.conectada is conectada:
+                self.escucha = self.conectada = None
+            if conexion is not None:
+                await conexion.close()
+
+    def _cerrar(self):
+        """Sin clientes: cancela la escucha, que cierra su conexión."""
+        if self.escucha is None:
+            return
+        self.escucha.cancel()
+        # Si la tarea no llegó a arrancar, nadie resolvería el futuro.
+        self.conectada.cancel()
+        self.escucha = self.conectada = None
+
+
+_difusores = {}
+
+
+def obtener_difusor():
+    loop = asyncio.get_running_loop()
+    difusor = _difusores.get(loop)
+    if difusor is None:
+        # Con WSGI (runserver) cada petición async corre en su propio loop.
+        for anterior in [l for l in _difusores if l.is_closed()]:
+            del _difusores[anterior]
+        difusor = _difusores[loop] = Difusor(loop)
+    return difusor
+
+
+async def _conectar():
+    # Conexión propia fuera del pool: queda abierta mientras haya clientes. Los
+    # parámetros son los mismos con que Django abre las suyas (OPTIONS, contexto
+    # de adaptadores), salvo el cursor_factory síncrono.
+    parametros = connections['default'].get_connection_params()
+    parametros.pop('cursor_factory', None)
+    conexion = await psycopg.AsyncConnection.connect(**parametros, autocommit=True)
+    try:
+        await conexion.execute(f'LISTEN {CANAL}')
+    except BaseException:
+        await conexion.close()
+        raise
+    return conexion
+
+
+def es_visible(usuario, evento):
+    """Mismas reglas que NotaViewSet.get_queryset(): todas o solo asignadas/creadas."""
+    if usuario.puede_ver_todas_las_notas():
+        return True
+    return usuario.pk in (evento.get('responsable_id'), evento.get('creado_por_id'))
+
+
+def _eventos_perdidos(usuario, ultimo_id):
+    """Eventos posteriores a `ultimo_id` visibles para el usuario (reconexión)."""
+    registros = HistorialNota.objects.filter(id__gt=ultimo_id)
+    if not usuario.puede_ver_todas_las_notas():
+        registros = registros.filter(Q(nota__responsable=usuario) | Q(nota__creado_por=usuario))
+    filas = registros.order_by('id').values(
+        'id', 'nota_id', 'tipo_evento', 'fecha_hora', 'estado_nuevo',
+        'nota__responsable_id', 'nota__creado_por_id', 'responsable_anterior_id',
+        'responsable_nuevo_id',
+    )[:MAXIMO_REENVIO]
+    return [
+        {
+            'id': fila['id'],
+            'nota_id': fila['nota_id'],
+            'tipo_evento': fila['tipo_evento'],
+            'fecha_hora': fila['fecha_hora'].isoformat(),
+            'estado_nuevo': fila['estado_nuevo'],
+            'responsable_id': fila['nota__responsable_id'],
+            'creado_por_id': fila['nota__creado_por_id'],
+            'responsable_anterior_id': fila['responsable_anterior_id'],
+            'responsable_nuevo_id': fila['responsable_nuevo_id'],
+        }
+        for fila in filas
+    ]
+
+
+def _formato(evento):
+    datos = json.dumps(evento, separators=(',', ':'))
+    return f"id: {evento['id']}\nevent: historial\ndata: {datos}\n\n"
+
+
+async def _stream(difusor, suscripcion, usuario, ultimo_id):
+    try:
+        yield f'retry: {ESPERA_RECONEXION * 1000}\n\n'
+        enviado = ultimo_id or 0
+        if ultimo_id is not None:
+            for evento in await sync_to_async(_eventos_perdidos)(usuario, ultimo_id):
+                yield _formato(evento)
+                enviado = evento['id']
+        while True:
+            try:
+                evento = await asyncio.wait_for(suscripcion.cola.get(), INTERVALO_LATIDO)
+            except asyncio.TimeoutError:
+                yield ': latido\n\n'
+                continue
+            if evento is None:
+                return
+            if evento['id'] <= enviado or not es_visible(usuario, evento):
+                continue
+            yield _formato(evento)
+    finally:
+        difusor.desuscribir(suscripcion)
+
+
+async def eventos_notas(request):
+    """
+    GET /api/eventos/ (text/event-stream)
+    Eventos 'historial' con {id, nota_id, tipo_evento, fecha_hora, estado_nuevo,
+    responsable_id, ...} de las notas visibles para el usuario.
+    Query param opcional: ultimo_id (equivale a Last-Event-ID).
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'error': 'Eventos no disponibles', 'detalle': 'Requiere un servidor ASGI.'},
+            status=501,
+        )
+    usuario = await request.auser()
+    if not usuario.is_authenticated:
+        return JsonResponse(
+            {'error': 'No autenticado', 'detalle': 'Inicie sesión para recibir eventos.'},
+            status=401,
+        )
+    if not es_postgresql(connections['default']):
+        return JsonResponse(
+            {'error': 'Eventos no disponibles', 'detalle': 'Requiere PostgreSQL.'},
+            status=503,
+        )
+    ultimo_id = request.headers.get('Last-Event-ID') or request.GET.get('ultimo_id')
+    try:
+        ultimo_id = int(ultimo_id) if ultimo_id else None
+    except ValueError:
+        ultimo_id = None
+
+    difusor = obtener_difusor()
+    suscripcion = await difusor.suscribir()
+    respuesta = StreamingHttpResponse(
+        _stream(difusor, suscripcion, usuario, ultimo_id), content_type='text/event-stream'
+    )
+    respuesta['Cache-Control'] = 'no-cache'
+    # nginx: no acumular la respuesta en el buffer del proxy.
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from notas.archivo import archivar_nota, notas_archivables
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve al archivo frío las notas ARCHIVADAS sin cambios desde hace más de N meses "
+        "(con su historial y adjuntos). Reversible con restaurar_notas_archivadas. "
+        "Ejemplo: python manage.py archivar_notas --meses 12"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--meses",
+            type=int,
+            default=12,
+            help="Antigüedad mínima (en meses) desde el archivado (default: 12).",
+        )
+        parser.add_argument(
+            "--limite",
+            type=int,
+            default=None,
+            help="Cantidad máxima de notas a mover en esta ejecución.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Solo informa cuántas notas se moverían.",
+        )
+
+    def handle(self, *args, **options):
+        if options["meses"] < 1:
+            raise CommandError("--meses debe ser >= 1.")
+
+        queryset = notas_archivables(options["meses"])
+        if options["limite"]:
+            queryset = queryset[: options["limite"]]
+
+        if options["dry_run"]:
+            self.stdout.write(f"Notas a archivar: {queryset.count()}")
+            return
+
+        movidas = 0
+        errores = 0
+        # Una transacción por nota: un error no revierte las ya movidas.
+        for nota in queryset.iterator():
+            try:
+                archivar_nota(nota)
+                movidas += 1
+            except Exception as e:
+                self.stderr.write(f"Error archivando nota {nota.numero_nota}: {e}")
+                errores += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Archivo: {movidas} notas movidas, {errores} errores")
+        )
@@ -0,0 +1,92 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from notas.particiones import (
+    asegurar_particiones,
+    crear_particion_default,
+    desvincular_particion,
+    es_postgresql,
+    esta_particionada,
+    listar_particiones,
+    sumar_meses,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea las particiones mensuales futuras de notas_historialnota y, opcionalmente, "
+        "desvincula las más antiguas. Pensado para ejecutarse una vez por mes (cron): "
+        "python manage.py gestionar_particiones_historial --meses-adelante 3 "
+        "--retener-meses 24 --esquema-archivo archivo"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--meses-adelante",
+            type=int,
+            default=3,
+            help="Cantidad de meses futuros con partición creada (default: 3).",
+        )
+        parser.add_argument(
+            "--retener-meses",
+            type=int,
+            default=None,
+            help="Desvincula las particiones anteriores a esta cantidad de meses.",
+        )
+        parser.add_argument(
+            "--esquema-archivo",
+            type=str,
+            default=None,
+            help="Esquema al que se mueven las particiones desvinculadas.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Solo informa qué particiones se desvincularían.",
+        )
+
+    def handle(self, *args, **options):
+        if not es_postgresql(connection):
+            raise CommandError("El particionado del historial requiere PostgreSQL.")
+
+        meses_adelante = options["meses_adelante"]
+        retener_meses = options["retener_meses"]
+        if meses_adelante < 0 or (retener_meses is not None and retener_meses < 1):
+            raise CommandError("--meses-adelante debe ser >= 0 y --retener-meses >= 1.")
+
+        hoy = timezone.localdate()
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not esta_particionada(cursor):
+                raise CommandError(
+                    "notas_historialnota no está particionada; ejecute las migraciones."
+                )
+
+            existentes = listar_particiones(cursor)
+            if existentes:
+                desde_año, desde_mes = existentes[-1][1], existentes[-1][2]
+            else:
+                desde_año, desde_mes = hoy.year, hoy.month
+            creadas = asegurar_particiones(cursor, desde_año, desde_mes, meses_adelante)
+            crear_particion_default(cursor)
+            for nombre in creadas:
+                self.stdout.write(f"Partición creada: {nombre}")
+
+            desvinculadas = 0
+            if retener_meses is not None:
+                limite = sumar_meses(hoy.year, hoy.month, -retener_meses)
+                for nombre, año, mes in existentes:
+                    if (año, mes) >= limite:
+                        continue
+                    if options["dry_run"]:
+                        self.stdout.write(f"Se desvincularía: {nombre}")
+                        continue
+                    desvincular_particion(cursor, nombre, options["esquema_archivo"])
+                    desvinculadas += 1
+                    self.stdout.write(f"Partición desvinculada: {nombre}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Particiones: {len(creadas)} creadas, {desvinculadas} desvinculadas"
+            )
+        )
@@ -0,0 +1,106 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notas.almacenamiento import archivos_huerfanos, ruta_absoluta
+from notas.cargas import cancelar_carga, cargas_vencidas
+from notas.models import Adjunto, ArchivoBlob
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina del disco y de la base los contenidos de adjuntos sin referencias, "
+        "las subidas por partes abandonadas y los archivos sin registro en la base. "
+        "Ejemplo: python manage.py limpiar_blobs --horas-cargas 24 --dry-run"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Solo informa qué contenidos se eliminarían.",
+        )
+        parser.add_argument(
+            "--horas-cargas",
+            type=int,
+            default=24,
+            help="Cancela las subidas por partes sin actividad en estas horas (default: 24).",
+        )
+        parser.add_argument(
+            "--horas-huerfanos",
+            type=int,
+            default=24,
+            help="Borra archivos sin registro en la base más antiguos que estas horas (default: 24).",
+        )
+
+    def handle(self, *args, **options):
+        canceladas = 0
+        for carga in cargas_vencidas(options["horas_cargas"]).iterator():
+            if options["dry_run"]:
+                self.stdout.write(
+                    f"Se cancelaría la subida: {carga.nombre_archivo} ({carga.recibidos} bytes)"
+                )
+                continue
+            cancelar_carga(carga)
+            canceladas += 1
+
+        # Se verifica también que ningún adjunto lo use, por si el contador quedó desfasado.
+        huerfanos = ArchivoBlob.objects.filter(referencias=0, adjuntos__isnull=True)
+        eliminados = 0
+        bytes_liberados = 0
+        for blob in huerfanos.iterator():
+            if options["dry_run"]:
+                self.stdout.write(f"Se eliminaría: {blob.ruta} ({blob.tamaño_bytes} bytes)")
+                continue
+            if self.eliminar_blob(blob.pk):
+                eliminados += 1
+                bytes_liberados += blob.tamaño_bytes
+
+        # Archivos sin fila (p. ej. registrar_blob dentro de una transacción revertida).
+        sueltos = 0
+        limite = time.time() - options["horas_huerfanos"] * 3600
+        for ruta in archivos_huerfanos(options["horas_huerfanos"]):
+            if options["dry_run"]:
+                self.stdout.write(f"Se eliminaría el archivo sin registro: {ruta}")
+                continue
+            ruta = ruta_absoluta(ruta)
+            try:
+                # Una subida del mismo contenido pudo reemplazarlo desde el listado.
+                if os.path.getmtime(ruta) >= limite:
+                    continue
+                tamaño = os.path.getsize(ruta)
+                os.remove(ruta)
+            except FileNotFoundError:
+                continue
+            sueltos += 1
+            bytes_liberados += tamaño
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Contenidos eliminados: {eliminados}, archivos sin registro: {sueltos} "
+                f"({bytes_liberados} bytes liberados), subidas canceladas: {canceladas}"
+            )
+        )
+
+    def eliminar_blob(self, sha256):
+        """
+        Borra el contenido si sigue sin referencias. La fila se bloquea igual que
+        en registrar_blob(): una subida del mismo contenido espera a que termine
+        el borrado y después crea la fila y el archivo de nuevo. Returns: bool
+        """
+        with transaction.atomic():
+            blob = (
+                ArchivoBlob.objects.select_for_update()
+                .filter(pk=sha256, referencias=0)
+                .first()
+            )
+            if blob is None or Adjunto.objects.filter(blob=blob).exists():
+                return False
+            rutas = [blob.ruta, blob.ruta_miniatura, blob.ruta_vista_previa]
+            for ruta in map(ruta_absoluta, rutas):
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+            blob.delete()
+        return True
@@ -0,0 +1,48 @@
+import hashlib
+import os
+import shutil
+
+from django.core.management.base import BaseCommand
+
+from notas.almacenamiento import archivo_temporal, registrar_blob, ruta_absoluta
+from notas.miniaturas import programar_miniaturas
+from notas.models import Adjunto
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasa los adjuntos guardados como MEDIA_ROOT/<nombre original> al almacenamiento "
+        "por contenido (SHA-256). Los archivos originales no se borran. "
+        "Ejemplo: python manage.py migrar_adjuntos_a_blobs"
+    )
+
+    def handle(self, *args, **options):
+        migrados = 0
+        faltantes = 0
+        for adjunto in Adjunto.objects.filter(blob__isnull=True).iterator():
+            origen = ruta_absoluta(adjunto.ruta_almacenamiento)
+            if not adjunto.ruta_almacenamiento or not os.path.isfile(origen):
+                self.stderr.write(f"Archivo no encontrado: {adjunto.ruta_almacenamiento}")
+                faltantes += 1
+                continue
+
+            sha256 = hashlib.sha256()
+            tamaño = 0
+            with open(origen, "rb") as fuente, archivo_temporal() as destino:
+                for chunk in iter(lambda: fuente.read(shutil.COPY_BUFSIZE), b""):
+                    sha256.update(chunk)
+                    destino.write(chunk)
+                    tamaño += len(chunk)
+            blob = registrar_blob(destino.name, sha256.hexdigest(), tamaño)
+
+            adjunto.blob = blob
+            adjunto.ruta_almacenamiento = blob.ruta
+            adjunto.save(update_fields=["blob", "ruta_almacenamiento"])
+            programar_miniaturas(adjunto)
+            migrados += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Adjuntos migrados: {migrados}, archivos no encontrados: {faltantes}"
+            )
+        )
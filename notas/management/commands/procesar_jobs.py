@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from notas.models import EstadoTrabajoChoices, Trabajo
+from notas.trabajos import ejecutar_trabajo, recuperar_trabajos_colgados, tomar_trabajo
+
+INTERVALO_RECUPERACION = 60  # segundos entre búsquedas de trabajos colgados
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta los trabajos pendientes de la cola (miniaturas de adjuntos, etc.) "
+        "con un pool de hilos. Se pueden correr varios workers en paralelo. "
+        "Ejemplo: python manage.py procesar_jobs --hilos 4 --purgar-dias 30"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hilos",
+            type=int,
+            default=None,
+            help="Trabajos en paralelo (default: TRABAJOS_CONCURRENCIA).",
+        )
+        parser.add_argument(
+            "--espera",
+            type=float,
+            default=2.0,
+            help="Segundos entre consultas cuando la cola está vacía (default: 2).",
+        )
+        parser.add_argument(
+            "--una-vez",
+            action="store_true",
+            help="Procesa los pendientes y termina (para cron o pruebas).",
+        )
+        parser.add_argument(
+            "--purgar-dias",
+            type=int,
+            default=None,
+            help="Al iniciar, borra los trabajos completados hace más de estos días.",
+        )
+
+    def handle(self, *args, **options):
+        hilos = options["hilos"] or settings.TRABAJOS_CONCURRENCIA
+        if hilos < 1:
+            raise CommandError("--hilos debe ser >= 1.")
+
+        if options["purgar_dias"] is not None:
+            borrados, _ = Trabajo.objects.filter(
+                estado=EstadoTrabajoChoices.COMPLETADO,
+                fecha_fin__lt=timezone.now() - timedelta(days=options["purgar_dias"]),
+            ).delete()
+            self.stdout.write(f"Trabajos completados purgados: {borrados}")
+
+        self.detener = threading.Event()
+        self.lock = threading.Lock()
+        self.procesados = 0
+        self.errores = 0
+        self.reintentos = 0
+        self.ultima_recuperacion = 0.0
+
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            futuros = [
+                pool.submit(self.trabajar, options["espera"], options["una_vez"])
+                for _ in range(hilos)
+            ]
+            try:
+                for futuro in futuros:
+                    futuro.result()
+            except KeyboardInterrupt:
+                self.detener.set()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Trabajos procesados: {self.procesados} "
+                f"({self.errores} con error, {self.reintentos} reprogramados)"
+            )
+        )
+
+    def recuperar(self):
+        """Un solo hilo por intervalo busca trabajos de workers caídos."""
+        with self.lock:
+            if time.monotonic() - self.ultima_recuperacion < INTERVALO_RECUPERACION:
+                return
+            self.ultima_recuperacion = time.monotonic()
+        recuperados = recuperar_trabajos_colgados()
+        if recuperados:
+            self.stdout.write(f"Trabajos colgados recuperados: {recuperados}")
+
+    def trabajar(self, espera, una_vez):
+        """
+        Bucle de un hilo: toma trabajos hasta vaciar la cola o recibir la señal de fin.
+        Un error de la base (p. ej. un reinicio) no termina el hilo: se registra,
+        se descarta la conexión rota y se reintenta tras `espera` segundos. Un
+        trabajo que quedó EN_PROCESO lo devuelve a la cola recuperar().
+        """
+        try:
+            while not self.detener.is_set():
+                try:
+                    self.recuperar()
+                    trabajo = tomar_trabajo()
+                    if trabajo is None:
+                        if una_vez:
+                            return
+                        self.detener.wait(espera)
+                        continue
+                    ejecutar_trabajo(trabajo)
+                except Exception:
+                    logger.exception("Error en el worker de trabajos; se reintenta")
+                    close_old_connections()
+                    self.detener.wait(espera)
+                    continue
+                with self.lock:
+                    self.procesados += 1
+                    self.errores += trabajo.estado == EstadoTrabajoChoices.ERROR
+                    self.reintentos += trabajo.estado == EstadoTrabajoChoices.PENDIENTE
+                self.stdout.write(f"{trabajo}")
+        finally:
+            # Cada hilo usa su propia conexión a la base.
+            connection.close()
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from notas.archivo import restaurar_nota
+from notas.models import NotaArchivada
+
+
+class Command(BaseCommand):
+    help = (
+        "Devuelve notas del archivo frío a las tablas activas con sus ids originales. "
+        "Ejemplo: python manage.py restaurar_notas_archivadas 150-023-2024 150-I004-2024 "
+        "o --todas"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "numeros",
+            nargs="*",
+            type=str,
+            help="Números de nota a restaurar.",
+        )
+        parser.add_argument(
+            "--todas",
+            action="store_true",
+            help="Restaura todas las notas del archivo.",
+        )
+
+    def handle(self, *args, **options):
+        numeros = options["numeros"]
+        if not numeros and not options["todas"]:
+            raise CommandError("Indique números de nota o use --todas.")
+
+        queryset = NotaArchivada.objects.all().order_by("id")
+        if numeros:
+            queryset = queryset.filter(numero_nota__in=numeros)
+            faltantes = set(numeros) - set(queryset.values_list("numero_nota", flat=True))
+            for numero in sorted(faltantes):
+                self.stderr.write(f"No está en el archivo: {numero}")
+
+        restauradas = 0
+        for archivada in queryset.iterator():
+            restaurar_nota(archivada)
+            restauradas += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Restauradas: {restauradas} notas"))
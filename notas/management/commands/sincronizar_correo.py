@@ -0,0 +1,61 @@
+import imaplib
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notas.correo_entrante import ErrorCorreo, SincronizadorImap
+
+
+class Command(BaseCommand):
+    help = (
+        "Lee las respuestas por mail desde IMAP (solo los mensajes nuevos desde la "
+        "última corrida) y las asocia a las notas. Sin --una-vez queda escuchando "
+        "con IDLE. Ejemplo: python manage.py sincronizar_correo --intervalo 300"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--una-vez",
+            action="store_true",
+            help="Sincroniza los mensajes nuevos y termina (para cron o pruebas).",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=int,
+            default=300,
+            help="Segundos máximos entre sincronizaciones (default: 300). Con IDLE "
+                 "los mensajes nuevos se procesan apenas llegan.",
+        )
+        parser.add_argument(
+            "--espera-error",
+            type=int,
+            default=60,
+            help="Segundos antes de reconectar tras un error (default: 60).",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.IMAP_HOST:
+            raise CommandError("IMAP_HOST no está configurado.")
+        sincronizador = SincronizadorImap()
+        while True:
+            try:
+                if sincronizador.conexion is None:
+                    sincronizador.conectar()
+                procesados, asociados = sincronizador.sincronizar()
+                if procesados or options["una_vez"]:
+                    self.stdout.write(
+                        f"Mails procesados: {procesados} ({asociados} asociados a notas)"
+                    )
+                if options["una_vez"]:
+                    break
+                sincronizador.esperar(options["intervalo"])
+            except (ErrorCorreo, imaplib.IMAP4.error, OSError) as e:
+                sincronizador.desconectar()
+                if options["una_vez"]:
+                    raise CommandError(f"Error IMAP: {e}")
+                self.stderr.write(f"Error IMAP: {e}; reintento en {options['espera_error']} s")
+                time.sleep(options["espera_error"])
+            except KeyboardInterrupt:
+                break
+        sincronizador.desconectar()
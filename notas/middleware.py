@@ -0,0 +1,93 @@
+"""
+Middlewares de diagnóstico: consultas lentas (notas/consultas_lentas.py) y
+perfilado de peticiones a pedido (notas/perfilado.py).
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from agentes.permissions import IsAdministrador
+
+from . import perfilado
+from .consultas_lentas import peticion_actual
+
+
+class ConsultasLentasMiddleware:
+    """Deja la petición en curso disponible para saber qué vista originó cada consulta."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.CONSULTAS_LENTAS_UMBRAL_MS <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = peticion_actual.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            peticion_actual.reset(token)
+
+    async def __acall__(self, request):
+        token = peticion_actual.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            peticion_actual.reset(token)
+
+
+class PerfiladoMiddleware:
+    """
+    Perfila la petición si la pide un ADMINISTRADOR con 'X-Perfilar: 1' o
+    ?perfilar=1 (sin perfil si ya hay otro de cProfile en curso).
+    Con PERFILADO_HABILITADO=False no se carga.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERFILADO_HABILITADO:
+            raise MiddlewareNotUsed
+        perfilado.instalar()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not perfilado.pedido(request) or not IsAdministrador().has_permission(request, None):
+            return self.get_response(request)
+        perfil = perfilado.Perfilado()
+        if not perfil.iniciar():
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            duracion, texto = perfil.terminar()
+        perfil.guardar(request, response, duracion, texto)
+        return response
+
+    async def __acall__(self, request):
+        if not perfilado.pedido(request):
+            return await self.get_response(request)
+        # IsAdministrador lee request.user, que en async hay que resolver antes.
+        request.user = await request.auser()
+        if not IsAdministrador().has_permission(request, None):
+            return await self.get_response(request)
+        perfil = perfilado.Perfilado(asincronico=True)
+        if not perfil.iniciar():
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            duracion, texto = perfil.terminar()
+        await sync_to_async(perfil.guardar)(request, response, duracion, texto)
+        return response
@@ -0,0 +1,134 @@
+"""
+Convierte notas_historialnota en una tabla particionada por rango mensual de
+fecha_hora (solo PostgreSQL; en otros motores la migración no hace nada).
+
+PostgreSQL exige que la clave primaria de una tabla particionada incluya la
+columna de partición, por eso la PK física pasa a ser (id, fecha_hora). Para
+Django la PK sigue siendo `id`, que se genera con una secuencia única.
+"""
+from django.db import migrations
+from django.utils import timezone
+
+from notas.particiones import (
+    TABLA_HISTORIAL,
+    asegurar_particiones,
+    crear_particion_default,
+    es_postgresql,
+    esta_particionada,
+)
+
+SECUENCIA = f'{TABLA_HISTORIAL}_id_seq'
+MESES_ADELANTE = 3
+
+
+def _definiciones(cursor, tabla):
+    """Índices (excepto PK) y FKs de la tabla, para recrearlos tras la conversión."""
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = %s "
+        "AND indexname NOT IN ("
+        "  SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass"
+        ")",
+        [tabla, tabla],
+    )
+    indices = [fila[0] for fila in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [tabla],
+    )
+    fks = cursor.fetchall()
+    return indices, fks
+
+
+def _recrear(cursor, indices, fks):
+    for indexdef in indices:
+        # Los índices de una tabla particionada se definen "ON ONLY".
+        cursor.execute(indexdef.replace(' ON ONLY ', ' ON '))
+    for nombre, definicion in fks:
+        cursor.execute(
+            f'ALTER TABLE "{TABLA_HISTORIAL}" ADD CONSTRAINT "{nombre}" {definicion}'
+        )
+
+
+def particionar(apps, schema_editor):
+    if not es_postgresql(schema_editor.connection):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if esta_particionada(cursor):
+            return
+        indices, fks = _definiciones(cursor, TABLA_HISTORIAL)
+        anterior = f'{TABLA_HISTORIAL}_anterior'
+
+        cursor.execute(f'ALTER TABLE "{TABLA_HISTORIAL}" RENAME TO "{anterior}"')
+        cursor.execute(f'ALTER INDEX "{TABLA_HISTORIAL}_pkey" RENAME TO "{anterior}_pkey"')
+        # La columna id deja de ser IDENTITY: libera el nombre de la secuencia.
+        cursor.execute(f'ALTER TABLE "{anterior}" ALTER COLUMN id DROP IDENTITY IF EXISTS')
+        cursor.execute(f'ALTER TABLE "{anterior}" ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(f'DROP SEQUENCE IF EXISTS "{SECUENCIA}"')
+        cursor.execute(f'CREATE SEQUENCE "{SECUENCIA}"')
+
+        cursor.execute(
+            f'CREATE TABLE "{TABLA_HISTORIAL}" (LIKE "{anterior}" INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE (fecha_hora)'
+        )
+        cursor.execute(
+            f'ALTER TABLE "{TABLA_HISTORIAL}" '
+            f"ALTER COLUMN id SET DEFAULT nextval('{SECUENCIA}')"
+        )
+        cursor.execute(
+            f'ALTER TABLE "{TABLA_HISTORIAL}" '
+            f'ADD CONSTRAINT "{TABLA_HISTORIAL}_pkey" PRIMARY KEY (id, fecha_hora)'
+        )
+        cursor.execute(f'ALTER SEQUENCE "{SECUENCIA}" OWNED BY "{TABLA_HISTORIAL}".id')
+
+        cursor.execute(f'SELECT MIN(fecha_hora) FROM "{anterior}"')
+        primera = cursor.fetchone()[0]
+        primera = timezone.localtime(primera) if primera else timezone.localdate()
+        asegurar_particiones(cursor, primera.year, primera.month, MESES_ADELANTE)
+        crear_particion_default(cursor)
+
+        cursor.execute(f'INSERT INTO "{TABLA_HISTORIAL}" SELECT * FROM "{anterior}"')
+        cursor.execute(
+            f"SELECT setval('{SECUENCIA}', COALESCE(MAX(id), 0) + 1, false) "
+            f'FROM "{TABLA_HISTORIAL}"'
+        )
+        cursor.execute(f'DROP TABLE "{anterior}"')
+        _recrear(cursor, indices, fks)
+
+
+def revertir(apps, schema_editor):
+    if not es_postgresql(schema_editor.connection):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if not esta_particionada(cursor):
+            return
+        indices, fks = _definiciones(cursor, TABLA_HISTORIAL)
+        particionada = f'{TABLA_HISTORIAL}_particionada'
+
+        cursor.execute(f'ALTER SEQUENCE "{SECUENCIA}" OWNED BY NONE')
+        cursor.execute(f'ALTER TABLE "{TABLA_HISTORIAL}" RENAME TO "{particionada}"')
+        cursor.execute(f'ALTER INDEX "{TABLA_HISTORIAL}_pkey" RENAME TO "{particionada}_pkey"')
+        cursor.execute(
+            f'CREATE TABLE "{TABLA_HISTORIAL}" (LIKE "{particionada}" INCLUDING DEFAULTS)'
+        )
+        cursor.execute(
+            f'ALTER TABLE "{TABLA_HISTORIAL}" '
+            f'ADD CONSTRAINT "{TABLA_HISTORIAL}_pkey" PRIMARY KEY (id)'
+        )
+        cursor.execute(f'INSERT INTO "{TABLA_HISTORIAL}" SELECT * FROM "{particionada}"')
+        # Las particiones ya desvinculadas (archivadas) no se tocan.
+        cursor.execute(f'DROP TABLE "{particionada}" CASCADE')
+        cursor.execute(f'ALTER SEQUENCE "{SECUENCIA}" OWNED BY "{TABLA_HISTORIAL}".id')
+        _recrear(cursor, indices, fks)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, revertir),
+    ]
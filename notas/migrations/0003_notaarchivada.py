@@ -0,0 +1,40 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0002_particionar_historialnota'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero_nota', models.CharField(max_length=30, unique=True, verbose_name='Número de Nota')),
+                ('tema', models.CharField(max_length=100, verbose_name='Tema')),
+                ('tarea_asignada', models.CharField(blank=True, max_length=200, verbose_name='Tarea Asignada')),
+                ('remitente', models.CharField(blank=True, max_length=200, verbose_name='Remitente')),
+                ('prioridad', models.CharField(choices=[('BAJA', 'Baja'), ('MEDIA', 'Media'), ('ALTA', 'Alta'), ('URGENTE', 'Urgente')], max_length=10, verbose_name='Prioridad')),
+                ('fecha_ingreso', models.DateTimeField(verbose_name='Fecha de Ingreso')),
+                ('fecha_archivo', models.DateTimeField(auto_now_add=True, help_text='Fecha en que la nota se movió al archivo', verbose_name='Fecha de Archivo')),
+                ('resumen', models.JSONField(verbose_name='Resumen')),
+                ('detalle', models.JSONField(verbose_name='Detalle')),
+                ('registros', models.JSONField(verbose_name='Registros')),
+                ('creado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Creado Por')),
+                ('responsable', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Responsable')),
+            ],
+            options={
+                'verbose_name': 'Nota Archivada',
+                'verbose_name_plural': 'Notas Archivadas',
+                'ordering': ['-fecha_ingreso'],
+                'indexes': [models.Index(fields=['fecha_ingreso'], name='notas_notaa_fecha_i_b8a307_idx'), models.Index(fields=['responsable'], name='notas_notaa_respons_9511cc_idx')],
+            },
+        ),
+    ]
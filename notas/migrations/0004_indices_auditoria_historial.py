@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0003_notaarchivada'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='historialnota',
+            name='notas_histo_usuario_3b6804_idx',
+        ),
+        migrations.AddIndex(
+            model_name='historialnota',
+            index=models.Index(fields=['usuario', '-fecha_hora'], name='notas_histo_usuario_7cab7e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialnota',
+            index=models.Index(fields=['tipo_evento', '-fecha_hora'], name='notas_histo_tipo_ev_dbad33_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialnota',
+            index=models.Index(fields=['-fecha_hora'], name='notas_histo_fecha_h_566e8a_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-19 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0004_indices_auditoria_historial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='SHA-256')),
+                ('tamaño_bytes', models.PositiveBigIntegerField(verbose_name='Tamaño en Bytes')),
+                ('referencias', models.PositiveIntegerField(default=0, help_text='Cantidad de adjuntos que usan este contenido', verbose_name='Referencias')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+            ],
+            options={
+                'verbose_name': 'Contenido de Adjunto',
+                'verbose_name_plural': 'Contenidos de Adjuntos',
+            },
+        ),
+        migrations.AddField(
+            model_name='adjunto',
+            name='blob',
+            field=models.ForeignKey(blank=True, help_text='Contenido almacenado por hash (vacío en adjuntos anteriores al almacenamiento por hash)', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='adjuntos', to='notas.archivoblob', verbose_name='Contenido'),
+        ),
+    ]
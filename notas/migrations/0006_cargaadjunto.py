@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-19 07:18
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0005_archivoblob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CargaAdjunto',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nombre_archivo', models.CharField(max_length=255, verbose_name='Nombre del Archivo')),
+                ('tipo_mime', models.CharField(max_length=100, verbose_name='Tipo MIME')),
+                ('tipo_adjunto', models.CharField(choices=[('DOCUMENTO_ORIGINAL', 'Documento Original'), ('BORRADOR_RESOLUCION', 'Borrador Resolución'), ('RESOLUCION_FINAL', 'Resolución Final'), ('NOTA_ESCANEADA', 'Nota Escaneada'), ('OTRO', 'Otro')], default='OTRO', max_length=25, verbose_name='Tipo de Adjunto')),
+                ('tamaño_bytes', models.PositiveBigIntegerField(verbose_name='Tamaño Total en Bytes')),
+                ('recibidos', models.PositiveBigIntegerField(default=0, help_text='Offset desde el que debe continuar la subida', verbose_name='Bytes Recibidos')),
+                ('sha256', models.CharField(blank=True, help_text='Hash del archivo completo informado por el cliente (opcional)', max_length=64, verbose_name='SHA-256 Declarado')),
+                ('ruta_temporal', models.CharField(help_text='Archivo parcial, relativo a MEDIA_ROOT', max_length=500, verbose_name='Ruta Temporal')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('ultima_actividad', models.DateTimeField(auto_now=True, verbose_name='Última Actividad')),
+                ('nota', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cargas_adjuntos', to='notas.nota', verbose_name='Nota')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cargas_adjuntos', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Carga de Adjunto',
+                'verbose_name_plural': 'Cargas de Adjuntos',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-19 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0006_cargaadjunto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivoblob',
+            name='tiene_miniaturas',
+            field=models.BooleanField(default=False, help_text='Miniatura y vista previa de la primera página generadas', verbose_name='Tiene Miniaturas'),
+        ),
+        migrations.CreateModel(
+            name='Trabajo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=100, verbose_name='Tipo')),
+                ('datos', models.JSONField(blank=True, default=dict, verbose_name='Datos')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En Proceso'), ('COMPLETADO', 'Completado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=20, verbose_name='Estado')),
+                ('intentos', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('error', models.TextField(blank=True, verbose_name='Último Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Inicio')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Fin')),
+            ],
+            options={
+                'verbose_name': 'Trabajo',
+                'verbose_name_plural': 'Trabajos',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['estado', 'id'], name='notas_traba_estado_46f299_idx')],
+            },
+        ),
+    ]
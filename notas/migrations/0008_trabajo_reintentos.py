@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-19 07:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0007_trabajo_miniaturas'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='trabajo',
+            name='notas_traba_estado_46f299_idx',
+        ),
+        migrations.AddField(
+            model_name='trabajo',
+            name='ejecutar_despues',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Los reintentos se reprograman con espera exponencial', verbose_name='Ejecutar Después De'),
+        ),
+        migrations.AddField(
+            model_name='trabajo',
+            name='max_intentos',
+            field=models.PositiveIntegerField(default=5, help_text='Al agotarlos el trabajo queda en ERROR', verbose_name='Máximo de Intentos'),
+        ),
+        migrations.AddIndex(
+            model_name='trabajo',
+            index=models.Index(fields=['estado', 'ejecutar_despues'], name='notas_traba_estado_f3ee5f_idx'),
+        ),
+    ]
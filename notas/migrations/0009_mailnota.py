@@ -0,0 +1,40 @@
+# Generated by Django 6.0.2 on 2026-10-19 07:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0008_trabajo_reintentos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailNota',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_evento', models.CharField(blank=True, choices=[('CREACION', 'Creación'), ('CAMBIO_ESTADO', 'Cambio de Estado'), ('ASIGNACION', 'Asignación'), ('REASIGNACION', 'Reasignación'), ('ACTUALIZACION', 'Actualización'), ('ANULACION', 'Anulación'), ('ARCHIVADO', 'Archivado'), ('DERIVACION_DESPACHO', 'Derivación a Despacho'), ('RESOLUCION_CARGADA', 'Resolución Cargada'), ('DISTRIBUCION_SECTOR', 'Distribución a Sector')], max_length=30, verbose_name='Evento')),
+                ('asunto', models.CharField(max_length=255, verbose_name='Asunto')),
+                ('cuerpo', models.TextField(verbose_name='Cuerpo')),
+                ('destinatarios', models.JSONField(default=list, verbose_name='Para')),
+                ('cc', models.JSONField(blank=True, default=list, verbose_name='CC')),
+                ('message_id', models.CharField(help_text='Permite asociar las respuestas a la nota', max_length=255, unique=True, verbose_name='Message-ID')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('ENVIANDO', 'Enviando'), ('ENVIADO', 'Enviado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=20, verbose_name='Estado')),
+                ('intentos', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now, help_text='Mientras está ENVIANDO, vencimiento de la reserva del worker', verbose_name='Próximo Intento')),
+                ('error', models.TextField(blank=True, verbose_name='Último Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_envio', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Envío')),
+                ('nota', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mails', to='notas.nota', verbose_name='Nota')),
+            ],
+            options={
+                'verbose_name': 'Mail',
+                'verbose_name_plural': 'Bandeja de Salida',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='notas_mailn_estado_691845_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 6.0.2 on 2026-10-19 07:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0009_mailnota'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historialnota',
+            name='tipo_evento',
+            field=models.CharField(choices=[('CREACION', 'Creación'), ('CAMBIO_ESTADO', 'Cambio de Estado'), ('ASIGNACION', 'Asignación'), ('REASIGNACION', 'Reasignación'), ('ACTUALIZACION', 'Actualización'), ('ANULACION', 'Anulación'), ('ARCHIVADO', 'Archivado'), ('DERIVACION_DESPACHO', 'Derivación a Despacho'), ('RESOLUCION_CARGADA', 'Resolución Cargada'), ('DISTRIBUCION_SECTOR', 'Distribución a Sector'), ('RESPUESTA_EMAIL', 'Respuesta por Email')], max_length=25, verbose_name='Tipo de Evento'),
+        ),
+        migrations.AlterField(
+            model_name='mailnota',
+            name='tipo_evento',
+            field=models.CharField(blank=True, choices=[('CREACION', 'Creación'), ('CAMBIO_ESTADO', 'Cambio de Estado'), ('ASIGNACION', 'Asignación'), ('REASIGNACION', 'Reasignación'), ('ACTUALIZACION', 'Actualización'), ('ANULACION', 'Anulación'), ('ARCHIVADO', 'Archivado'), ('DERIVACION_DESPACHO', 'Derivación a Despacho'), ('RESOLUCION_CARGADA', 'Resolución Cargada'), ('DISTRIBUCION_SECTOR', 'Distribución a Sector'), ('RESPUESTA_EMAIL', 'Respuesta por Email')], max_length=30, verbose_name='Evento'),
+        ),
+        migrations.CreateModel(
+            name='BuzonCorreo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('servidor', models.CharField(max_length=255, verbose_name='Servidor')),
+                ('usuario', models.CharField(max_length=255, verbose_name='Usuario')),
+                ('carpeta', models.CharField(default='INBOX', max_length=255, verbose_name='Carpeta')),
+                ('uidvalidity', models.BigIntegerField(blank=True, null=True, verbose_name='UIDVALIDITY')),
+                ('ultimo_uid', models.BigIntegerField(default=0, verbose_name='Último UID')),
+                ('ultima_sincronizacion', models.DateTimeField(blank=True, null=True, verbose_name='Última Sincronización')),
+            ],
+            options={
+                'verbose_name': 'Buzón de Correo',
+                'verbose_name_plural': 'Buzones de Correo',
+                'constraints': [models.UniqueConstraint(fields=('servidor', 'usuario', 'carpeta'), name='buzon_correo_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MailRecibido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uid', models.BigIntegerField(verbose_name='UID')),
+                ('message_id', models.CharField(max_length=255, unique=True, verbose_name='Message-ID')),
+                ('in_reply_to', models.CharField(blank=True, max_length=255, verbose_name='In-Reply-To')),
+                ('remitente', models.CharField(max_length=255, verbose_name='Remitente')),
+                ('asunto', models.CharField(blank=True, max_length=255, verbose_name='Asunto')),
+                ('cuerpo', models.TextField(blank=True, verbose_name='Cuerpo (texto)')),
+                ('fecha', models.DateTimeField(blank=True, null=True, verbose_name='Fecha del Mail')),
+                ('fecha_recepcion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Recepción')),
+                ('buzon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mails', to='notas.buzoncorreo', verbose_name='Buzón')),
+                ('nota', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mails_recibidos', to='notas.nota', verbose_name='Nota')),
+            ],
+            options={
+                'verbose_name': 'Mail Recibido',
+                'verbose_name_plural': 'Mails Recibidos',
+                'ordering': ['-fecha_recepcion'],
+            },
+        ),
+    ]
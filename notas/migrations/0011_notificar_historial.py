@@ -0,0 +1,64 @@
+"""
+Trigger que publica cada fila nueva de notas_historialnota en el canal
+NOTIFY 'notas_historial' (solo PostgreSQL; en otros motores no hace nada).
+Lo escucha notas/eventos.py para el stream /api/eventos/.
+
+El trigger cubre también los bulk_create de HistorialBuffer y, como NOTIFY es
+transaccional, el evento se entrega recién cuando la transacción confirma.
+"""
+from django.db import migrations
+
+from notas.particiones import TABLA_HISTORIAL, es_postgresql
+
+CREAR = f"""
+CREATE OR REPLACE FUNCTION notas_notificar_historial() RETURNS trigger AS $$
+DECLARE
+    nota RECORD;
+BEGIN
+    SELECT responsable_id, creado_por_id INTO nota FROM notas_nota WHERE id = NEW.nota_id;
+    PERFORM pg_notify('notas_historial', json_build_object(
+        'id', NEW.id,
+        'nota_id', NEW.nota_id,
+        'tipo_evento', NEW.tipo_evento,
+        'fecha_hora', NEW.fecha_hora,
+        'estado_nuevo', NEW.estado_nuevo,
+        'responsable_id', nota.responsable_id,
+        'creado_por_id', nota.creado_por_id,
+        'responsable_anterior_id', NEW.responsable_anterior_id,
+        'responsable_nuevo_id', NEW.responsable_nuevo_id
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notas_historial_notify ON "{TABLA_HISTORIAL}";
+CREATE TRIGGER notas_historial_notify
+    AFTER INSERT ON "{TABLA_HISTORIAL}"
+    FOR EACH ROW EXECUTE FUNCTION notas_notificar_historial();
+"""
+
+BORRAR = f"""
+DROP TRIGGER IF EXISTS notas_historial_notify ON "{TABLA_HISTORIAL}";
+DROP FUNCTION IF EXISTS notas_notificar_historial();
+"""
+
+
+def crear_trigger(apps, schema_editor):
+    if es_postgresql(schema_editor.connection):
+        schema_editor.execute(CREAR)
+
+
+def borrar_trigger(apps, schema_editor):
+    if es_postgresql(schema_editor.connection):
+        schema_editor.execute(BORRAR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0010_correo_entrante'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_trigger, borrar_trigger),
+    ]
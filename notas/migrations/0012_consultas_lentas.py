@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-19 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0011_notificar_historial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultaLenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+                ('vista', models.CharField(blank=True, max_length=200, verbose_name='Vista')),
+                ('base', models.CharField(max_length=50, verbose_name='Base de Datos')),
+                ('duracion_ms', models.FloatField(verbose_name='Duración (ms)')),
+                ('sql', models.TextField(verbose_name='SQL')),
+                ('pila', models.TextField(blank=True, verbose_name='Pila de Llamadas')),
+                ('plan', models.TextField(blank=True, verbose_name='Plan (EXPLAIN ANALYZE)')),
+            ],
+            options={
+                'verbose_name': 'Consulta Lenta',
+                'verbose_name_plural': 'Consultas Lentas',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-19 08:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0012_consultas_lentas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilPeticion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+                ('metodo', models.CharField(max_length=10, verbose_name='Método')),
+                ('ruta', models.CharField(max_length=500, verbose_name='Ruta')),
+                ('vista', models.CharField(blank=True, max_length=200, verbose_name='Vista')),
+                ('estado', models.PositiveSmallIntegerField(verbose_name='Código de Estado')),
+                ('duracion_ms', models.FloatField(verbose_name='Duración (ms)')),
+                ('motor', models.CharField(max_length=20, verbose_name='Perfilador')),
+                ('perfil', models.TextField(verbose_name='Perfil')),
+                ('consultas', models.JSONField(default=list, verbose_name='Consultas SQL')),
+                ('usuario', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='perfiles_peticion', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Perfil de Petición',
+                'verbose_name_plural': 'Perfiles de Peticiones',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,111 @@
+"""
+Miniaturas y vistas previas de adjuntos (PNG de la primera página).
+
+Se generan en segundo plano (tarea 'generar_miniaturas' de la cola de trabajos)
+y se guardan junto al contenido: blobs/ab/cd/{hash}.miniatura.png y .vista.png.
+Como el contenido está direccionado por hash, un archivo adjuntado a varias
+notas se procesa una sola vez.
+
+Imágenes: Pillow. PDF: pdftoppm (poppler-utils) si está instalado; sin él los
+PDF quedan sin miniatura.
+"""
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+from PIL import Image, ImageOps
+
+from .almacenamiento import ruta_absoluta
+from .models import ArchivoBlob, EstadoTrabajoChoices, Trabajo
+from .trabajos import encolar, tarea
+
+logger = logging.getLogger(__name__)
+
+TAMAÑO_MINIATURA = (256, 256)
+TAMAÑO_VISTA_PREVIA = (1024, 1024)
+RESOLUCION_PDF = 100  # dpi: una página A4 queda en ~830x1170 px
+TIEMPO_MAXIMO_PDF = 60  # segundos
+
+
+class MiniaturaNoDisponible(Exception):
+    """No se puede generar la miniatura para este tipo de archivo."""
+
+
+def admite_miniatura(tipo_mime):
+    return bool(tipo_mime) and (
+        tipo_mime.startswith('image/') or tipo_mime == 'application/pdf'
+    )
+
+
+def programar_miniaturas(adjunto):
+    """
+    Encola la generación de miniaturas si el contenido aún no las tiene
+    ni hay un trabajo pendiente para el mismo contenido.
+    """
+    blob = adjunto.blob
+    if blob is None or blob.tiene_miniaturas or not admite_miniatura(adjunto.tipo_mime):
+        return None
+    en_cola = Trabajo.objects.filter(
+        tipo='generar_miniaturas',
+        datos__sha256=blob.sha256,
+        estado__in=[EstadoTrabajoChoices.PENDIENTE, EstadoTrabajoChoices.EN_PROCESO],
+    )
+    if en_cola.exists():
+        return None
+    return encolar('generar_miniaturas', sha256=blob.sha256, tipo_mime=adjunto.tipo_mime)
+
+
+def _renderizar_pdf(ruta):
+    if not shutil.which('pdftoppm'):
+        raise MiniaturaNoDisponible('pdftoppm no está instalado')
+    with tempfile.TemporaryDirectory() as directorio:
+        salida = os.path.join(directorio, 'pagina')
+        subprocess.run(
+            ['pdftoppm', '-png', '-f', '1', '-l', '1', '-singlefile',
+             '-r', str(RESOLUCION_PDF), ruta, salida],
+            check=True,
+            capture_output=True,
+            timeout=TIEMPO_MAXIMO_PDF,
+        )
+        with Image.open(f'{salida}.png') as imagen:
+            imagen.load()
+            return imagen.copy()
+
+
+def _primera_pagina(ruta, tipo_mime):
+    if tipo_mime == 'application/pdf':
+        return _renderizar_pdf(ruta)
+    with Image.open(ruta) as imagen:
+        # En JPEG decodifica directamente a una escala reducida (menos memoria y CPU).
+        imagen.draft('RGB', TAMAÑO_VISTA_PREVIA)
+        imagen.seek(0)
+        return ImageOps.exif_transpose(imagen)
+
+
+def _guardar_png(imagen, ruta_relativa):
+    destino = ruta_absoluta(ruta_relativa)
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(destino), delete=False) as temporal:
+        imagen.save(temporal, 'PNG', optimize=True)
+    os.replace(temporal.name, destino)
+
+
+@tarea('generar_miniaturas')
+def generar_miniaturas(sha256, tipo_mime):
+    """Genera miniatura y vista previa del contenido `sha256`."""
+    blob = ArchivoBlob.objects.filter(pk=sha256).first()
+    if blob is None or blob.tiene_miniaturas:
+        return
+    try:
+        imagen = _primera_pagina(ruta_absoluta(blob.ruta), tipo_mime)
+    except MiniaturaNoDisponible as e:
+        logger.info("Sin miniatura para %s: %s", sha256, e)
+        return
+    if imagen.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        imagen = imagen.convert('RGBA' if 'A' in imagen.getbands() else 'RGB')
+    imagen.thumbnail(TAMAÑO_VISTA_PREVIA)
+    _guardar_png(imagen, blob.ruta_vista_previa)
+    imagen.thumbnail(TAMAÑO_MINIATURA)
+    _guardar_png(imagen, blob.ruta_miniatura)
+    ArchivoBlob.objects.filter(pk=sha256).update(tiene_miniaturas=True)
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
@@ -71,6 +73,7 @@ class TipoEventoChoices(models.TextChoices):
     DERIVACION_DESPACHO = 'DERIVACION_DESPACHO', 'Derivación a Despacho'
     RESOLUCION_CARGADA = 'RESOLUCION_CARGADA', 'Resolución Cargada'
     DISTRIBUCION_SECTOR = 'DISTRIBUCION_SECTOR', 'Distribución a Sector'
+    RESPUESTA_EMAIL = 'RESPUESTA_EMAIL', 'Respuesta por Email'
 
 
 # --- Nota y tabla intermedia ---
@@ -419,7 +422,9 @@ class HistorialNota(models.Model):
         ordering = ['-fecha_hora']
         indexes = [
             models.Index(fields=['nota', '-fecha_hora']),
-            models.Index(fields=['usuario']),
+            models.Index(fields=['usuario', '-fecha_hora']),
+            models.Index(fields=['tipo_evento', '-fecha_hora']),
+            models.Index(fields=['-fecha_hora']),
         ]
 
     def __str__(self):
@@ -437,6 +442,57 @@ class TipoAdjuntoChoices(models.TextChoices):
     OTRO = 'OTRO', 'Otro'
 
 
+class ArchivoBlob(models.Model):
+    """
+    Contenido de un archivo almacenado por su hash SHA-256 (direccionado por contenido).
+    Un mismo contenido se guarda una sola vez aunque se adjunte a varias notas;
+    `referencias` cuenta los adjuntos que lo usan.
+    Ruta en disco: MEDIA_ROOT/blobs/{hash[:2]}/{hash[2:4]}/{hash}
+    """
+    sha256 = models.CharField(
+        max_length=64,
+        primary_key=True,
+        verbose_name='SHA-256'
+    )
+    tamaño_bytes = models.PositiveBigIntegerField(verbose_name='Tamaño en Bytes')
+    referencias = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Referencias',
+        help_text='Cantidad de adjuntos que usan este contenido'
+    )
+    tiene_miniaturas = models.BooleanField(
+        default=False,
+        verbose_name='Tiene Miniaturas',
+        help_text='Miniatura y vista previa de la primera página generadas'
+    )
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Creación'
+    )
+
+    class Meta:
+        verbose_name = 'Contenido de Adjunto'
+        verbose_name_plural = 'Contenidos de Adjuntos'
+
+    def __str__(self):
+        return f"{self.sha256} ({self.referencias} ref.)"
+
+    @property
+    def ruta(self):
+        """Ruta relativa a MEDIA_ROOT."""
+        return f"blobs/{self.sha256[:2]}/{self.sha256[2:4]}/{self.sha256}"
+
+    @property
+    def ruta_miniatura(self):
+        """PNG de la primera página (chico), junto al contenido."""
+        return f"{self.ruta}.miniatura.png"
+
+    @property
+    def ruta_vista_previa(self):
+        """PNG de la primera página en baja resolución, junto al contenido."""
+        return f"{self.ruta}.vista.png"
+
+
 class Adjunto(models.Model):
     """Archivo adjunto asociado a una nota."""
     nota = models.ForeignKey(
@@ -455,6 +511,15 @@ class Adjunto(models.Model):
         verbose_name='Ruta de Almacenamiento',
         help_text='Ruta donde se almacena el archivo en el servidor'
     )
+    blob = models.ForeignKey(
+        ArchivoBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='adjuntos',
+        verbose_name='Contenido',
+        help_text='Contenido almacenado por hash (vacío en adjuntos anteriores al almacenamiento por hash)'
+    )
     tipo_mime = models.CharField(
         max_length=100,
         verbose_name='Tipo MIME',
@@ -503,6 +568,62 @@ class Adjunto(models.Model):
         return f"{mb:.2f} MB"
 
 
+class CargaAdjunto(models.Model):
+    """
+    Subida de un adjunto por partes (reanudable).
+    El contenido se escribe en un archivo temporal bajo MEDIA_ROOT a medida que
+    llegan las partes; al completarse se verifica el SHA-256 y se crea el Adjunto.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    nota = models.ForeignKey(
+        Nota,
+        on_delete=models.CASCADE,
+        related_name='cargas_adjuntos',
+        verbose_name='Nota'
+    )
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='cargas_adjuntos',
+        verbose_name='Usuario'
+    )
+    nombre_archivo = models.CharField(max_length=255, verbose_name='Nombre del Archivo')
+    tipo_mime = models.CharField(max_length=100, verbose_name='Tipo MIME')
+    tipo_adjunto = models.CharField(
+        max_length=25,
+        choices=TipoAdjuntoChoices.choices,
+        default=TipoAdjuntoChoices.OTRO,
+        verbose_name='Tipo de Adjunto'
+    )
+    tamaño_bytes = models.PositiveBigIntegerField(verbose_name='Tamaño Total en Bytes')
+    recibidos = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Bytes Recibidos',
+        help_text='Offset desde el que debe continuar la subida'
+    )
+    sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='SHA-256 Declarado',
+        help_text='Hash del archivo completo informado por el cliente (opcional)'
+    )
+    ruta_temporal = models.CharField(
+        max_length=500,
+        verbose_name='Ruta Temporal',
+        help_text='Archivo parcial, relativo a MEDIA_ROOT'
+    )
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    ultima_actividad = models.DateTimeField(auto_now=True, verbose_name='Última Actividad')
+
+    class Meta:
+        verbose_name = 'Carga de Adjunto'
+        verbose_name_plural = 'Cargas de Adjuntos'
+        ordering = ['-fecha_creacion']
+
+    def __str__(self):
+        return f"{self.nombre_archivo} ({self.recibidos}/{self.tamaño_bytes})"
+
+
 # --- Legajo y distribución ---
 
 class TipoDocumentoLegajoChoices(models.TextChoices):
@@ -610,3 +731,298 @@ class DistribucionResolucion(models.Model):
 
     def __str__(self):
         return f"{self.nota.numero_nota} → {self.sector_destino}"
+
+
+# --- Archivo frío ---
+
+class NotaArchivada(models.Model):
+    """
+    Nota ARCHIVADA movida fuera de las tablas activas junto con su historial,
+    adjuntos y relaciones. Conserva el mismo id que tenía en notas_nota.
+    - resumen / detalle: representación de listado y de detalle al momento de archivar,
+      para responder lecturas sin reconstruir la nota.
+    - registros: filas serializadas (django.core.serializers) usadas para restaurarla.
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID')
+    numero_nota = models.CharField(max_length=30, unique=True, verbose_name='Número de Nota')
+    tema = models.CharField(max_length=100, verbose_name='Tema')
+    tarea_asignada = models.CharField(max_length=200, blank=True, verbose_name='Tarea Asignada')
+    remitente = models.CharField(max_length=200, blank=True, verbose_name='Remitente')
+    prioridad = models.CharField(
+        max_length=10,
+        choices=PrioridadChoices.choices,
+        verbose_name='Prioridad'
+    )
+    fecha_ingreso = models.DateTimeField(verbose_name='Fecha de Ingreso')
+    responsable = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Responsable'
+    )
+    creado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Creado Por'
+    )
+    fecha_archivo = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Archivo',
+        help_text='Fecha en que la nota se movió al archivo'
+    )
+    resumen = models.JSONField(verbose_name='Resumen')
+    detalle = models.JSONField(verbose_name='Detalle')
+    registros = models.JSONField(verbose_name='Registros')
+
+    class Meta:
+        verbose_name = 'Nota Archivada'
+        verbose_name_plural = 'Notas Archivadas'
+        ordering = ['-fecha_ingreso']
+        indexes = [
+            models.Index(fields=['fecha_ingreso']),
+            models.Index(fields=['responsable']),
+        ]
+
+    def __str__(self):
+        return f"{self.numero_nota} - {self.tema} (archivo)"
+
+
+# --- Trabajos en segundo plano ---
+
+class EstadoTrabajoChoices(models.TextChoices):
+    """Estados de un trabajo de la cola."""
+    PENDIENTE = 'PENDIENTE', 'Pendiente'
+    EN_PROCESO = 'EN_PROCESO', 'En Proceso'
+    COMPLETADO = 'COMPLETADO', 'Completado'
+    ERROR = 'ERROR', 'Error'
+
+
+class Trabajo(models.Model):
+    """
+    Trabajo de la cola en base de datos (ver notas/trabajos.py).
+    Lo ejecuta el comando procesar_jobs fuera del ciclo de las peticiones.
+    """
+    tipo = models.CharField(max_length=100, verbose_name='Tipo')
+    datos = models.JSONField(default=dict, blank=True, verbose_name='Datos')
+    estado = models.CharField(
+        max_length=20,
+        choices=EstadoTrabajoChoices.choices,
+        default=EstadoTrabajoChoices.PENDIENTE,
+        verbose_name='Estado'
+    )
+    intentos = models.PositiveIntegerField(default=0, verbose_name='Intentos')
+    max_intentos = models.PositiveIntegerField(
+        default=5,
+        verbose_name='Máximo de Intentos',
+        help_text='Al agotarlos el trabajo queda en ERROR'
+    )
+    ejecutar_despues = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Ejecutar Después De',
+        help_text='Los reintentos se reprograman con espera exponencial'
+    )
+    error = models.TextField(blank=True, verbose_name='Último Error')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    fecha_inicio = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Inicio')
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Fin')
+
+    class Meta:
+        verbose_name = 'Trabajo'
+        verbose_name_plural = 'Trabajos'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['estado', 'ejecutar_despues']),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.estado})"
+
+
+# --- Correo saliente ---
+
+class EstadoMailChoices(models.TextChoices):
+    """Estados de un mail de la bandeja de salida."""
+    PENDIENTE = 'PENDIENTE', 'Pendiente'
+    ENVIANDO = 'ENVIANDO', 'Enviando'
+    ENVIADO = 'ENVIADO', 'Enviado'
+    ERROR = 'ERROR', 'Error'
+
+
+class MailNota(models.Model):
+    """
+    Mail de la bandeja de salida (ver notas/notificaciones.py).
+    Se crea en la misma transacción que el cambio que lo origina y lo envía la
+    tarea 'enviar_correos' por lotes, reutilizando una conexión SMTP.
+    """
+    nota = models.ForeignKey(
+        Nota,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='mails',
+        verbose_name='Nota'
+    )
+    tipo_evento = models.CharField(
+        max_length=30,
+        choices=TipoEventoChoices.choices,
+        blank=True,
+        verbose_name='Evento'
+    )
+    asunto = models.CharField(max_length=255, verbose_name='Asunto')
+    cuerpo = models.TextField(verbose_name='Cuerpo')
+    destinatarios = models.JSONField(default=list, verbose_name='Para')
+    cc = models.JSONField(default=list, blank=True, verbose_name='CC')
+    message_id = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='Message-ID',
+        help_text='Permite asociar las respuestas a la nota'
+    )
+    estado = models.CharField(
+        max_length=20,
+        choices=EstadoMailChoices.choices,
+        default=EstadoMailChoices.PENDIENTE,
+        verbose_name='Estado'
+    )
+    intentos = models.PositiveIntegerField(default=0, verbose_name='Intentos')
+    proximo_intento = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Próximo Intento',
+        help_text='Mientras está ENVIANDO, vencimiento de la reserva del worker'
+    )
+    error = models.TextField(blank=True, verbose_name='Último Error')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    fecha_envio = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Envío')
+
+    class Meta:
+        verbose_name = 'Mail'
+        verbose_name_plural = 'Bandeja de Salida'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento']),
+        ]
+
+    def __str__(self):
+        return f"{self.asunto} ({self.estado})"
+
+
+# --- Correo entrante ---
+
+class BuzonCorreo(models.Model):
+    """
+    Estado de sincronización de una carpeta IMAP (ver notas/correo_entrante.py).
+    uidvalidity + ultimo_uid forman la marca de agua: cada corrida solo pide
+    mensajes con UID mayor; si UIDVALIDITY cambia, los UID anteriores ya no valen.
+    """
+    servidor = models.CharField(max_length=255, verbose_name='Servidor')
+    usuario = models.CharField(max_length=255, verbose_name='Usuario')
+    carpeta = models.CharField(max_length=255, default='INBOX', verbose_name='Carpeta')
+    uidvalidity = models.BigIntegerField(null=True, blank=True, verbose_name='UIDVALIDITY')
+    ultimo_uid = models.BigIntegerField(default=0, verbose_name='Último UID')
+    ultima_sincronizacion = models.DateTimeField(
+        null=True, blank=True, verbose_name='Última Sincronización'
+    )
+
+    class Meta:
+        verbose_name = 'Buzón de Correo'
+        verbose_name_plural = 'Buzones de Correo'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['servidor', 'usuario', 'carpeta'], name='buzon_correo_unico'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario}@{self.servidor}/{self.carpeta}"
+
+
+class MailRecibido(models.Model):
+    """Mail recibido por IMAP; `nota` queda vacía si no se pudo asociar."""
+    buzon = models.ForeignKey(
+        BuzonCorreo,
+        on_delete=models.CASCADE,
+        related_name='mails',
+        verbose_name='Buzón'
+    )
+    uid = models.BigIntegerField(verbose_name='UID')
+    message_id = models.CharField(max_length=255, unique=True, verbose_name='Message-ID')
+    in_reply_to = models.CharField(max_length=255, blank=True, verbose_name='In-Reply-To')
+    nota = models.ForeignKey(
+        Nota,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='mails_recibidos',
+        verbose_name='Nota'
+    )
+    remitente = models.CharField(max_length=255, verbose_name='Remitente')
+    asunto = models.CharField(max_length=255, blank=True, verbose_name='Asunto')
+    cuerpo = models.TextField(blank=True, verbose_name='Cuerpo (texto)')
+    fecha = models.DateTimeField(null=True, blank=True, verbose_name='Fecha del Mail')
+    fecha_recepcion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Recepción')
+
+    class Meta:
+        verbose_name = 'Mail Recibido'
+        verbose_name_plural = 'Mails Recibidos'
+        ordering = ['-fecha_recepcion']
+
+    def __str__(self):
+        return f"{self.remitente}: {self.asunto}"
+
+
+class ConsultaLenta(models.Model):
+    """
+    Consulta lenta muestreada con su plan de ejecución (ver notas/consultas_lentas.py).
+    Buffer circular: se conservan las últimas CONSULTAS_LENTAS_MAXIMO.
+    """
+    fecha = models.DateTimeField(auto_now_add=True, verbose_name='Fecha')
+    vista = models.CharField(max_length=200, blank=True, verbose_name='Vista')
+    base = models.CharField(max_length=50, verbose_name='Base de Datos')
+    duracion_ms = models.FloatField(verbose_name='Duración (ms)')
+    sql = models.TextField(verbose_name='SQL')
+    pila = models.TextField(blank=True, verbose_name='Pila de Llamadas')
+    plan = models.TextField(blank=True, verbose_name='Plan (EXPLAIN ANALYZE)')
+
+    class Meta:
+        verbose_name = 'Consulta Lenta'
+        verbose_name_plural = 'Consultas Lentas'
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.vista or '-'} ({self.duracion_ms:.0f} ms)"
+
+
+class PerfilPeticion(models.Model):
+    """
+    Perfil de una petición pedido por un administrador (ver notas/middleware.py).
+    Buffer circular: se conservan los últimos PERFILADO_MAXIMO.
+    """
+    fecha = models.DateTimeField(auto_now_add=True, verbose_name='Fecha')
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='perfiles_peticion',
+        verbose_name='Usuario'
+    )
+    metodo = models.CharField(max_length=10, verbose_name='Método')
+    ruta = models.CharField(max_length=500, verbose_name='Ruta')
+    vista = models.CharField(max_length=200, blank=True, verbose_name='Vista')
+    estado = models.PositiveSmallIntegerField(verbose_name='Código de Estado')
+    duracion_ms = models.FloatField(verbose_name='Duración (ms)')
+    motor = models.CharField(max_length=20, verbose_name='Perfilador')
+    perfil = models.TextField(verbose_name='Perfil')
+    consultas = models.JSONField(default=list, verbose_name='Consultas SQL')
+
+    class Meta:
+        verbose_name = 'Perfil de Petición'
+        verbose_name_plural = 'Perfiles de Peticiones'
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.metodo} {self.ruta} ({self.duracion_ms:.0f} ms)"
@@ -0,0 +1,235 @@
+"""
+Notificaciones por mail con bandeja de salida (MailNota).
+
+Los cambios que notifican (hoy, nota resuelta) solo insertan un MailNota en la
+misma transacción: la petición no espera al servidor SMTP.
+La tarea 'enviar_correos' de la cola de trabajos reserva los mails pendientes
+por lotes y los envía por una única conexión SMTP reutilizada, respetando
+CORREO_MAX_POR_MINUTO. Un mail que falla se reintenta con espera exponencial
+hasta CORREO_MAX_INTENTOS.
+"""
+import logging
+import smtplib
+import time
+from datetime import timedelta
+from email.utils import make_msgid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Min
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from .models import (
+    EstadoMailChoices,
+    EstadoTrabajoChoices,
+    MailNota,
+    TipoEventoChoices,
+    Trabajo,
+)
+from .trabajos import encolar, espera_reintento, tarea
+
+logger = logging.getLogger(__name__)
+
+# Tiempo que un worker tiene reservado un lote antes de que otro pueda retomarlo.
+TIEMPO_RESERVA = timedelta(minutes=10)
+# Rechazos propios del mensaje: se reintenta solo ese mail.
+ERRORES_MENSAJE = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+# Cualquier otro error de red o SMTP (smtplib.SMTPException hereda de OSError):
+# se corta el lote y se reintenta más tarde.
+ERRORES_CONEXION = OSError
+
+# Motivo de notificación -> (evento registrado en el mail, asunto). La derivación a
+# Despacho se agrega cuando exista la transición que la registra.
+NOTIFICACIONES = {
+    'RESUELTA': (TipoEventoChoices.CAMBIO_ESTADO, 'Nota {numero} resuelta: {tema}'),
+}
+
+
+def destinatarios_rrhh():
+    """Mails de los usuarios activos del sistema (van en copia)."""
+    return list(
+        get_user_model()
+        .objects.filter(usuario_sistema=True, is_active=True)
+        .exclude(email__isnull=True)
+        .exclude(email='')
+        .order_by('email')
+        .values_list('email', flat=True)
+        .distinct()
+    )
+
+
+def encolar_mail(asunto, cuerpo, destinatarios, cc=(), nota=None, tipo_evento=''):
+    """Agrega un mail a la bandeja de salida y programa su envío. Returns: MailNota"""
+    mail = MailNota.objects.create(
+        nota=nota,
+        tipo_evento=tipo_evento,
+        asunto=asunto[:255],
+        cuerpo=cuerpo,
+        destinatarios=list(destinatarios),
+        cc=list(cc),
+        message_id=make_msgid(domain=settings.DEFAULT_FROM_EMAIL.rpartition('@')[2] or None),
+    )
+    programar_envio()
+    return mail
+
+
+def notificar_nota(nota, motivo, usuario=None):
+    """
+    Avisa a Despacho (CORREO_DESPACHO) con copia a los usuarios de RRHH.
+    Args: motivo: clave de NOTIFICACIONES ('RESUELTA').
+    Returns: MailNota, o None si no hay destinatarios configurados.
+    """
+    tipo_evento, asunto = NOTIFICACIONES[motivo]
+    destinatarios = [settings.CORREO_DESPACHO] if settings.CORREO_DESPACHO else []
+    cc = [e for e in destinatarios_rrhh() if e not in destinatarios]
+    if not destinatarios and not cc:
+        return None
+    if not destinatarios:
+        destinatarios, cc = cc[:1], cc[1:]
+    asunto = asunto.format(numero=nota.numero_nota, tema=nota.tema)
+    lineas = [
+        asunto,
+        '',
+        f'Remitente: {nota.remitente}',
+        f'Tarea: {nota.tarea_asignada or "-"}',
+        f'Responsable: {nota.responsable.nombre_completo if nota.responsable else "-"}',
+    ]
+    if usuario is not None:
+        lineas.append(f'Registrado por: {usuario.nombre_completo}')
+    if nota.email_respuesta:
+        lineas.append(f'Email de respuesta: {nota.email_respuesta}')
+    return encolar_mail(
+        asunto,
+        '\n'.join(lineas) + '\n',
+        destinatarios,
+        cc,
+        nota=nota,
+        tipo_evento=tipo_evento,
+    )
+
+
+def programar_envio(cuando=None):
+    """
+    Asegura un trabajo 'enviar_correos' pendiente para `cuando` (default: ya).
+    Si ya hay uno programado para más tarde, lo adelanta.
+    """
+    cuando = cuando or timezone.now()
+    adelantados = Trabajo.objects.filter(
+        tipo='enviar_correos', estado=EstadoTrabajoChoices.PENDIENTE
+    ).update(ejecutar_despues=Least(F('ejecutar_despues'), cuando))
+    if not adelantados:
+        encolar('enviar_correos', retraso=max(cuando - timezone.now(), timedelta()))
+
+
+def _reservar_lote(cantidad):
+    ahora = timezone.now()
+    with transaction.atomic():
+        # Reservas vencidas (worker caído): vuelven a estar disponibles.
+        MailNota.objects.filter(
+            estado=EstadoMailChoices.ENVIANDO, proximo_intento__lt=ahora
+        ).update(estado=EstadoMailChoices.PENDIENTE)
+        mails = list(
+            MailNota.objects.select_for_update(skip_locked=True)
+            .filter(estado=EstadoMailChoices.PENDIENTE, proximo_intento__lte=ahora)
+            .order_by('proximo_intento', 'id')[:cantidad]
+        )
+        MailNota.objects.filter(pk__in=[m.pk for m in mails]).update(
+            estado=EstadoMailChoices.ENVIANDO, proximo_intento=ahora + TIEMPO_RESERVA
+        )
+    return mails
+
+
+def _mensaje(mail, conexion):
+    return EmailMessage(
+        subject=mail.asunto,
+        body=mail.cuerpo,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=mail.destinatarios,
+        cc=mail.cc,
+        headers={'Message-ID': mail.message_id},
+        connection=conexion,
+    )
+
+
+def _es_rechazo_permanente(error):
+    """Respuestas 5xx del servidor: reintentar no cambia el resultado."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(codigo >= 500 for codigo, _ in error.recipients.values())
+    return getattr(error, 'smtp_code', 0) >= 500
+
+
+def _registrar_fallo(mail, error, permanente=False):
+    mail.intentos += 1
+    mail.error = str(error)
+    if permanente or mail.intentos >= settings.CORREO_MAX_INTENTOS:
+        mail.estado = EstadoMailChoices.ERROR
+    else:
+        mail.estado = EstadoMailChoices.PENDIENTE
+        mail.proximo_intento = timezone.now() + espera_reintento(mail.intentos)
+    mail.save(update_fields=['intentos', 'error', 'estado', 'proximo_intento'])
+
+
+def enviar_pendientes(lote=None):
+    """
+    Envía los mails pendientes por lotes con una sola conexión SMTP.
+    Returns: (enviados, fallidos)
+    """
+    lote = lote or settings.CORREO_LOTE
+    intervalo = 60 / settings.CORREO_MAX_POR_MINUTO
+    ultimo_envio = None
+    enviados = fallidos = 0
+    conexion = get_connection(fail_silently=False)
+    try:
+        while mails := _reservar_lote(lote):
+            for indice, mail in enumerate(mails):
+                if ultimo_envio is not None:
+                    time.sleep(max(0, intervalo - (time.monotonic() - ultimo_envio)))
+                ultimo_envio = time.monotonic()
+                try:
+                    conexion.open()
+                    _mensaje(mail, conexion).send()
+                except ERRORES_MENSAJE as e:
+                    logger.warning("Mail rechazado %s: %s", mail, e)
+                    _registrar_fallo(mail, e, permanente=_es_rechazo_permanente(e))
+                    fallidos += 1
+                except ERRORES_CONEXION as e:
+                    # El servidor no responde: se liberan los que faltan y se reintenta más tarde.
+                    logger.warning("Conexión SMTP fallida: %s", e)
+                    conexion.close()
+                    _registrar_fallo(mail, e)
+                    fallidos += 1
+                    MailNota.objects.filter(pk__in=[m.pk for m in mails[indice + 1:]]).update(
+                        estado=EstadoMailChoices.PENDIENTE, proximo_intento=mail.proximo_intento
+                    )
+                    return enviados, fallidos
+                except Exception as e:
+                    logger.warning("No se pudo enviar %s: %s", mail, e)
+                    _registrar_fallo(mail, e)
+                    fallidos += 1
+                else:
+                    mail.estado = EstadoMailChoices.ENVIADO
+                    mail.fecha_envio = timezone.now()
+                    mail.error = ''
+                    mail.save(update_fields=['estado', 'fecha_envio', 'error'])
+                    enviados += 1
+    finally:
+        conexion.close()
+    return enviados, fallidos
+
+
+@tarea('enviar_correos')
+def enviar_correos():
+    """Vacía la bandeja de salida y reprograma el envío de los que esperan reintento."""
+    enviar_pendientes()
+    siguiente = MailNota.objects.filter(estado=EstadoMailChoices.PENDIENTE).aggregate(
+        siguiente=Min('proximo_intento')
+    )['siguiente']
+    if siguiente is not None:
+        programar_envio(siguiente)
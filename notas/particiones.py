@@ -0,0 +1,162 @@
+"""
+Particionado mensual de notas_historialnota (solo PostgreSQL).
+
+La tabla de historial es de solo inserción y crece mucho más rápido que las
+notas, por eso se particiona por rango de fecha_hora: una partición por mes
+más una partición DEFAULT que recibe cualquier fila fuera de rango.
+Las consultas que filtran por fecha_hora solo leen las particiones necesarias.
+"""
+from datetime import datetime
+
+from django.utils import timezone
+
+TABLA_HISTORIAL = 'notas_historialnota'
+PARTICION_DEFAULT = f'{TABLA_HISTORIAL}_default'
+
+
+def es_postgresql(connection):
+    """Indica si la conexión es PostgreSQL (el particionado no aplica a otros motores)."""
+    return connection.vendor == 'postgresql'
+
+
+def sumar_meses(año, mes, cantidad):
+    """Retorna (año, mes) desplazado `cantidad` meses (puede ser negativa)."""
+    indice = año * 12 + (mes - 1) + cantidad
+    return indice // 12, indice % 12 + 1
+
+
+def nombre_particion(año, mes):
+    """Nombre de la partición mensual: notas_historialnota_pYYYYMM."""
+    return f'{TABLA_HISTORIAL}_p{año}{mes:02d}'
+
+
+def limites_mes(año, mes):
+    """Límites [desde, hasta) del mes en la zona horaria del proyecto."""
+    tz = timezone.get_default_timezone()
+    siguiente_año, siguiente_mes = sumar_meses(año, mes, 1)
+    desde = timezone.make_aware(datetime(año, mes, 1), tz)
+    hasta = timezone.make_aware(datetime(siguiente_año, siguiente_mes, 1), tz)
+    return desde, hasta
+
+
+def esta_particionada(cursor):
+    """True si notas_historialnota ya es una tabla particionada."""
+    cursor.execute(
+        "SELECT c.relkind FROM pg_class c "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE c.relname = %s AND n.nspname = current_schema()",
+        [TABLA_HISTORIAL],
+    )
+    fila = cursor.fetchone()
+    return bool(fila) and fila[0] == 'p'
+
+
+def listar_particiones(cursor):
+    """
+    Lista las particiones mensuales vinculadas a la tabla de historial.
+    Returns: lista de tuplas (nombre, año, mes) ordenada por fecha.
+    """
+    cursor.execute(
+        "SELECT hija.relname FROM pg_inherits i "
+        "JOIN pg_class padre ON padre.oid = i.inhparent "
+        "JOIN pg_class hija ON hija.oid = i.inhrelid "
+        "WHERE padre.relname = %s",
+        [TABLA_HISTORIAL],
+    )
+    prefijo = f'{TABLA_HISTORIAL}_p'
+    particiones = []
+    for (nombre,) in cursor.fetchall():
+        sufijo = nombre[len(prefijo):]
+        if nombre.startswith(prefijo) and len(sufijo) == 6 and sufijo.isdigit():
+            particiones.append((nombre, int(sufijo[:4]), int(sufijo[4:])))
+    return sorted(particiones, key=lambda p: (p[1], p[2]))
+
+
+def _default_tiene_filas(cursor, desde, hasta):
+    """True si la partición DEFAULT (si existe) tiene filas en [desde, hasta)."""
+    cursor.execute("SELECT to_regclass(%s)", [PARTICION_DEFAULT])
+    if cursor.fetchone()[0] is None:
+        return False
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM "{PARTICION_DEFAULT}" '
+        f'WHERE fecha_hora >= %s AND fecha_hora < %s)',
+        [desde, hasta],
+    )
+    return cursor.fetchone()[0]
+
+
+def crear_particion(cursor, año, mes):
+    """
+    Crea la partición del mes si no existe.
+
+    Si la partición DEFAULT ya recibió filas de ese mes (el comando no corrió a
+    tiempo), PostgreSQL rechaza el CREATE TABLE ... PARTITION OF: la tabla se
+    crea suelta, las filas se mueven desde la DEFAULT y recién entonces se
+    vincula con ATTACH PARTITION. Debe ejecutarse dentro de una transacción
+    para que un error no deje filas a mitad de camino.
+    Returns: True si se creó, False si ya existía.
+    """
+    nombre = nombre_particion(año, mes)
+    cursor.execute("SELECT to_regclass(%s)", [nombre])
+    if cursor.fetchone()[0] is not None:
+        return False
+    desde, hasta = limites_mes(año, mes)
+    if not _default_tiene_filas(cursor, desde, hasta):
+        cursor.execute(
+            f'CREATE TABLE "{nombre}" PARTITION OF "{TABLA_HISTORIAL}" '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [desde, hasta],
+        )
+        return True
+    cursor.execute(
+        f'CREATE TABLE "{nombre}" (LIKE "{TABLA_HISTORIAL}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+    )
+    cursor.execute(
+        f'WITH movidas AS ('
+        f'DELETE FROM "{PARTICION_DEFAULT}" WHERE fecha_hora >= %s AND fecha_hora < %s '
+        f'RETURNING *) '
+        f'INSERT INTO "{nombre}" SELECT * FROM movidas',
+        [desde, hasta],
+    )
+    cursor.execute(
+        f'ALTER TABLE "{TABLA_HISTORIAL}" ATTACH PARTITION "{nombre}" '
+        f'FOR VALUES FROM (%s) TO (%s)',
+        [desde, hasta],
+    )
+    return True
+
+
+def crear_particion_default(cursor):
+    """Crea la partición DEFAULT que recibe filas sin partición mensual."""
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS "{PARTICION_DEFAULT}" '
+        f'PARTITION OF "{TABLA_HISTORIAL}" DEFAULT'
+    )
+
+
+def asegurar_particiones(cursor, desde_año, desde_mes, meses_adelante):
+    """
+    Crea las particiones desde (desde_año, desde_mes) hasta el mes actual
+    más `meses_adelante`. Returns: lista de nombres creados.
+    """
+    hoy = timezone.localdate()
+    hasta_año, hasta_mes = sumar_meses(hoy.year, hoy.month, meses_adelante)
+    año, mes = desde_año, desde_mes
+    creadas = []
+    while (año, mes) <= (hasta_año, hasta_mes):
+        if crear_particion(cursor, año, mes):
+            creadas.append(nombre_particion(año, mes))
+        año, mes = sumar_meses(año, mes, 1)
+    return creadas
+
+
+def desvincular_particion(cursor, nombre, esquema_archivo=None):
+    """
+    Desvincula (DETACH) una partición del historial. La tabla queda como tabla
+    independiente con sus datos; si se indica `esquema_archivo` se mueve a ese
+    esquema para sacarla del camino de las consultas y backups habituales.
+    """
+    cursor.execute(f'ALTER TABLE "{TABLA_HISTORIAL}" DETACH PARTITION "{nombre}"')
+    if esquema_archivo:
+        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{esquema_archivo}"')
+        cursor.execute(f'ALTER TABLE "{nombre}" SET SCHEMA "{esquema_archivo}"')
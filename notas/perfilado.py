@@ -0,0 +1,152 @@
+"""
+Perfilado de peticiones individuales a pedido (PerfiladoMiddleware).
+
+Un ADMINISTRADOR agrega el encabezado 'X-Perfilar: 1' (o ?perfilar=1) a una
+petición: se ejecuta bajo cProfile o pyinstrument (PERFILADO_MOTOR), se guarda
+el perfil junto con la lista de consultas SQL en PerfilPeticion y la respuesta
+trae en 'X-Perfil' el link para verlo (/api/perfiles/{id}/, también en el admin).
+
+Desactivado por defecto (PERFILADO_HABILITADO): el middleware no se carga.
+Con ASGI, el código sync que corre en hilos (sync_to_async) no aparece en el
+perfil de cProfile; la lista de consultas sí es completa.
+
+cProfile admite un solo perfil activo por proceso (desde Python 3.12 usa
+sys.monitoring y un segundo enable() falla): mientras hay uno en curso, las
+demás peticiones que piden perfil se atienden sin perfilar.
+"""
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+
+from config.metricas import nombre_vista
+
+from .models import PerfilPeticion
+
+LINEAS_PERFIL = 80  # funciones listadas en el perfil de cProfile
+MAXIMO_CONSULTAS = 2000  # consultas guardadas por perfil
+
+_consultas = ContextVar('consultas_perfiladas', default=None)
+_cprofile_en_uso = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def pedido(request):
+    return request.headers.get('X-Perfilar') == '1' or request.GET.get('perfilar') == '1'
+
+
+def consultas_repetidas(consultas, cantidad=10):
+    """SQL que se ejecutó más de una vez (candidatas a N+1). Returns: [(veces, sql)]"""
+    repeticiones = Counter(c['sql'] for c in consultas)
+    return [(veces, sql) for sql, veces in repeticiones.most_common(cantidad) if veces > 1]
+
+
+def _registrar_consulta(execute, sql, params, many, context):
+    consultas = _consultas.get()
+    if consultas is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if len(consultas) < MAXIMO_CONSULTAS:
+            consultas.append(
+                {
+                    'sql': sql,
+                    'parametros': repr(params)[:500],
+                    'duracion_ms': round((time.perf_counter() - inicio) * 1000, 3),
+                    'base': context['connection'].alias,
+                }
+            )
+
+
+def _instalar_en_conexion(sender, connection, **kwargs):
+    if _registrar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_registrar_consulta)
+
+
+def instalar():
+    """Verifica el motor y registra las consultas en todas las conexiones."""
+    if settings.PERFILADO_MOTOR not in ('cprofile', 'pyinstrument'):
+        raise ImproperlyConfigured("PERFILADO_MOTOR debe ser 'cprofile' o 'pyinstrument'.")
+    if settings.PERFILADO_MOTOR == 'pyinstrument':
+        try:
+            import pyinstrument  # noqa: F401
+        except ImportError:
+            raise ImproperlyConfigured("PERFILADO_MOTOR='pyinstrument' requiere pip install pyinstrument.")
+    connection_created.connect(_instalar_en_conexion, dispatch_uid='perfilado')
+    for conexion in connections.all(initialized_only=True):
+        _instalar_en_conexion(None, conexion)
+
+
+class Perfilado:
+    """Perfil en curso de una petición: iniciar() antes de la vista, terminar() después."""
+
+    def __init__(self, asincronico=False):
+        self.asincronico = asincronico
+        self.consultas = []
+
+    def iniciar(self):
+        """Returns: False si ya hay un perfil de cProfile en curso (no se perfila)."""
+        if settings.PERFILADO_MOTOR == 'pyinstrument':
+            from pyinstrument import Profiler
+
+            self.perfilador = Profiler(async_mode='enabled' if self.asincronico else 'disabled')
+            self.perfilador.start()
+        else:
+            if not _cprofile_en_uso.acquire(blocking=False):
+                logger.info('Perfil omitido: ya hay otra petición perfilándose con cProfile')
+                return False
+            self.perfilador = cProfile.Profile()
+            try:
+                self.perfilador.enable()
+            except ValueError:
+                # sys.monitoring ya tiene otro perfilador (p. ej. un depurador).
+                _cprofile_en_uso.release()
+                logger.info('Perfil omitido: cProfile no está disponible en este proceso')
+                return False
+        self.token = _consultas.set(self.consultas)
+        self.inicio = time.perf_counter()
+        return True
+
+    def terminar(self):
+        duracion = time.perf_counter() - self.inicio
+        if settings.PERFILADO_MOTOR == 'pyinstrument':
+            self.perfilador.stop()
+            texto = self.perfilador.output_text(unicode=True, color=False)
+        else:
+            self.perfilador.disable()
+            _cprofile_en_uso.release()
+            salida = io.StringIO()
+            pstats.Stats(self.perfilador, stream=salida).sort_stats('cumulative').print_stats(LINEAS_PERFIL)
+            texto = salida.getvalue()
+        _consultas.reset(self.token)
+        return duracion, texto
+
+    def guardar(self, request, response, duracion, texto):
+        """Guarda el perfil y agrega el link en 'X-Perfil'. Returns: PerfilPeticion"""
+        perfil = PerfilPeticion.objects.create(
+            usuario=request.user,
+            metodo=request.method,
+            ruta=request.get_full_path()[:500],
+            vista=nombre_vista(request)[:200],
+            estado=response.status_code,
+            duracion_ms=duracion * 1000,
+            motor=settings.PERFILADO_MOTOR,
+            perfil=texto,
+            consultas=self.consultas,
+        )
+        PerfilPeticion.objects.filter(id__lte=perfil.id - settings.PERFILADO_MAXIMO).delete()
+        response['X-Perfil'] = request.build_absolute_uri(reverse('perfil-peticion', args=[perfil.pk]))
+        return perfil
@@ -1,8 +1,12 @@
+from operator import itemgetter
+
 from rest_framework import serializers
+from django.db.models import BooleanField, Case, Q, Value, When
+from django.urls import reverse
 from django.utils import timezone
-from django.conf import settings
-from .models import Nota, HistorialNota, Adjunto, Sector, EstadoChoices
-import os
+from .models import Nota, HistorialNota, Adjunto, CargaAdjunto, Sector, EstadoChoices
+from .almacenamiento import guardar_blob
+from .miniaturas import programar_miniaturas
 
 
 class SectorSerializer(serializers.ModelSerializer):
@@ -47,6 +51,122 @@ class NotaListSerializer(serializers.ModelSerializer):
             return timezone.now().date() > obj.fecha_limite
         return False
 
+
+# --- Listado liviano: mismo resultado que NotaListSerializer sin instanciar modelos ---
+
+CAMPOS_LISTA = (
+    'id', 'numero_nota', 'tema', 'estado', 'prioridad',
+    'fecha_limite', 'fecha_ingreso', 'email_respuesta',
+)
+_campo_fecha = serializers.DateField()
+_campo_fecha_hora = serializers.DateTimeField()
+
+
+def valores_lista_notas(queryset, campos=None):
+    """
+    Restringe un queryset de Nota a las columnas del listado con .values():
+    sin descripcion ni demás campos, el responsable por JOIN y `atrasada`
+    calculada en la base (misma regla que NotaListSerializer.get_atrasada).
+    Con `campos` (?fields=) solo se leen las columnas de esos campos.
+    Admite filtros, orden y paginación como cualquier queryset; se serializa
+    con filas_lista_notas().
+    """
+    if campos is None:
+        campos = NotaListSerializer.Meta.fields
+    columnas = ['id', *(nombre for nombre in campos if nombre in CAMPOS_LISTA and nombre != 'id')]
+    if 'responsable' in campos:
+        columnas += ['responsable_id', 'responsable__apellido', 'responsable__nombres']
+    filas = queryset.values(*columnas)
+    if 'atrasada' in campos:
+        hoy = timezone.now().date()
+        filas = filas.annotate(
+            atrasada=Case(
+                When(
+                    Q(fecha_limite__lt=hoy)
+                    & ~Q(estado__in=[EstadoChoices.ARCHIVADA, EstadoChoices.ANULADA]),
+                    then=Value(True),
+                ),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        )
+    return filas
+
+
+def _responsable(fila):
+    if fila['responsable_id'] is None:
+        return None
+    return {
+        'id': fila['responsable_id'],
+        'nombre_completo': f"{fila['responsable__apellido']}, {fila['responsable__nombres']}",
+    }
+
+
+def _fecha_limite(fila):
+    valor = fila['fecha_limite']
+    return _campo_fecha.to_representation(valor) if valor is not None else None
+
+
+def _fecha_ingreso(fila):
+    valor = fila['fecha_ingreso']
+    return _campo_fecha_hora.to_representation(valor) if valor is not None else None
+
+
+# Campos del listado que no se copian tal cual de la fila
+_CONVERSIONES_LISTA = {
+    'responsable': _responsable,
+    'fecha_limite': _fecha_limite,
+    'fecha_ingreso': _fecha_ingreso,
+}
+
+
+def filas_lista_notas(filas, campos=None):
+    """
+    Filas de valores_lista_notas() -> mismos dicts que NotaListSerializer(many=True).data
+    (con `campos`, solo esas claves).
+    """
+    if campos is not None:
+        valores = [
+            (nombre, _CONVERSIONES_LISTA.get(nombre) or itemgetter(nombre)) for nombre in campos
+        ]
+        return [{nombre: valor(fila) for nombre, valor in valores} for fila in filas]
+    # Todos los campos (caso común): dict literal sin llamadas por campo, bastante más rápido.
+    fecha = _campo_fecha.to_representation
+    fecha_hora = _campo_fecha_hora.to_representation
+    return [
+        {
+            'id': fila['id'],
+            'numero_nota': fila['numero_nota'],
+            'tema': fila['tema'],
+            'estado': fila['estado'],
+            'prioridad': fila['prioridad'],
+            'responsable': {
+                'id': fila['responsable_id'],
+                'nombre_completo': f"{fila['responsable__apellido']}, {fila['responsable__nombres']}",
+            } if fila['responsable_id'] is not None else None,
+            'fecha_limite': fecha(fila['fecha_limite']) if fila['fecha_limite'] is not None else None,
+            'fecha_ingreso': fecha_hora(fila['fecha_ingreso']) if fila['fecha_ingreso'] is not None else None,
+            'email_respuesta': fila['email_respuesta'],
+            'atrasada': fila['atrasada'],
+        }
+        for fila in filas
+    ]
+
+
+class CamposDinamicosMixin:
+    """
+    Serializer con `campos` opcional (?fields= / ?expand= en NotaViewSet): los
+    demás campos se quitan antes de serializar, así los SerializerMethodField no
+    pedidos (historial, adjuntos) ni siquiera consultan la base.
+    """
+
+    def __init__(self, *args, campos=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if campos is not None:
+            for nombre in set(self.fields) - set(campos):
+                self.fields.pop(nombre)
+
+
 class NotaCreateSerializer(serializers.Serializer):
     """
     Serializer simple (no ModelSerializer) para crear notas.
@@ -112,8 +232,10 @@ class NotaCreateSerializer(serializers.Serializer):
         return nota
 
 
-class NotaDetalleSerializer(serializers.ModelSerializer):
+class NotaDetalleSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para detalle completo de una nota."""
+    # Relaciones que con ?fields= / ?expand= solo se incluyen si se piden
+    RELACIONES = ('historial', 'adjuntos')
     responsable = serializers.SerializerMethodField()
     creado_por = serializers.SerializerMethodField()
     historial = serializers.SerializerMethodField()
@@ -177,13 +299,17 @@ class NotaDetalleSerializer(serializers.ModelSerializer):
     
     
     def get_historial(self, obj):
-        """Retorna el historial de la nota."""
-        historial = obj.historial.all().order_by('-fecha_hora')
+        """Retorna el historial de la nota (precargado en `historial_ordenado` si existe)."""
+        historial = getattr(obj, 'historial_ordenado', None)
+        if historial is None:
+            historial = obj.historial.all().order_by('-fecha_hora')
         return HistorialNotaSerializer(historial, many=True).data
     
     def get_adjuntos(self, obj):
-        """Retorna los adjuntos de la nota."""
-        adjuntos = obj.adjuntos.all().order_by('-fecha_subida')
+        """Retorna los adjuntos de la nota (precargados en `adjuntos_ordenados` si existen)."""
+        adjuntos = getattr(obj, 'adjuntos_ordenados', None)
+        if adjuntos is None:
+            adjuntos = obj.adjuntos.select_related('blob', 'subido_por').order_by('-fecha_subida')
         return AdjuntoSerializer(adjuntos, many=True).data
     
     def get_atrasada(self, obj):
@@ -237,6 +363,16 @@ class NotaCambioEstadoSerializer(serializers.Serializer):
         return data
 
 
+class NotaCambioEstadoMasivoSerializer(NotaCambioEstadoSerializer):
+    """Serializer para cambio de estado de varias notas en una sola operación."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=500,
+        help_text='IDs de las notas a transicionar'
+    )
+
+
 class HistorialNotaSerializer(serializers.ModelSerializer):
     """Serializer para historial de notas (solo lectura)."""
     nota = serializers.StringRelatedField(read_only=True)
@@ -271,6 +407,8 @@ class AdjuntoSerializer(serializers.ModelSerializer):
     archivo = serializers.FileField(write_only=True, required=False)
     tamaño_formateado = serializers.SerializerMethodField()
     url = serializers.SerializerMethodField()
+    miniatura_url = serializers.SerializerMethodField()
+    vista_previa_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Adjunto
@@ -281,6 +419,8 @@ class AdjuntoSerializer(serializers.ModelSerializer):
             'tipo_adjunto',
             'ruta_almacenamiento',
             'url',
+            'miniatura_url',
+            'vista_previa_url',
             'tipo_mime',
             'tamaño_bytes',
             'subido_por',
@@ -297,35 +437,41 @@ class AdjuntoSerializer(serializers.ModelSerializer):
         ]
 
     def get_url(self, obj):
-        """Construye la URL completa del archivo."""
-        if not obj.ruta_almacenamiento:
+        """URL de descarga del archivo (endpoint con control de permisos)."""
+        if not obj.ruta_almacenamiento or obj.pk is None:
+            return None
+        return reverse('adjunto-descargar', args=[obj.pk])
+
+    def get_miniatura_url(self, obj):
+        """URL de la miniatura PNG; None mientras no se haya generado."""
+        if obj.blob is None or not obj.blob.tiene_miniaturas:
+            return None
+        return reverse('adjunto-miniatura', args=[obj.pk])
+
+    def get_vista_previa_url(self, obj):
+        """URL de la vista previa PNG de la primera página; None mientras no exista."""
+        if obj.blob is None or not obj.blob.tiene_miniaturas:
             return None
-        return f"http://localhost:8000/media/{obj.ruta_almacenamiento}"
+        return reverse('adjunto-vista-previa', args=[obj.pk])
     
     def get_tamaño_formateado(self, obj):
         """Retorna el tamaño formateado del archivo."""
         return obj.tamaño_formateado()
 
     def create(self, validated_data):
-        """Guarda el archivo en disco y rellena los campos correspondientes."""
+        """
+        Guarda el archivo por contenido (SHA-256) y rellena los campos correspondientes.
+        Si el mismo contenido ya estaba almacenado, se reutiliza sin volver a escribirlo.
+        Las miniaturas se generan en segundo plano (procesar_jobs).
+        """
         archivo = validated_data.pop('archivo', None)
     
         if archivo:
-            # Crear carpeta media si no existe
-            media_root = settings.MEDIA_ROOT
-            os.makedirs(media_root, exist_ok=True)
-        
-            # Guardar archivo en disco
-            nombre_archivo = archivo.name
-            ruta_completa = os.path.join(media_root, nombre_archivo)
-        
-            with open(ruta_completa, 'wb+') as destino:
-                for chunk in archivo.chunks():
-                    destino.write(chunk)
-        
-            validated_data['ruta_almacenamiento'] = nombre_archivo
-            validated_data['nombre_archivo'] = nombre_archivo
-            validated_data['tamaño_bytes'] = archivo.size or 0
+            blob = guardar_blob(archivo)
+            validated_data['blob'] = blob
+            validated_data['ruta_almacenamiento'] = blob.ruta
+            validated_data['nombre_archivo'] = archivo.name
+            validated_data['tamaño_bytes'] = blob.tamaño_bytes
             validated_data['tipo_mime'] = getattr(
                 archivo, 'content_type', 'application/octet-stream'
             ) or 'application/octet-stream'
@@ -335,4 +481,38 @@ class AdjuntoSerializer(serializers.ModelSerializer):
             validated_data['tamaño_bytes'] = 0
             validated_data['tipo_mime'] = 'application/octet-stream'
         
-        return super().create(validated_data)
+        adjunto = super().create(validated_data)
+        programar_miniaturas(adjunto)
+        return adjunto
+
+
+class CargaAdjuntoSerializer(serializers.ModelSerializer):
+    """Sesión de subida por partes: datos del archivo y offset alcanzado."""
+    sha256 = serializers.RegexField(
+        r'^[0-9a-fA-F]{64}$', required=False, allow_blank=True
+    )
+
+    class Meta:
+        model = CargaAdjunto
+        fields = [
+            'id',
+            'nota',
+            'nombre_archivo',
+            'tipo_mime',
+            'tipo_adjunto',
+            'tamaño_bytes',
+            'sha256',
+            'recibidos',
+            'fecha_creacion',
+            'ultima_actividad',
+        ]
+        read_only_fields = [
+            'nota',
+            'recibidos',
+            'fecha_creacion',
+            'ultima_actividad',
+        ]
+        extra_kwargs = {
+            'tipo_mime': {'required': False, 'allow_blank': True},
+            'tamaño_bytes': {'min_value': 1},
+        }
@@ -1,3 +1,1348 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import hashlib
+import imaplib
+import io
+import os
+import shutil
+import socket
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from email.message import EmailMessage
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
\ No newline at end of file
+import psycopg
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from agentes.models import Agente, RolChoices
+from config import compresion
+from config.middleware import CompresionMiddleware
+from config.renderers import ORJSONParser, ORJSONRenderer
+from config.routers import COOKIE_ESCRITURA, REPLICA, ReplicaRouter, en_replica
+
+from .almacenamiento import archivo_temporal, registrar_blob, ruta_absoluta
+from .archivo import archivar_nota, restaurar_nota
+from .cargas import ErrorCarga, completar_carga
+from .correo_entrante import SincronizadorImap
+from .eventos import CANAL, Difusor, _eventos_perdidos, es_visible
+from .management.commands.limpiar_blobs import Command as LimpiarBlobs
+from .models import (
+    Adjunto,
+    ArchivoBlob,
+    CargaAdjunto,
+    EstadoChoices,
+    EstadoMailChoices,
+    HistorialNota,
+    MailNota,
+    MailRecibido,
+    Nota,
+    PerfilPeticion,
+    Sector,
+    TipoEventoChoices,
+)
+from .notificaciones import encolar_mail, enviar_pendientes
+from .particiones import (
+    PARTICION_DEFAULT,
+    crear_particion,
+    limites_mes,
+    listar_particiones,
+    nombre_particion,
+)
+from .perfilado import Perfilado
+from .serializers import NotaListSerializer, filas_lista_notas, valores_lista_notas
+from .utils import crear_registro_historial
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+
+class NotasTestCase(TestCase):
+    """Usuarios, sector y cliente autenticado comunes a las pruebas de la API de notas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Agente.objects.create_user(
+            '1001', password='x', apellido='Admin', nombres='Ana', rol=RolChoices.ADMINISTRADOR
+        )
+        cls.operador = Agente.objects.create_user(
+            '1002', password='x', apellido='Operador', nombres='Oscar', rol=RolChoices.OPERADOR
+        )
+        cls.sector = Sector.objects.create(nombre='Mesa de Entradas', numero=138)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def crear_nota(self, **datos):
+        respuesta = self.client.post(
+            '/api/notas/', {'sector_origen_id': self.sector.id, 'tema': 'Tema', **datos}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 201, respuesta.content)
+        return Nota.objects.get(pk=respuesta.json()['id'])
+
+
+class MediaTemporalMixin:
+    """MEDIA_ROOT en un directorio temporal que se borra al terminar cada prueba."""
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        configuracion = override_settings(MEDIA_ROOT=directorio)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+
+def guardar_temporal(contenido):
+    """Escribe `contenido` en un archivo temporal de blobs. Returns: (ruta, sha256)"""
+    with archivo_temporal() as destino:
+        destino.write(contenido)
+    return destino.name, hashlib.sha256(contenido).hexdigest()
+
+
+def envejecer(ruta, horas):
+    antes = time.time() - horas * 3600
+    os.utime(ruta, (antes, antes))
+
+
+class CambioEstadoMasivoTests(NotasTestCase):
+    URL = '/api/notas/cambiar_estado_masivo/'
+
+    def test_transiciona_las_validas_e_informa_las_demas(self):
+        ingresada = self.crear_nota()
+        asignada = self.crear_nota(responsable_id=self.operador.id)
+        resuelta = self.crear_nota()
+        Nota.objects.filter(pk=resuelta.pk).update(estado=EstadoChoices.RESUELTA)
+
+        respuesta = self.client.post(self.URL, {
+            'ids': [ingresada.id, asignada.id, resuelta.id, 999999],
+            'estado_nuevo': EstadoChoices.ARCHIVADA,
+            'motivo': 'Fin de año',
+        }, format='json')
+
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        datos = respuesta.json()
+        self.assertEqual(datos['actualizadas'], 3)
+        resultados = {r['id']: r for r in datos['resultados']}
+        self.assertTrue(resultados[ingresada.id]['ok'])
+        self.assertEqual(resultados[asignada.id]['estado_anterior'], EstadoChoices.ASIGNADA)
+        self.assertFalse(resultados[999999]['ok'])
+        self.assertEqual(resultados[999999]['error'], 'Nota no encontrada')
+        self.assertEqual(
+            Nota.objects.filter(estado=EstadoChoices.ARCHIVADA).count(), 3
+        )
+        self.assertEqual(
+            HistorialNota.objects.filter(tipo_evento=TipoEventoChoices.ARCHIVADO).count(), 3
+        )
+
+    def test_rechaza_transiciones_no_permitidas_por_nota(self):
+        ingresada = self.crear_nota()
+        en_proceso = self.crear_nota(responsable_id=self.operador.id)
+        Nota.objects.filter(pk=en_proceso.pk).update(estado=EstadoChoices.EN_PROCESO)
+
+        respuesta = self.client.post(self.URL, {
+            'ids': [ingresada.id, en_proceso.id],
+            'estado_nuevo': EstadoChoices.RESUELTA,
+        }, format='json')
+
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        resultados = {r['id']: r for r in respuesta.json()['resultados']}
+        self.assertFalse(resultados[ingresada.id]['ok'])
+        self.assertIn('No se puede cambiar de INGRESADA a RESUELTA', resultados[ingresada.id]['error'])
+        self.assertTrue(resultados[en_proceso.id]['ok'])
+        ingresada.refresh_from_db()
+        self.assertEqual(ingresada.estado, EstadoChoices.INGRESADA)
+        self.assertFalse(HistorialNota.objects.filter(
+            nota=ingresada, tipo_evento=TipoEventoChoices.CAMBIO_ESTADO
+        ).exists())
+
+    def test_asignar_requiere_responsable_y_lo_aplica_a_todas(self):
+        notas = [self.crear_nota(), self.crear_nota()]
+        ids = [nota.id for nota in notas]
+
+        respuesta = self.client.post(
+            self.URL, {'ids': ids, 'estado_nuevo': EstadoChoices.ASIGNADA}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('responsable_nuevo', respuesta.json())
+
+        respuesta = self.client.post(self.URL, {
+            'ids': ids, 'estado_nuevo': EstadoChoices.ASIGNADA, 'responsable_nuevo': self.operador.id,
+        }, format='json')
+        self.assertEqual(respuesta.json()['actualizadas'], 2)
+        self.assertEqual(
+            set(Nota.objects.filter(pk__in=ids).values_list('responsable_id', flat=True)),
+            {self.operador.id},
+        )
+        self.assertEqual(
+            HistorialNota.objects.filter(nota_id__in=ids, tipo_evento=TipoEventoChoices.ASIGNACION).count(), 2
+        )
+
+    def test_en_espera_requiere_motivo(self):
+        nota = self.crear_nota(responsable_id=self.operador.id)
+        Nota.objects.filter(pk=nota.pk).update(estado=EstadoChoices.EN_PROCESO)
+
+        respuesta = self.client.post(
+            self.URL, {'ids': [nota.id], 'estado_nuevo': EstadoChoices.EN_ESPERA}, format='json'
+        )
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('motivo', respuesta.json())
+        nota.refresh_from_db()
+        self.assertEqual(nota.estado, EstadoChoices.EN_PROCESO)
+
+    def test_historial_de_todas_las_notas_en_un_solo_insert(self):
+        ids = [self.crear_nota().id for _ in range(5)]
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(
+                self.URL, {'ids': ids, 'estado_nuevo': EstadoChoices.ARCHIVADA}, format='json'
+            )
+        self.assertEqual(respuesta.json()['actualizadas'], 5)
+        inserts = [
+            c['sql'] for c in consultas.captured_queries
+            if c['sql'].startswith('INSERT INTO "notas_historialnota"')
+        ]
+        self.assertEqual(len(inserts), 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'El particionado del historial requiere PostgreSQL.')
+class ParticionesHistorialTests(NotasTestCase):
+    def test_crear_particion_mueve_las_filas_que_cayeron_en_default(self):
+        nota = self.crear_nota()
+        registro = HistorialNota.objects.get(nota=nota)
+        desde, _ = limites_mes(2090, 1)
+        # Mes sin partición: PostgreSQL mueve la fila a la DEFAULT.
+        HistorialNota.objects.filter(pk=registro.pk).update(fecha_hora=desde + timedelta(days=3))
+        nombre = nombre_particion(2090, 1)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT id FROM "{PARTICION_DEFAULT}"')
+            self.assertEqual(cursor.fetchall(), [(registro.pk,)])
+
+            self.assertTrue(crear_particion(cursor, 2090, 1))
+
+            cursor.execute(f'SELECT count(*) FROM "{PARTICION_DEFAULT}"')
+            self.assertEqual(cursor.fetchone()[0], 0)
+            cursor.execute(f'SELECT id FROM "{nombre}"')
+            self.assertEqual(cursor.fetchall(), [(registro.pk,)])
+            self.assertIn((nombre, 2090, 1), listar_particiones(cursor))
+            self.assertFalse(crear_particion(cursor, 2090, 1))
+        self.assertEqual(HistorialNota.objects.get(pk=registro.pk).nota_id, nota.pk)
+
+
+class LimpiarBlobsTests(MediaTemporalMixin, TestCase):
+    def test_borra_el_archivo_de_una_transaccion_revertida(self):
+        ruta, sha256 = guardar_temporal(b'revertido')
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            blob = registrar_blob(ruta, sha256, 9)
+            raise RuntimeError
+        huerfano = ruta_absoluta(blob.ruta)
+        self.assertTrue(os.path.exists(huerfano))
+        self.assertFalse(ArchivoBlob.objects.filter(pk=sha256).exists())
+
+        ruta, sha256 = guardar_temporal(b'registrado')
+        registrado = ruta_absoluta(registrar_blob(ruta, sha256, 10).ruta)
+        temporal, _ = guardar_temporal(b'subida cortada')
+        reciente, _ = guardar_temporal(b'en curso')
+        for archivo in (huerfano, registrado, temporal):
+            envejecer(archivo, 2)
+
+        call_command('limpiar_blobs', horas_huerfanos=1, stdout=io.StringIO())
+
+        self.assertFalse(os.path.exists(huerfano))
+        self.assertFalse(os.path.exists(temporal))
+        self.assertTrue(os.path.exists(registrado))
+        self.assertTrue(os.path.exists(reciente))
+
+    def test_no_borra_un_contenido_que_volvio_a_usarse(self):
+        ruta, sha256 = guardar_temporal(b'compartido')
+        blob = registrar_blob(ruta, sha256, 10)
+        ArchivoBlob.objects.filter(pk=sha256).update(referencias=0)
+        # Otra subida del mismo contenido entre el listado y el borrado.
+        ruta, _ = guardar_temporal(b'compartido')
+        registrar_blob(ruta, sha256, 10)
+
+        self.assertFalse(LimpiarBlobs().eliminar_blob(sha256))
+        self.assertTrue(os.path.exists(ruta_absoluta(blob.ruta)))
+
+        ArchivoBlob.objects.filter(pk=sha256).update(referencias=0)
+        self.assertTrue(LimpiarBlobs().eliminar_blob(sha256))
+        self.assertFalse(os.path.exists(ruta_absoluta(blob.ruta)))
+        self.assertFalse(ArchivoBlob.objects.filter(pk=sha256).exists())
+
+
+class SubidaAdjuntoTests(MediaTemporalMixin, NotasTestCase):
+    def test_error_al_crear_el_adjunto_revierte_la_referencia(self):
+        nota = self.crear_nota()
+        contenido = b'contenido del adjunto'
+        sha256 = hashlib.sha256(contenido).hexdigest()
+        archivo = io.BytesIO(contenido)
+        archivo.name = 'informe.txt'
+        with mock.patch('notas.serializers.programar_miniaturas', side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.client.post(f'/api/notas/{nota.id}/adjuntos/', {
+                'archivo': archivo, 'nombre_archivo': 'informe.txt',
+            })
+        self.assertFalse(ArchivoBlob.objects.filter(pk=sha256).exists())
+        self.assertFalse(Adjunto.objects.filter(nota=nota).exists())
+
+
+class CargaPorPartesTests(MediaTemporalMixin, NotasTestCase):
+    CONTENIDO = b'0123456789abcdefghij'
+
+    def iniciar(self, **datos):
+        nota = self.crear_nota()
+        respuesta = self.client.post(f'/api/notas/{nota.id}/adjuntos/cargas/', {
+            'nombre_archivo': 'informe.pdf',
+            'tamaño_bytes': len(self.CONTENIDO),
+            'sha256': hashlib.sha256(self.CONTENIDO).hexdigest(),
+            **datos,
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 201, respuesta.content)
+        return nota, f"/api/cargas-adjuntos/{respuesta.json()['id']}/"
+
+    def enviar(self, url, inicio, fin, contenido=None, **encabezados):
+        if contenido is None:
+            contenido = self.CONTENIDO[inicio:fin + 1]
+        return self.client.put(
+            url, contenido, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {inicio}-{fin}/{len(self.CONTENIDO)}', **encabezados,
+        )
+
+    def test_partes_en_orden_y_completar(self):
+        nota, url = self.iniciar()
+        self.assertEqual(self.enviar(url, 0, 7).json()['recibidos'], 8)
+        self.assertEqual(self.client.get(url).json()['recibidos'], 8)
+        self.assertEqual(self.enviar(url, 8, 19).json()['recibidos'], 20)
+
+        respuesta = self.client.post(f'{url}completar/')
+
+        self.assertEqual(respuesta.status_code, 201, respuesta.content)
+        adjunto = Adjunto.objects.get(nota=nota)
+        self.assertEqual(adjunto.tamaño_bytes, len(self.CONTENIDO))
+        with open(ruta_absoluta(adjunto.blob.ruta), 'rb') as archivo:
+            self.assertEqual(archivo.read(), self.CONTENIDO)
+        self.assertFalse(CargaAdjunto.objects.exists())
+
+    def test_parte_fuera_de_offset_informa_desde_donde_seguir(self):
+        _, url = self.iniciar()
+        self.enviar(url, 0, 7)
+
+        for inicio, fin in ((4, 11), (12, 19)):
+            respuesta = self.enviar(url, inicio, fin)
+            self.assertEqual(respuesta.status_code, 409)
+            self.assertEqual(respuesta.json()['recibidos'], 8)
+
+        self.assertEqual(self.enviar(url, 8, 19).status_code, 200)
+
+    def test_parte_cortada_conserva_lo_recibido(self):
+        _, url = self.iniciar()
+        # La conexión se corta después de 5 de los 12 bytes anunciados.
+        respuesta = self.enviar(url, 0, 11, contenido=self.CONTENIDO[:5])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['recibidos'], 5)
+
+        self.assertEqual(self.enviar(url, 5, 19).json()['recibidos'], 20)
+        self.assertEqual(self.client.post(f'{url}completar/').status_code, 201)
+
+    def test_parte_con_hash_distinto_se_descarta(self):
+        _, url = self.iniciar()
+        respuesta = self.enviar(url, 0, 7, HTTP_X_CONTENIDO_SHA256='0' * 64)
+        self.assertEqual(respuesta.status_code, 422)
+        self.assertEqual(respuesta.json()['recibidos'], 0)
+        self.assertEqual(self.client.get(url).json()['recibidos'], 0)
+
+    def test_completar_antes_de_tiempo_o_con_otro_contenido(self):
+        _, url = self.iniciar()
+        self.enviar(url, 0, 7)
+        respuesta = self.client.post(f'{url}completar/')
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.json()['recibidos'], 8)
+
+        self.enviar(url, 8, 19, contenido=b'x' * 12)
+        self.assertEqual(self.client.post(f'{url}completar/').status_code, 422)
+        self.assertFalse(Adjunto.objects.exists())
+
+    def test_reintento_de_completar_no_vuelve_a_registrar(self):
+        _, url = self.iniciar()
+        self.enviar(url, 0, 19)
+        # El reintento leyó la carga antes de que la primera petición la borrara.
+        reintento = CargaAdjunto.objects.get()
+        self.assertEqual(self.client.post(f'{url}completar/').status_code, 201)
+
+        with self.assertRaises(ErrorCarga) as error:
+            completar_carga(reintento, self.admin)
+        self.assertEqual(error.exception.status, 404)
+        self.assertEqual(Adjunto.objects.count(), 1)
+        self.assertEqual(ArchivoBlob.objects.get().referencias, 1)
+
+
+def puerto_libre():
+    with socket.socket() as conexion:
+        conexion.bind(('127.0.0.1', 0))
+        return conexion.getsockname()[1]
+
+
+class ServidorSmtpDePrueba:
+    """Handler de aiosmtpd: guarda los mensajes, la sesión SMTP de cada uno y rechaza los indicados."""
+
+    def __init__(self):
+        self.mensajes = []
+        self.sesiones = []
+        self.rechazos = {}
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.rechazos:
+            return self.rechazos[address]
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.mensajes.append(envelope)
+        self.sesiones.append(session)
+        return '250 Message accepted for delivery'
+
+
+@skipIf(Controller is None, 'Requiere aiosmtpd (pip install aiosmtpd).')
+class BandejaDeSalidaTests(NotasTestCase):
+    def setUp(self):
+        super().setUp()
+        self.servidor = ServidorSmtpDePrueba()
+        puerto = puerto_libre()
+        self.controlador = Controller(self.servidor, hostname='127.0.0.1', port=puerto)
+        self.controlador.start()
+        self.addCleanup(self.controlador.stop)
+        configuracion = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=puerto,
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+            CORREO_MAX_POR_MINUTO=600,
+        )
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        # El límite por minuto se verifica con las esperas pedidas, sin dormir de verdad.
+        self.esperas = []
+        parche = mock.patch('notas.notificaciones.time.sleep', side_effect=self.esperas.append)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def encolar(self, cantidad, destinatario='despacho@ejemplo.gob.ar'):
+        nota = self.crear_nota()
+        return [
+            encolar_mail(f'Aviso {i}', 'Cuerpo', [destinatario], nota=nota)
+            for i in range(cantidad)
+        ]
+
+    def test_envia_el_lote_por_una_sola_conexion(self):
+        mails = self.encolar(4)
+
+        self.assertEqual(enviar_pendientes(), (4, 0))
+
+        self.assertEqual(len(self.servidor.mensajes), 4)
+        self.assertEqual(len({id(sesion) for sesion in self.servidor.sesiones}), 1)
+        contenidos = b''.join(mensaje.original_content for mensaje in self.servidor.mensajes)
+        for mail in mails:
+            mail.refresh_from_db()
+            self.assertEqual(mail.estado, EstadoMailChoices.ENVIADO)
+            # El Message-ID propio es el que después asocia las respuestas a la nota.
+            self.assertIn(mail.message_id.encode(), contenidos)
+
+    def test_respeta_el_maximo_por_minuto(self):
+        self.encolar(3)
+        enviar_pendientes()
+        self.assertEqual(len(self.esperas), 2)
+        for espera in self.esperas:
+            self.assertGreater(espera, 0)
+            self.assertLessEqual(espera, 60 / 600)
+
+    def test_rechazo_temporal_reprograma_solo_ese_mail(self):
+        self.servidor.rechazos['ocupado@ejemplo.gob.ar'] = '451 Intente más tarde'
+        rechazado, = self.encolar(1, destinatario='ocupado@ejemplo.gob.ar')
+        enviados = self.encolar(2)
+
+        with self.assertLogs('notas.notificaciones', 'WARNING'):
+            self.assertEqual(enviar_pendientes(), (2, 1))
+
+        rechazado.refresh_from_db()
+        self.assertEqual(rechazado.estado, EstadoMailChoices.PENDIENTE)
+        self.assertEqual(rechazado.intentos, 1)
+        self.assertGreater(rechazado.proximo_intento, timezone.now())
+        self.assertIn('451', rechazado.error)
+        for mail in enviados:
+            mail.refresh_from_db()
+            self.assertEqual(mail.estado, EstadoMailChoices.ENVIADO)
+
+    def test_rechazo_permanente_no_se_reintenta(self):
+        self.servidor.rechazos['inexistente@ejemplo.gob.ar'] = '550 No existe'
+        mail, = self.encolar(1, destinatario='inexistente@ejemplo.gob.ar')
+        with self.assertLogs('notas.notificaciones', 'WARNING'):
+            enviar_pendientes()
+        mail.refresh_from_db()
+        self.assertEqual(mail.estado, EstadoMailChoices.ERROR)
+
+    def test_servidor_caido_deja_el_lote_para_reintentar(self):
+        mails = self.encolar(3)
+
+        with self.settings(EMAIL_PORT=puerto_libre()), self.assertLogs('notas.notificaciones', 'WARNING'):
+            # Nadie escucha en ese puerto.
+            self.assertEqual(enviar_pendientes(), (0, 1))
+
+        estados = MailNota.objects.filter(pk__in=[m.pk for m in mails]).values_list(
+            'estado', 'intentos', 'proximo_intento'
+        )
+        self.assertEqual({estado for estado, _, _ in estados}, {EstadoMailChoices.PENDIENTE})
+        self.assertEqual(sorted(intentos for _, intentos, _ in estados), [0, 0, 1])
+        self.assertTrue(all(proximo > timezone.now() for _, _, proximo in estados))
+
+
+class ArchivoMailsTests(NotasTestCase):
+    def test_restaurar_vuelve_a_vincular_los_mails(self):
+        nota = self.crear_nota()
+        mail = encolar_mail('Nota resuelta', 'Cuerpo', ['despacho@ejemplo.gob.ar'], nota=nota)
+
+        nota_id = nota.pk
+        archivada = archivar_nota(nota)
+        mail.refresh_from_db()
+        self.assertIsNone(mail.nota_id)
+
+        # Mientras tanto el mail se envió: restaurar no debe pisar su estado.
+        MailNota.objects.filter(pk=mail.pk).update(estado=EstadoMailChoices.ENVIADO)
+        restaurar_nota(archivada)
+
+        mail.refresh_from_db()
+        self.assertEqual(mail.nota_id, nota_id)
+        self.assertEqual(mail.estado, EstadoMailChoices.ENVIADO)
+
+
+class CarpetaImap:
+    """Estado de una carpeta IMAP de prueba: UIDVALIDITY y mensajes {uid: bytes}."""
+
+    def __init__(self, uidvalidity, mensajes):
+        self.uidvalidity = uidvalidity
+        self.mensajes = dict(mensajes)
+        self.borrados = set()
+        self.pedidos = []
+
+
+class ConexionImapDePrueba:
+    """Reemplazo de imaplib.IMAP4 que responde como imaplib sobre una CarpetaImap."""
+
+    error = imaplib.IMAP4.error
+    carpeta = None
+
+    def __init__(self, host, puerto, timeout=None):
+        self.capabilities = ('IMAP4REV1',)
+
+    def login(self, usuario, password):
+        return 'OK', [b'LOGIN completed']
+
+    def select(self, carpeta, readonly=False):
+        return 'OK', [str(len(self.carpeta.mensajes)).encode()]
+
+    def response(self, codigo):
+        return codigo, [str(self.carpeta.uidvalidity).encode()]
+
+    def uid(self, comando, conjunto, partes):
+        carpeta = self.carpeta
+        carpeta.pedidos.append(conjunto)
+        if partes == '(UID RFC822.SIZE)':
+            desde = int(conjunto.split(':')[0])
+            uids = [uid for uid in sorted(carpeta.mensajes) if uid >= desde]
+            # Como un servidor real, "n:*" devuelve el último mensaje si no hay posteriores.
+            uids = uids or sorted(carpeta.mensajes)[-1:]
+            return 'OK', [
+                f'{i} (UID {uid} RFC822.SIZE {len(carpeta.mensajes[uid])})'.encode()
+                for i, uid in enumerate(uids, 1)
+            ]
+        uid = int(conjunto)
+        if uid in carpeta.borrados:
+            return 'OK', [None]
+        crudo = carpeta.mensajes[uid]
+        return 'OK', [(f'1 (UID {uid} BODY[] {{{len(crudo)}}}'.encode(), crudo), b')']
+
+    def logout(self):
+        return 'BYE', [b'']
+
+
+def mail_entrante(asunto, message_id, responde_a=None, referencias=None, adjunto=None):
+    mensaje = EmailMessage()
+    mensaje['From'] = 'Despacho <despacho@ejemplo.gob.ar>'
+    mensaje['To'] = 'notas@ejemplo.gob.ar'
+    mensaje['Subject'] = asunto
+    mensaje['Message-ID'] = message_id
+    mensaje['Date'] = 'Mon, 19 Oct 2026 10:00:00 -0300'
+    if responde_a:
+        mensaje['In-Reply-To'] = responde_a
+    if referencias:
+        mensaje['References'] = ' '.join(referencias)
+    mensaje.set_content('Respuesta del despacho.')
+    if adjunto:
+        mensaje.add_attachment(
+            adjunto, maintype='application', subtype='pdf', filename='dictamen.pdf'
+        )
+    return mensaje.as_bytes()
+
+
+class SincronizarCorreoTests(MediaTemporalMixin, NotasTestCase):
+    def setUp(self):
+        super().setUp()
+        self.por_asunto = self.crear_nota(numero_nota_externo='I12')
+        self.por_hilo = self.crear_nota()
+        self.enviado = encolar_mail('Nota asignada', 'Cuerpo', ['despacho@ejemplo.gob.ar'],
+                                    nota=self.por_hilo)
+        self.carpeta = CarpetaImap(7, {
+            10: mail_entrante(f'Re: Nota {self.por_asunto.numero_nota} resuelta', '<a@ext>'),
+            11: mail_entrante('Re: su pedido', '<b@ext>', responde_a=self.enviado.message_id,
+                              adjunto=b'%PDF-1.4 dictamen'),
+            12: mail_entrante('Re: Re: su pedido', '<c@ext>', referencias=['<x@ext>', '<b@ext>']),
+            13: mail_entrante('Consulta general', '<d@ext>'),
+        })
+        parche = mock.patch.object(ConexionImapDePrueba, 'carpeta', self.carpeta)
+        parche.start()
+        self.addCleanup(parche.stop)
+        parche = mock.patch('notas.correo_entrante.imaplib.IMAP4', ConexionImapDePrueba)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def sincronizar(self):
+        sincronizador = SincronizadorImap('imap.prueba', 143, 'notas', 'x', 'INBOX', ssl=False)
+        sincronizador.conectar()
+        try:
+            return sincronizador.sincronizar()
+        finally:
+            sincronizador.desconectar()
+
+    def test_asocia_por_asunto_e_hilo_y_guarda_adjuntos(self):
+        self.assertEqual(self.sincronizar(), (4, 3))
+
+        notas = dict(MailRecibido.objects.values_list('uid', 'nota_id'))
+        self.assertEqual(notas, {
+            10: self.por_asunto.id, 11: self.por_hilo.id, 12: self.por_hilo.id, 13: None,
+        })
+        adjunto = Adjunto.objects.get(nota=self.por_hilo)
+        self.assertEqual(adjunto.nombre_archivo, 'dictamen.pdf')
+        self.assertEqual(adjunto.tipo_mime, 'application/pdf')
+        with open(ruta_absoluta(adjunto.blob.ruta), 'rb') as archivo:
+            self.assertEqual(archivo.read(), b'%PDF-1.4 dictamen')
+        self.assertEqual(
+            HistorialNota.objects.filter(tipo_evento=TipoEventoChoices.RESPUESTA_EMAIL).count(), 3
+        )
+
+    def test_solo_pide_los_uid_posteriores_a_la_marca(self):
+        self.sincronizar()
+        self.carpeta.pedidos.clear()
+        self.assertEqual(self.sincronizar(), (0, 0))
+        # Sin mensajes nuevos el servidor devuelve el último, que no se vuelve a bajar.
+        self.assertEqual(self.carpeta.pedidos, ['14:*'])
+
+        self.carpeta.mensajes[14] = mail_entrante('Consulta', '<e@ext>')
+        self.carpeta.pedidos.clear()
+        self.assertEqual(self.sincronizar(), (1, 0))
+        self.assertEqual(self.carpeta.pedidos, ['14:*', '14'])
+        self.assertEqual(MailRecibido.objects.get(message_id='<e@ext>').buzon.ultimo_uid, 14)
+
+    def test_uidvalidity_nuevo_relee_la_carpeta_sin_duplicar(self):
+        self.sincronizar()
+        self.carpeta.uidvalidity = 8
+        self.carpeta.mensajes = {
+            uid - 9: crudo for uid, crudo in self.carpeta.mensajes.items()
+        }
+        self.carpeta.pedidos.clear()
+
+        with self.assertLogs('notas.correo_entrante', 'WARNING'):
+            self.assertEqual(self.sincronizar(), (0, 0))
+
+        self.assertEqual(self.carpeta.pedidos[0], '1:*')
+        self.assertEqual(MailRecibido.objects.count(), 4)
+        buzon = MailRecibido.objects.first().buzon
+        buzon.refresh_from_db()
+        self.assertEqual((buzon.uidvalidity, buzon.ultimo_uid), (8, 4))
+
+    def test_mensaje_borrado_antes_de_descargarlo_avanza_la_marca(self):
+        self.carpeta.borrados = {13}
+        with self.assertLogs('notas.correo_entrante', 'WARNING'):
+            self.assertEqual(self.sincronizar(), (3, 3))
+        self.carpeta.pedidos.clear()
+        self.sincronizar()
+        self.assertNotIn('13', self.carpeta.pedidos)
+
+    def test_restaurar_vuelve_a_vincular_los_mails_recibidos(self):
+        self.sincronizar()
+        nota_id = self.por_hilo.pk
+        archivada = archivar_nota(self.por_hilo)
+        self.assertFalse(MailRecibido.objects.filter(nota_id=nota_id).exists())
+
+        restaurar_nota(archivada)
+        self.assertEqual(
+            sorted(MailRecibido.objects.filter(nota_id=nota_id).values_list('uid', flat=True)),
+            [11, 12],
+        )
+
+
+class EventosNotasTests(NotasTestCase):
+    def test_sin_rol_solo_recibe_eventos_de_sus_notas_actuales(self):
+        sin_rol = Agente.objects.create_user('1003', password='x', apellido='Sin', nombres='Rol')
+        # Fue responsable de `ajena` y se la reasignaron: deja de verla, igual que en el listado.
+        ajena = self.crear_nota()
+        Nota.objects.filter(pk=ajena.pk).update(responsable=self.operador)
+        crear_registro_historial(
+            ajena, self.admin, TipoEventoChoices.REASIGNACION,
+            responsable_anterior=sin_rol, responsable_nuevo=self.operador,
+        )
+        propia = self.crear_nota()
+        Nota.objects.filter(pk=propia.pk).update(responsable=sin_rol)
+        crear_registro_historial(
+            propia, self.admin, TipoEventoChoices.ASIGNACION, responsable_nuevo=sin_rol
+        )
+
+        self.assertEqual({e['nota_id'] for e in _eventos_perdidos(sin_rol, 0)}, {propia.id})
+        self.assertEqual(
+            {e['nota_id'] for e in _eventos_perdidos(self.operador, 0)}, {ajena.id, propia.id}
+        )
+        evento = {
+            'responsable_id': self.operador.pk,
+            'creado_por_id': self.admin.pk,
+            'responsable_anterior_id': sin_rol.pk,
+        }
+        self.assertFalse(es_visible(sin_rol, evento))
+        self.assertTrue(es_visible(sin_rol, {**evento, 'responsable_id': sin_rol.pk}))
+        self.assertTrue(es_visible(self.operador, {'responsable_id': None}))
+
+    def test_bajo_wsgi_responde_501(self):
+        respuesta = self.client.get('/api/eventos/')
+        self.assertEqual(respuesta.status_code, 501)
+        self.assertEqual(respuesta.json()['error'], 'Eventos no disponibles')
+
+    @skipUnless(connection.vendor == 'postgresql', 'LISTEN/NOTIFY requiere PostgreSQL.')
+    def test_difusor_reparte_las_notificaciones(self):
+        # NOTIFY desde otra conexión en autocommit: la de la prueba nunca confirma.
+        parametros = connection.get_connection_params()
+        parametros.pop('cursor_factory')
+        emisora = psycopg.connect(**parametros, autocommit=True)
+        self.addCleanup(emisora.close)
+
+        async def recibir():
+            difusor = Difusor(asyncio.get_running_loop())
+            primera, segunda = await difusor.suscribir(), await difusor.suscribir()
+            escucha = difusor.escucha
+            await asyncio.to_thread(
+                emisora.execute, 'SELECT pg_notify(%s, %s)', [CANAL, '{"id": 7}']
+            )
+            eventos = [
+                await asyncio.wait_for(suscripcion.cola.get(), 5) for suscripcion in (primera, segunda)
+            ]
+            difusor.desuscribir(primera)
+            self.assertIs(difusor.escucha, escucha)
+            difusor.desuscribir(segunda)
+            self.assertIsNone(difusor.escucha)
+            await asyncio.gather(escucha, return_exceptions=True)
+            return eventos
+
+        self.assertEqual(asyncio.run(recibir()), [{'id': 7}, {'id': 7}])
+
+
+class ReplicaRouterTests(NotasTestCase):
+    """
+    Decisiones de ReplicaRouter con una réplica "configurada": el router real
+    decide y se registra su respuesta, pero las consultas siguen en 'default'
+    (la base de prueba no tiene réplica).
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.lecturas = []
+        db_for_read = ReplicaRouter.db_for_read
+        lecturas = self.lecturas
+
+        def registrar(router, model, **hints):
+            lecturas.append((model, db_for_read(router, model, **hints)))
+            return None
+
+        for parche in (
+            mock.patch('config.routers.replica_configurada', return_value=True),
+            mock.patch('config.middleware.replica_configurada', return_value=True),
+            mock.patch.object(ReplicaRouter, 'db_for_read', registrar),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def destinos(self, model=Nota):
+        return {alias for modelo, alias in self.lecturas if modelo is model}
+
+    def test_listado_lee_de_la_replica_y_el_detalle_de_default(self):
+        nota = self.crear_nota()
+        self.client.cookies.clear()
+        self.lecturas.clear()
+        self.assertEqual(self.client.get('/api/notas/').status_code, 200)
+        self.assertEqual(self.destinos(), {REPLICA})
+
+        self.lecturas.clear()
+        self.assertEqual(self.client.get(f'/api/notas/{nota.id}/').status_code, 200)
+        self.assertEqual(self.destinos(), {None})
+
+    def test_escrituras_van_a_default(self):
+        router = ReplicaRouter()
+        with en_replica():
+            self.assertEqual(router.db_for_write(Nota), 'default')
+        self.lecturas.clear()
+        nota = self.crear_nota()
+        self.assertEqual(nota._state.db, 'default')
+        self.assertNotIn(REPLICA, self.destinos())
+
+    def test_cookie_de_escritura_fija_las_lecturas_en_default(self):
+        respuesta = self.client.post(
+            '/api/notas/', {'sector_origen_id': self.sector.id, 'tema': 'Tema'}, format='json'
+        )
+        cookie = respuesta.cookies[COOKIE_ESCRITURA]
+        self.assertEqual(cookie['max-age'], settings.DATABASE_REPLICA_VENTANA)
+
+        # APIClient reenvía la cookie, como el navegador dentro de la ventana.
+        self.lecturas.clear()
+        self.client.get('/api/notas/')
+        self.assertEqual(self.destinos(), {None})
+
+        # Vencida la ventana el navegador deja de enviarla.
+        self.client.cookies.clear()
+        self.lecturas.clear()
+        respuesta = self.client.get('/api/notas/')
+        self.assertEqual(self.destinos(), {REPLICA})
+        self.assertNotIn(COOKIE_ESCRITURA, respuesta.cookies)
+
+    def test_exportar_auditoria_lee_de_la_replica_al_recorrer_la_respuesta(self):
+        self.crear_nota()
+        self.client.cookies.clear()
+        self.lecturas.clear()
+        respuesta = self.client.get('/api/auditoria/exportar/')
+        self.assertEqual(self.destinos(HistorialNota), set())
+        b''.join(respuesta.streaming_content)
+        self.assertEqual(self.destinos(HistorialNota), {REPLICA})
+
+        self.client.cookies[COOKIE_ESCRITURA] = '1'
+        self.lecturas.clear()
+        b''.join(self.client.get('/api/auditoria/exportar/').streaming_content)
+        self.assertEqual(self.destinos(HistorialNota), {None})
+
+    def test_sin_replica_no_deja_cookie(self):
+        with mock.patch('config.middleware.replica_configurada', return_value=False):
+            respuesta = self.client.post(
+                '/api/notas/', {'sector_origen_id': self.sector.id, 'tema': 'Tema'}, format='json'
+            )
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertNotIn(COOKIE_ESCRITURA, respuesta.cookies)
+
+
+def tablas_consultadas(contexto):
+    """SQL de las consultas capturadas, para buscar tablas con assertIn/assertNotIn."""
+    return ' '.join(consulta['sql'] for consulta in contexto.captured_queries)
+
+
+class CamposPedidosTests(MediaTemporalMixin, NotasTestCase):
+    def setUp(self):
+        super().setUp()
+        self.nota = self.crear_nota(responsable_id=self.operador.id)
+        ruta, sha256 = guardar_temporal(b'contenido')
+        blob = registrar_blob(ruta, sha256, 9)
+        Adjunto.objects.create(
+            nota=self.nota, nombre_archivo='a.txt', ruta_almacenamiento=blob.ruta, blob=blob,
+            tipo_mime='text/plain', tamaño_bytes=9,
+        )
+        self.url = f'/api/notas/{self.nota.id}/'
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url, params)
+        return respuesta, tablas_consultadas(consultas)
+
+    def test_detalle_con_fields_no_consulta_relaciones(self):
+        respuesta, sql = self.get(self.url, fields='estado,responsable')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(set(respuesta.json()), {'id', 'estado', 'responsable'})
+        self.assertEqual(respuesta.json()['responsable']['id'], self.operador.id)
+        self.assertNotIn('notas_historialnota', sql)
+        self.assertNotIn('notas_adjunto', sql)
+
+    def test_expand_agrega_solo_la_relacion_pedida(self):
+        respuesta, sql = self.get(self.url, expand='historial')
+        datos = respuesta.json()
+        self.assertIn('tema', datos)
+        self.assertEqual(len(datos['historial']), 2)
+        self.assertNotIn('adjuntos', datos)
+        self.assertNotIn('notas_adjunto', sql)
+
+        datos = self.get(self.url, fields='tema', expand='adjuntos')[0].json()
+        self.assertEqual(set(datos), {'id', 'tema', 'adjuntos'})
+        self.assertEqual(datos['adjuntos'][0]['nombre_archivo'], 'a.txt')
+
+    def test_sin_parametros_el_detalle_no_cambia(self):
+        datos = self.get(self.url)[0].json()
+        self.assertIn('historial', datos)
+        self.assertIn('adjuntos', datos)
+        self.assertIn('atrasada', datos)
+
+    def test_listado_lee_solo_las_columnas_pedidas(self):
+        self.crear_nota()
+        respuesta, sql = self.get('/api/notas/', fields='tema,estado')
+        self.assertEqual(respuesta.status_code, 200)
+        filas = respuesta.json()['results']
+        self.assertEqual(len(filas), 2)
+        self.assertEqual({frozenset(fila) for fila in filas}, {frozenset({'id', 'tema', 'estado'})})
+        self.assertNotIn('agentes_agente', sql)
+        self.assertNotIn('fecha_limite', sql)
+
+        filas = self.get('/api/notas/', fields='responsable')[0].json()['results']
+        asignada = next(fila for fila in filas if fila['id'] == self.nota.id)
+        self.assertEqual(asignada['responsable']['id'], self.operador.id)
+
+    def test_nombres_desconocidos_responden_400(self):
+        for url in (self.url, '/api/notas/'):
+            respuesta = self.get(url, fields='tema,inexistente')[0]
+            self.assertEqual(respuesta.status_code, 400)
+            self.assertIn('inexistente', respuesta.json()['fields'])
+        respuesta = self.get(self.url, expand='tema')[0]
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('expand', respuesta.json())
+
+    def test_detalle_archivado_se_recorta_igual(self):
+        nota_id = self.nota.pk
+        archivar_nota(self.nota)
+        respuesta = self.get(f'/api/notas/{nota_id}/', fields='tema')[0]
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json(), {'id': nota_id, 'tema': 'Tema', 'en_archivo': True})
+
+
+class ListadoRapidoTests(NotasTestCase):
+    """valores_lista_notas() + filas_lista_notas() dan lo mismo que NotaListSerializer."""
+
+    def setUp(self):
+        super().setUp()
+        hoy = timezone.localdate()
+        self.sin_responsable = self.crear_nota()
+        self.atrasada = self.crear_nota(responsable_id=self.operador.id)
+        self.al_dia = self.crear_nota(responsable_id=self.operador.id)
+        self.anulada = self.crear_nota()
+        self.archivada = self.crear_nota(responsable_id=self.admin.id)
+        Nota.objects.filter(pk=self.atrasada.pk).update(fecha_limite=hoy - timedelta(days=3))
+        Nota.objects.filter(pk=self.al_dia.pk).update(fecha_limite=hoy + timedelta(days=3))
+        Nota.objects.filter(pk=self.anulada.pk).update(
+            estado=EstadoChoices.ANULADA, fecha_limite=hoy - timedelta(days=3)
+        )
+        Nota.objects.filter(pk=self.archivada.pk).update(
+            estado=EstadoChoices.ARCHIVADA, fecha_limite=hoy - timedelta(days=10)
+        )
+        # Mismo queryset que NotaViewSet.get_queryset() para quien ve todas las notas.
+        self.queryset = Nota.objects.select_related('responsable', 'creado_por').order_by(
+            '-fecha_ingreso', '-id'
+        )
+
+    def con_serializer(self, campos=None):
+        serializer = NotaListSerializer(list(self.queryset), many=True)
+        filas = [dict(fila) for fila in serializer.data]
+        if campos is not None:
+            filas = [{nombre: fila[nombre] for nombre in campos} for fila in filas]
+        return filas
+
+    def test_todos_los_campos(self):
+        filas = filas_lista_notas(valores_lista_notas(self.queryset))
+        self.assertEqual(filas, self.con_serializer())
+
+        por_id = {fila['id']: fila for fila in filas}
+        self.assertIsNone(por_id[self.sin_responsable.id]['responsable'])
+        self.assertEqual(por_id[self.atrasada.id]['responsable']['nombre_completo'], 'Operador, Oscar')
+        self.assertTrue(por_id[self.atrasada.id]['atrasada'])
+        self.assertFalse(por_id[self.al_dia.id]['atrasada'])
+        self.assertFalse(por_id[self.anulada.id]['atrasada'])
+        self.assertFalse(por_id[self.archivada.id]['atrasada'])
+
+    def test_campos_pedidos(self):
+        for campos in (
+            ['tema', 'estado'],
+            ['responsable', 'atrasada'],
+            ['fecha_limite', 'fecha_ingreso', 'email_respuesta'],
+            list(NotaListSerializer.Meta.fields),
+        ):
+            with self.subTest(campos=campos):
+                filas = filas_lista_notas(valores_lista_notas(self.queryset, campos), campos)
+                self.assertEqual(filas, self.con_serializer(campos))
+
+
+class RespuestaMinimaTests(MediaTemporalMixin, NotasTestCase):
+    MINIMA = {'HTTP_PREFER': 'return=minimal'}
+
+    def setUp(self):
+        super().setUp()
+        self.nota = self.crear_nota(responsable_id=self.operador.id)
+        ruta, sha256 = guardar_temporal(b'contenido')
+        blob = registrar_blob(ruta, sha256, 9)
+        Adjunto.objects.create(
+            nota=self.nota, nombre_archivo='a.txt', ruta_almacenamiento=blob.ruta, blob=blob,
+            tipo_mime='text/plain', tamaño_bytes=9,
+        )
+        self.url = f'/api/notas/{self.nota.id}/'
+
+    def assertMinima(self, respuesta, claves):
+        self.assertEqual(respuesta['Preference-Applied'], 'return=minimal')
+        self.assertEqual(
+            set(respuesta.json()),
+            {'id', 'numero_nota', 'ultima_modificacion', 'historial_nuevo', *claves},
+        )
+
+    def test_create_minimo(self):
+        respuesta = self.client.post(
+            '/api/notas/', {'sector_origen_id': self.sector.id, 'tema': 'Otra'},
+            format='json', **self.MINIMA,
+        )
+        self.assertEqual(respuesta.status_code, 201)
+        # Los campos que fija el alta (enviados o con valor por defecto), no el detalle.
+        self.assertMinima(respuesta, {
+            'estado', 'atrasada', 'tema', 'sector_origen', 'prioridad', 'tiene_numero_formal',
+        })
+        historial = respuesta.json()['historial_nuevo']
+        self.assertEqual([h['tipo_evento'] for h in historial], [TipoEventoChoices.CREACION])
+
+    def test_update_minimo_devuelve_solo_lo_que_cambio(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.patch(
+                self.url, {'estado': EstadoChoices.EN_PROCESO, 'tema': 'Nuevo tema'},
+                format='json', **self.MINIMA,
+            )
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        self.assertMinima(respuesta, {'estado', 'atrasada', 'tema'})
+        self.assertEqual(respuesta.json()['estado'], EstadoChoices.EN_PROCESO)
+        self.assertEqual(
+            respuesta.json()['historial_nuevo'][0]['tipo_evento'], TipoEventoChoices.CAMBIO_ESTADO
+        )
+        sql = tablas_consultadas(consultas)
+        self.assertNotIn('FROM "notas_historialnota"', sql)
+        self.assertNotIn('notas_adjunto', sql)
+        self.nota.refresh_from_db()
+        self.assertEqual(self.nota.tema, 'Nuevo tema')
+
+    def test_update_minimo_incluye_campos_sin_historial(self):
+        respuesta = self.client.patch(self.url, {'tema': 'Nuevo tema'}, format='json', **self.MINIMA)
+        self.assertMinima(respuesta, {'tema'})
+        self.assertEqual(respuesta.json()['tema'], 'Nuevo tema')
+        self.assertEqual(respuesta.json()['historial_nuevo'], [])
+
+        respuesta = self.client.patch(
+            self.url, {'prioridad': 'ALTA', 'fecha_limite': '2020-01-01', 'tema': 'Nuevo tema'},
+            format='json', **self.MINIMA,
+        )
+        # tema no cambió; fecha_limite vencida recalcula atrasada.
+        self.assertMinima(respuesta, {'prioridad', 'fecha_limite', 'atrasada'})
+        self.assertTrue(respuesta.json()['atrasada'])
+
+    def test_cambiar_estado_minimo_con_query_param(self):
+        respuesta = self.client.post(
+            f'{self.url}cambiar_estado/?respuesta=minima',
+            {'estado_nuevo': EstadoChoices.EN_PROCESO}, format='json',
+        )
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        self.assertMinima(respuesta, {'estado', 'atrasada'})
+        self.assertEqual(len(respuesta.json()['historial_nuevo']), 1)
+
+    def test_sin_preferencia_responde_el_detalle_completo(self):
+        respuesta = self.client.patch(self.url, {'tema': 'Nuevo tema'}, format='json')
+        self.assertNotIn('Preference-Applied', respuesta)
+        datos = respuesta.json()
+        self.assertEqual(datos['tema'], 'Nuevo tema')
+        self.assertIn('historial', datos)
+        self.assertEqual(len(datos['adjuntos']), 1)
+
+
+class AuditoriaTests(NotasTestCase):
+    def test_ids_invalidos_responden_400(self):
+        for url in ('/api/auditoria/', '/api/auditoria/exportar/'):
+            for param, valor in (('usuario', 'abc'), ('nota', 'x'), ('sector', '1.5')):
+                respuesta = self.client.get(url, {param: valor})
+                self.assertEqual(respuesta.status_code, 400, (url, param))
+                self.assertIn(param, respuesta.json())
+
+    def test_filtra_por_nota_y_sector(self):
+        nota = self.crear_nota()
+        self.crear_nota()
+        otro = Sector.objects.create(nombre='Despacho', numero=139)
+
+        filas = self.client.get('/api/auditoria/', {'nota': nota.id}).json()['results']
+        self.assertEqual({fila['nota_id'] for fila in filas}, {nota.id})
+        self.assertEqual(self.client.get('/api/auditoria/', {'sector': otro.id}).json()['results'], [])
+
+        respuesta = self.client.get('/api/auditoria/exportar/', {'nota': nota.id})
+        csv = b''.join(respuesta.streaming_content).decode()
+        self.assertEqual(len(csv.strip().splitlines()), 2)
+
+
+@override_settings(PERFILADO_HABILITADO=True, PERFILADO_MOTOR='cprofile')
+class PerfiladoTests(NotasTestCase):
+    def setUp(self):
+        super().setUp()
+        # El middleware ve el usuario de la sesión, no el de force_authenticate.
+        self.client.force_login(self.admin)
+
+    def perfilar(self):
+        return self.client.get('/api/notas/', HTTP_X_PERFILAR='1')
+
+    def test_un_solo_perfil_de_cprofile_a_la_vez(self):
+        en_curso = Perfilado()
+        self.assertTrue(en_curso.iniciar())
+        try:
+            respuesta = self.perfilar()
+        finally:
+            en_curso.terminar()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('X-Perfil', respuesta)
+        self.assertFalse(PerfilPeticion.objects.exists())
+
+        respuesta = self.perfilar()
+        self.assertIn('X-Perfil', respuesta)
+        self.assertEqual(PerfilPeticion.objects.count(), 1)
+
+    def test_enable_rechazado_atiende_sin_perfilar(self):
+        with mock.patch('notas.perfilado.cProfile.Profile.enable', side_effect=ValueError):
+            respuesta = self.perfilar()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('X-Perfil', respuesta)
+        self.assertIn('X-Perfil', self.perfilar())
+
+
+class ProcesarJobsTests(TestCase):
+    def test_un_error_de_la_base_no_termina_el_hilo(self):
+        comando = 'notas.management.commands.procesar_jobs'
+        with mock.patch(f'{comando}.recuperar_trabajos_colgados', return_value=0), \
+                mock.patch(f'{comando}.tomar_trabajo',
+                           side_effect=[OperationalError('servidor reiniciado'), None]) as tomar, \
+                self.assertLogs(comando, 'ERROR'):
+            salida = io.StringIO()
+            call_command('procesar_jobs', hilos=1, espera=0, una_vez=True, stdout=salida)
+        self.assertEqual(tomar.call_count, 2)
+        self.assertIn('Trabajos procesados: 0', salida.getvalue())
+
+
+class RenderersOrjsonTests(TestCase):
+    """ORJSONRenderer/ORJSONParser frente a JSONRenderer/JSONParser de DRF."""
+
+    def test_mismo_json_que_drf(self):
+        datos = {
+            'fecha_hora': timezone.make_aware(datetime(2026, 10, 19, 10, 30, 15, 123456)),
+            'utc': datetime(2026, 10, 19, 13, 0, tzinfo=dt_timezone.utc),
+            'fecha': date(2026, 10, 19),
+            'hora': dt_time(8, 5, 1, 999),
+            'importe': Decimal('1234.50'),
+            'etiqueta': gettext_lazy('Nota'),
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'separadores': 'línea\u2028párrafo\u2029fin',
+            'entero_grande': 2 ** 70,
+            'claves_numericas': {1: 'uno'},
+            'lista': [None, True, 1.5, 'ñ'],
+        }
+        for caso in (datos, {k: v for k, v in datos.items() if k != 'entero_grande'}):
+            self.assertEqual(ORJSONRenderer().render(caso), JSONRenderer().render(caso))
+
+    def test_no_finitos_se_escriben_como_null(self):
+        # Diferencia documentada en config/renderers.py.
+        self.assertEqual(ORJSONRenderer().render({'x': float('nan')}), b'{"x":null}')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'x': float('nan')})
+
+    def test_mismo_resultado_al_parsear(self):
+        for cuerpo in (
+            '{"tema":"ñandú","prioridad":"ALTA","ids":[1,2]}'.encode(),
+            b'{"id": 123456789012345678901234567890}',
+            b'{"x": 1.25, "y": null}',
+        ):
+            self.assertEqual(
+                ORJSONParser().parse(io.BytesIO(cuerpo)), JSONParser().parse(io.BytesIO(cuerpo))
+            )
+
+    def test_mismo_error_con_cuerpos_invalidos(self):
+        for cuerpo in (b'{"tema": ', b'{"x": NaN}', b'\xff'):
+            with self.assertRaises(ParseError) as esperado:
+                JSONParser().parse(io.BytesIO(cuerpo))
+            with self.assertRaises(ParseError) as obtenido:
+                ORJSONParser().parse(io.BytesIO(cuerpo))
+            self.assertEqual(str(obtenido.exception.detail), str(esperado.exception.detail))
+
+
+class DescargaAdjuntoTests(MediaTemporalMixin, NotasTestCase):
+    CONTENIDO = b'0123456789'
+
+    def setUp(self):
+        super().setUp()
+        nota = self.crear_nota()
+        ruta, sha256 = guardar_temporal(self.CONTENIDO)
+        blob = registrar_blob(ruta, sha256, len(self.CONTENIDO))
+        adjunto = Adjunto.objects.create(
+            nota=nota, nombre_archivo='datos.txt', ruta_almacenamiento=blob.ruta, blob=blob,
+            tipo_mime='text/plain', tamaño_bytes=len(self.CONTENIDO),
+        )
+        self.blob = blob
+        self.etag = f'"{sha256}"'
+        self.url = f'/api/adjuntos/{adjunto.id}/descargar/'
+
+    def descargar(self, **encabezados):
+        respuesta = self.client.get(self.url, **encabezados)
+        cuerpo = b''.join(respuesta.streaming_content) if respuesta.streaming else respuesta.content
+        return respuesta, cuerpo
+
+    def test_sin_rango_entrega_el_archivo_completo(self):
+        respuesta, cuerpo = self.descargar()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(cuerpo, self.CONTENIDO)
+        self.assertEqual(respuesta['ETag'], self.etag)
+        self.assertEqual(respuesta['Accept-Ranges'], 'bytes')
+
+    def test_rangos_simples_y_de_sufijo(self):
+        for rango, parte, content_range in (
+            ('bytes=2-5', b'2345', 'bytes 2-5/10'),
+            ('bytes=5-', b'56789', 'bytes 5-9/10'),
+            ('bytes=-3', b'789', 'bytes 7-9/10'),
+            ('bytes=8-50', b'89', 'bytes 8-9/10'),
+            ('bytes=-50', self.CONTENIDO, 'bytes 0-9/10'),
+        ):
+            respuesta, cuerpo = self.descargar(HTTP_RANGE=rango)
+            self.assertEqual(respuesta.status_code, 206, rango)
+            self.assertEqual(cuerpo, parte, rango)
+            self.assertEqual(respuesta['Content-Range'], content_range)
+            self.assertEqual(respuesta['Content-Length'], str(len(parte)))
+
+    def test_rango_no_satisfacible_responde_416(self):
+        for rango in ('bytes=10-', 'bytes=-0', 'bytes=6-3'):
+            respuesta, _ = self.descargar(HTTP_RANGE=rango)
+            self.assertEqual(respuesta.status_code, 416, rango)
+            self.assertEqual(respuesta['Content-Range'], 'bytes */10')
+
+    def test_varios_rangos_o_formato_desconocido_entregan_todo(self):
+        for rango in ('bytes=0-1,4-5', 'items=0-1'):
+            respuesta, cuerpo = self.descargar(HTTP_RANGE=rango)
+            self.assertEqual(respuesta.status_code, 200, rango)
+            self.assertEqual(cuerpo, self.CONTENIDO)
+
+    def test_etag_coincidente_responde_304(self):
+        respuesta, cuerpo = self.descargar(HTTP_IF_NONE_MATCH=f'"otro", {self.etag}')
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(cuerpo, b'')
+        self.assertEqual(respuesta['ETag'], self.etag)
+
+    def test_if_range_vencido_entrega_el_archivo_completo(self):
+        respuesta, cuerpo = self.descargar(HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"viejo"')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(cuerpo, self.CONTENIDO)
+
+        respuesta, cuerpo = self.descargar(HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE=self.etag)
+        self.assertEqual(respuesta.status_code, 206)
+        self.assertEqual(cuerpo, b'2345')
+
+    @override_settings(ADJUNTOS_X_ACCEL_PREFIX='/protegido/')
+    def test_con_nginx_delega_la_transferencia(self):
+        respuesta, cuerpo = self.descargar(HTTP_RANGE='bytes=2-5')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['X-Accel-Redirect'], f'/protegido/{self.blob.ruta}')
+        self.assertEqual(respuesta['ETag'], self.etag)
+        self.assertEqual(cuerpo, b'')
+
+
+@override_settings(COMPRESION_HABILITADA=True, COMPRESION_ALGORITMOS=['gzip'],
+                   COMPRESION_MINIMO_BYTES=100)
+class CompresionTests(TestCase):
+    CUERPO = b'{"notas":[' + b'{"tema":"Tema repetido","estado":"ASIGNADA"},' * 40 + b'{}]}'
+
+    def procesar(self, response, accept_encoding='gzip'):
+        request = RequestFactory().get('/api/notas/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompresionMiddleware(lambda request: response)(request)
+
+    def json(self, cuerpo=None):
+        return HttpResponse(cuerpo or self.CUERPO, content_type='application/json')
+
+    def test_elige_por_q_y_por_preferencia_del_servidor(self):
+        disponibles = ['zstd', 'br', 'gzip']
+        for accept_encoding, esperado in (
+            ('gzip, br', 'br'),
+            ('gzip;q=1, br;q=0.5', 'gzip'),
+            ('*', 'zstd'),
+            ('*;q=0.5, gzip', 'gzip'),
+            ('br;q=abc, gzip', 'gzip'),
+            ('identity;q=0', None),
+            ('gzip;q=0, identity;q=0', None),
+            ('identity', None),
+            ('', None),
+        ):
+            self.assertEqual(compresion.elegir(accept_encoding, disponibles), esperado, accept_encoding)
+
+    def test_comprime_desde_el_minimo(self):
+        respuesta = self.procesar(self.json())
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(respuesta.content), self.CUERPO)
+        self.assertEqual(respuesta['Content-Length'], str(len(respuesta.content)))
+        self.assertIn('Accept-Encoding', respuesta['Vary'])
+
+        chica = self.procesar(self.json(b'{"id":1}'))
+        self.assertFalse(chica.has_header('Content-Encoding'))
+        self.assertFalse(chica.has_header('Vary'))
+
+    def test_sin_algoritmo_aceptado_no_comprime_pero_avisa_vary(self):
+        respuesta = self.procesar(self.json(), accept_encoding='gzip;q=0, identity')
+        self.assertEqual(respuesta.content, self.CUERPO)
+        self.assertFalse(respuesta.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', respuesta['Vary'])
+
+    def test_no_recomprime_ni_toca_rangos_eventos_o_cookies(self):
+        ya_comprimida = self.json(gzip.compress(self.CUERPO))
+        ya_comprimida['Content-Encoding'] = 'gzip'
+        con_rango = self.json()
+        con_rango['Content-Range'] = 'bytes 0-99/1000'
+        eventos = HttpResponse(self.CUERPO, content_type='text/event-stream')
+        con_cookie = self.json()
+        con_cookie.set_cookie('sessionid', 'x')
+        binario = HttpResponse(self.CUERPO, content_type='application/pdf')
+        for respuesta in (ya_comprimida, con_rango, eventos, con_cookie, binario):
+            contenido = respuesta.content
+            procesada = self.procesar(respuesta)
+            self.assertEqual(procesada.content, contenido)
+            self.assertFalse(procesada.has_header('Vary'))
+        self.assertEqual(ya_comprimida['Content-Encoding'], 'gzip')
+
+    def test_streaming_se_comprime_por_partes(self):
+        partes = [self.CUERPO[i:i + 200] for i in range(0, len(self.CUERPO), 200)]
+        respuesta = StreamingHttpResponse(iter(partes), content_type='text/csv')
+        respuesta['Content-Length'] = str(len(self.CUERPO))
+        respuesta = self.procesar(respuesta)
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertFalse(respuesta.has_header('Content-Length'))
+        self.assertEqual(gzip.decompress(b''.join(respuesta.streaming_content)), self.CUERPO)
+
+    def test_etag_fuerte_pasa_a_debil(self):
+        respuesta = self.json()
+        respuesta['ETag'] = '"abc"'
+        self.assertEqual(self.procesar(respuesta)['ETag'], 'W/"abc"')
+
+    @skipUnless(compresion.brotli and compresion.zstandard, 'requiere brotli y zstandard')
+    @override_settings(COMPRESION_ALGORITMOS=['zstd', 'br', 'gzip'])
+    def test_br_y_zstd(self):
+        respuesta = self.procesar(self.json(), accept_encoding='gzip, br')
+        self.assertEqual(respuesta['Content-Encoding'], 'br')
+        self.assertEqual(compresion.brotli.decompress(respuesta.content), self.CUERPO)
+        respuesta = self.procesar(self.json(), accept_encoding='zstd, gzip')
+        self.assertEqual(respuesta['Content-Encoding'], 'zstd')
+        self.assertEqual(
+            compresion.zstandard.ZstdDecompressor().decompress(respuesta.content), self.CUERPO
+        )
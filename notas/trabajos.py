@@ -0,0 +1,127 @@
+"""
+Cola de trabajos en segundo plano sobre la base de datos.
+
+Los trabajos se encolan en la tabla Trabajo (dentro de la misma transacción que
+los genera, así no quedan trabajos de operaciones revertidas) y los ejecuta el
+comando procesar_jobs. Cada tipo de trabajo se registra con el decorador @tarea;
+los módulos que definen tareas se importan en NotasConfig.ready().
+
+Un trabajo que falla se reprograma con espera exponencial (TRABAJOS_ESPERA_BASE,
+duplicándose hasta TRABAJOS_ESPERA_MAXIMA) hasta agotar max_intentos. Los que
+quedan EN_PROCESO más de TRABAJOS_TIEMPO_MAXIMO (worker caído) vuelven a la cola.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EstadoTrabajoChoices, Trabajo
+
+logger = logging.getLogger(__name__)
+
+TAREAS = {}
+
+
+class ErrorPermanente(Exception):
+    """Error que no se resuelve reintentando: el trabajo pasa directo a ERROR."""
+
+
+def tarea(tipo):
+    """Registra la función que ejecuta los trabajos de `tipo`. Recibe **datos."""
+    def registrar(funcion):
+        TAREAS[tipo] = funcion
+        return funcion
+    return registrar
+
+
+def encolar(tipo, retraso=None, max_intentos=None, **datos):
+    """
+    Crea un trabajo pendiente.
+    Args: retraso (timedelta) para diferir la primera ejecución.
+    Returns: Trabajo
+    """
+    if tipo not in TAREAS:
+        raise ValueError(f"Tipo de trabajo desconocido: {tipo}")
+    return Trabajo.objects.create(
+        tipo=tipo,
+        datos=datos,
+        max_intentos=max_intentos or settings.TRABAJOS_MAX_INTENTOS,
+        ejecutar_despues=timezone.now() + (retraso or timedelta()),
+    )
+
+
+def espera_reintento(intentos):
+    """Espera exponencial con ±10 % de variación para no sincronizar reintentos."""
+    espera = min(
+        settings.TRABAJOS_ESPERA_BASE * 2 ** (intentos - 1),
+        settings.TRABAJOS_ESPERA_MAXIMA,
+    )
+    return timedelta(seconds=espera * random.uniform(0.9, 1.1))
+
+
+def tomar_trabajo():
+    """
+    Reserva el trabajo pendiente más antiguo que ya puede ejecutarse. En PostgreSQL,
+    SKIP LOCKED permite que varios workers tomen trabajos distintos sin bloquearse.
+    Returns: Trabajo o None si no hay pendientes.
+    """
+    ahora = timezone.now()
+    with transaction.atomic():
+        trabajo = (
+            Trabajo.objects.select_for_update(skip_locked=True)
+            .filter(estado=EstadoTrabajoChoices.PENDIENTE, ejecutar_despues__lte=ahora)
+            .order_by('ejecutar_despues', 'id')
+            .first()
+        )
+        if trabajo is None:
+            return None
+        trabajo.estado = EstadoTrabajoChoices.EN_PROCESO
+        trabajo.intentos += 1
+        trabajo.fecha_inicio = ahora
+        trabajo.save(update_fields=['estado', 'intentos', 'fecha_inicio'])
+    return trabajo
+
+
+def ejecutar_trabajo(trabajo):
+    """Ejecuta un trabajo reservado y registra el resultado (o lo reprograma)."""
+    try:
+        TAREAS[trabajo.tipo](**trabajo.datos)
+    except Exception as e:
+        logger.exception("Falló el trabajo %s (intento %s)", trabajo, trabajo.intentos)
+        trabajo.error = traceback.format_exc()
+        if isinstance(e, ErrorPermanente) or trabajo.intentos >= trabajo.max_intentos:
+            trabajo.estado = EstadoTrabajoChoices.ERROR
+        else:
+            trabajo.estado = EstadoTrabajoChoices.PENDIENTE
+            trabajo.ejecutar_despues = timezone.now() + espera_reintento(trabajo.intentos)
+    else:
+        trabajo.estado = EstadoTrabajoChoices.COMPLETADO
+        trabajo.error = ''
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save(update_fields=['estado', 'error', 'ejecutar_despues', 'fecha_fin'])
+    return trabajo
+
+
+def recuperar_trabajos_colgados():
+    """
+    Devuelve a la cola los trabajos EN_PROCESO de un worker que se cayó
+    (o los marca ERROR si ya agotaron sus intentos). Returns: cantidad recuperada.
+    """
+    limite = timezone.now() - timedelta(seconds=settings.TRABAJOS_TIEMPO_MAXIMO)
+    colgados = Trabajo.objects.filter(
+        estado=EstadoTrabajoChoices.EN_PROCESO, fecha_inicio__lt=limite
+    )
+    error = 'Sin respuesta del worker (tiempo máximo superado)'
+    with transaction.atomic():
+        agotados = colgados.filter(intentos__gte=F('max_intentos')).update(
+            estado=EstadoTrabajoChoices.ERROR, error=error, fecha_fin=timezone.now()
+        )
+        recuperados = colgados.update(
+            estado=EstadoTrabajoChoices.PENDIENTE, error=error, ejecutar_despues=timezone.now()
+        )
+    return agotados + recuperados
@@ -1,13 +1,19 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .eventos import eventos_notas
+from .vistas_async import con_lecturas_async
 from .views import (
     NotaViewSet,
     HistorialNotaViewSet,
     AdjuntoViewSet,
+    CargaAdjuntoViewSet,
     SectorViewSet,
     reporte_notas_por_sector,
     reporte_notas_por_operador,
     auditoria_list,
+    auditoria_exportar,
+    perfil_peticion,
 )
 
 # Crear router de DRF
@@ -15,11 +21,19 @@ router = DefaultRouter()
 router.register(r'notas', NotaViewSet, basename='nota')
 router.register(r'historial', HistorialNotaViewSet, basename='historial')
 router.register(r'adjuntos', AdjuntoViewSet, basename='adjunto')
+router.register(r'cargas-adjuntos', CargaAdjuntoViewSet, basename='carga-adjunto')
 router.register(r'sectores', SectorViewSet, basename='sector')
 
+rutas_router = router.urls
+if settings.LECTURAS_ASYNC:
+    rutas_router = con_lecturas_async(rutas_router)
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(rutas_router)),
     path('reportes/notas-por-sector/', reporte_notas_por_sector),
     path('reportes/notas-por-operador/', reporte_notas_por_operador),
     path('auditoria/', auditoria_list),
+    path('auditoria/exportar/', auditoria_exportar),
+    path('eventos/', eventos_notas, name='eventos-notas'),
+    path('perfiles/<int:pk>/', perfil_peticion, name='perfil-peticion'),
 ]
@@ -1,6 +1,8 @@
 """
 Utilidades para la gestión de notas.
 """
+from contextvars import ContextVar
+
 from django.db import transaction
 from django.utils import timezone
 from django.db.models import Max
@@ -75,12 +77,138 @@ def es_transicion_permitida(estado_actual, estado_nuevo):
     return False
 
 
+def describir_cambio_estado(estado_actual, estado_nuevo, motivo='',
+                            responsable_anterior=None, responsable_nuevo=None):
+    """
+    Determina el tipo de evento y la descripción para un cambio de estado.
+
+    Args:
+        estado_actual: Estado de la nota antes del cambio
+        estado_nuevo: Estado al que se transiciona
+        motivo: Motivo informado por el usuario (opcional)
+        responsable_anterior: Responsable antes del cambio (opcional)
+        responsable_nuevo: Nuevo responsable si la transición asigna uno (opcional)
+
+    Returns:
+        Tupla (tipo_evento, descripcion_cambio)
+    """
+    tipo_evento = TipoEventoChoices.CAMBIO_ESTADO
+    if estado_nuevo == EstadoChoices.ARCHIVADA:
+        tipo_evento = TipoEventoChoices.ARCHIVADO
+    elif responsable_nuevo and responsable_anterior:
+        tipo_evento = TipoEventoChoices.REASIGNACION
+    elif responsable_nuevo and not responsable_anterior:
+        tipo_evento = TipoEventoChoices.ASIGNACION
+
+    if tipo_evento == TipoEventoChoices.REASIGNACION:
+        nombre_anterior = (
+            responsable_anterior.nombre_completo
+            if responsable_anterior
+            else "Sin asignar"
+        )
+        nombre_nuevo = (
+            responsable_nuevo.nombre_completo
+            if responsable_nuevo
+            else "Sin asignar"
+        )
+        descripcion_cambio = f"Reasignada de {nombre_anterior} a {nombre_nuevo}"
+    elif tipo_evento == TipoEventoChoices.ASIGNACION:
+        descripcion_cambio = f"Asignada a {responsable_nuevo.nombre_completo}"
+    elif tipo_evento == TipoEventoChoices.ARCHIVADO:
+        descripcion_cambio = motivo if motivo else "Nota archivada"
+    elif estado_nuevo == EstadoChoices.EN_ESPERA:
+        descripcion_cambio = (
+            f"Puesta en espera: {motivo}" if motivo else "Puesta en espera"
+        )
+    elif (
+        estado_nuevo == EstadoChoices.EN_PROCESO
+        and estado_actual == EstadoChoices.EN_ESPERA
+    ):
+        descripcion_cambio = "Retomada"
+    elif estado_nuevo == EstadoChoices.EN_PROCESO:
+        descripcion_cambio = "Proceso iniciado"
+    elif estado_nuevo == EstadoChoices.RESUELTA:
+        descripcion_cambio = "Marcada como resuelta"
+    else:
+        descripcion_cambio = (
+            motivo
+            if motivo
+            else f"Cambio de estado de {estado_actual} a {estado_nuevo}"
+        )
+    return tipo_evento, descripcion_cambio
+
+
+# Buffer de historial activo en el contexto actual (request, comando, etc.).
+_historial_buffer = ContextVar('historial_buffer', default=None)
+
+
+class HistorialBuffer:
+    """
+    Context manager que acumula los registros de historial creados con
+    crear_registro_historial() y los inserta con un único bulk_create al salir
+    del bloque (no en transaction.on_commit). Debe usarse dentro de la
+    transacción que modifica las notas: el INSERT forma parte de esa
+    transacción y el historial se confirma o se revierte junto con los cambios.
+    Con on_commit el historial se insertaría después de confirmar las notas y
+    un error en ese INSERT dejaría cambios sin su registro.
+
+    Los bloques anidados reutilizan el buffer más externo. Si el bloque termina
+    con una excepción los registros pendientes se descartan. Los registros
+    tienen pk recién al salir del bloque.
+
+    Lo usan las escrituras que generan varios eventos por petición (alta de
+    nota asignada, cambio de estado masivo). No aplica a sincronizar_correo
+    (cada mensaje es su propia transacción, con un solo evento) ni a
+    restaurar_nota() (guarda el historial en modo raw para conservar
+    fecha_hora, que bulk_create pisaría por ser auto_now_add).
+
+    Uso:
+        with transaction.atomic(), HistorialBuffer():
+            crear_registro_historial(...)
+            crear_registro_historial(...)
+    """
+
+    def __init__(self):
+        self.registros = []
+        self._token = None
+
+    def __enter__(self):
+        activo = _historial_buffer.get()
+        if activo is not None:
+            return activo
+        self._token = _historial_buffer.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._token is None:
+            return False
+        _historial_buffer.reset(self._token)
+        self._token = None
+        if exc_type is None:
+            self.flush()
+        else:
+            self.registros = []
+        return False
+
+    def agregar(self, registro):
+        """Agrega un registro (HistorialNota sin guardar) al buffer."""
+        self.registros.append(registro)
+
+    def flush(self):
+        """Inserta los registros pendientes con un único INSERT."""
+        if self.registros:
+            HistorialNota.objects.bulk_create(self.registros)
+        self.registros = []
+
+
 def crear_registro_historial(nota, usuario, tipo_evento, estado_anterior=None,
                             estado_nuevo=None, responsable_anterior=None,
                             responsable_nuevo=None, descripcion_cambio=None,
                             campos_modificados=None):
     """
     Crea un registro en el historial de la nota.
+    Si hay un HistorialBuffer activo, el registro se acumula y se inserta
+    al cerrar el buffer; si no, se inserta inmediatamente.
     
     Args:
         nota: Instancia de Nota
@@ -92,8 +220,11 @@ def crear_registro_historial(nota, usuario, tipo_evento, estado_anterior=None,
         responsable_nuevo: Responsable nuevo (opcional)
         descripcion_cambio: Descripción del cambio (opcional)
         campos_modificados: Diccionario con campos modificados (opcional)
+
+    Returns:
+        Instancia de HistorialNota (sin pk si quedó en el buffer)
     """
-    HistorialNota.objects.create(
+    registro = HistorialNota(
         nota=nota,
         usuario=usuario,
         tipo_evento=tipo_evento,
@@ -104,3 +235,9 @@ def crear_registro_historial(nota, usuario, tipo_evento, estado_anterior=None,
         descripcion_cambio=descripcion_cambio,
         campos_modificados=campos_modificados or {}
     )
+    buffer = _historial_buffer.get()
+    if buffer is not None:
+        buffer.agregar(registro)
+    else:
+        registro.save()
+    return registro
@@ -1,10 +1,18 @@
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.filters import SearchFilter
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import CharField, Count, F, Q, Value
+from django.db.models.functions import Concat
+from django.http import Http404, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import datetime, time, timedelta
+import csv
+import functools
 from django.shortcuts import get_object_or_404
 
 
@@ -16,11 +24,15 @@ from agentes.permissions import (
     PuedeVerNotas,
     PuedeAnularNota,
 )
+from config.routers import COOKIE_ESCRITURA, en_replica, lectura_en_replica, primaria_forzada
 
 from .models import (
     Nota,
+    NotaArchivada,
     HistorialNota,
     Adjunto,
+    CargaAdjunto,
+    PerfilPeticion,
     Sector,
     EstadoChoices,
     TipoEventoChoices,
@@ -29,12 +41,198 @@ from .serializers import (
     NotaListSerializer,
     NotaDetalleSerializer,
     NotaCambioEstadoSerializer,
+    NotaCambioEstadoMasivoSerializer,
     HistorialNotaSerializer,
     AdjuntoSerializer,
+    CargaAdjuntoSerializer,
     SectorSerializer,
     NotaCreateSerializer,
+    filas_lista_notas,
+    valores_lista_notas,
 )
-from .utils import es_transicion_permitida, crear_registro_historial
+from .almacenamiento import liberar_blob
+from .cargas import (
+    ErrorCarga,
+    cancelar_carga,
+    completar_carga,
+    escribir_parte,
+    iniciar_carga,
+)
+from .descargas import respuesta_adjunto, respuesta_miniatura
+from .notificaciones import notificar_nota
+from .perfilado import consultas_repetidas
+from .utils import (
+    HistorialBuffer,
+    es_transicion_permitida,
+    crear_registro_historial,
+    describir_cambio_estado,
+)
+
+
+def _filtrar_rango_fecha_hora(queryset, params):
+    """
+    Aplica los filtros ?desde= y ?hasta= (YYYY-MM-DD, ambos inclusive) sobre
+    fecha_hora. Con el historial particionado por mes, PostgreSQL solo lee las
+    particiones que cubren el rango.
+    """
+    for param in ("desde", "hasta"):
+        valor = params.get(param)
+        if not valor:
+            continue
+        fecha = parse_date(valor)
+        if fecha is None:
+            raise ValidationError({param: "Fecha inválida, use el formato YYYY-MM-DD."})
+        if param == "desde":
+            inicio = timezone.make_aware(datetime.combine(fecha, time.min))
+            queryset = queryset.filter(fecha_hora__gte=inicio)
+        else:
+            fin = timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min))
+            queryset = queryset.filter(fecha_hora__lt=fin)
+    return queryset
+
+
+def _nombres(valor):
+    return [nombre.strip() for nombre in valor.split(",") if nombre.strip()]
+
+
+@functools.cache
+def _campos_legibles(serializer_class):
+    return [nombre for nombre, campo in serializer_class().fields.items() if not campo.write_only]
+
+
+def campos_pedidos(params, serializer_class):
+    """
+    ?fields=a,b y ?expand=historial,adjuntos -> campos a serializar (siempre con
+    'id'), o None si no vino ninguno de los dos: todos los campos, como siempre.
+    Las relaciones de serializer_class.RELACIONES solo se incluyen si se nombran
+    en ?expand= (o en ?fields=); sin ?fields=, ?expand= suma las relaciones a
+    los demás campos.
+    """
+    if "fields" not in params and "expand" not in params:
+        return None
+    disponibles = _campos_legibles(serializer_class)
+    relaciones = getattr(serializer_class, "RELACIONES", ())
+    expandir = _nombres(params.get("expand", ""))
+    invalidas = [nombre for nombre in expandir if nombre not in relaciones]
+    if invalidas:
+        raise ValidationError(
+            {"expand": f"No se puede expandir: {', '.join(invalidas)}. "
+                       f"Opciones: {', '.join(relaciones) or 'ninguna'}."}
+        )
+    if "fields" in params:
+        campos = _nombres(params["fields"])
+        desconocidos = [nombre for nombre in campos if nombre not in disponibles]
+        if desconocidos:
+            raise ValidationError(
+                {"fields": f"Campos desconocidos: {', '.join(desconocidos)}. "
+                           f"Disponibles: {', '.join(disponibles)}."}
+            )
+    else:
+        campos = [nombre for nombre in disponibles if nombre not in relaciones]
+    return list(dict.fromkeys(["id", *campos, *expandir]))
+
+
+def recortar_campos(datos, campos):
+    """Detalle o resumen guardado (archivo frío) con solo los campos pedidos."""
+    if campos is None:
+        return datos
+    return {clave: valor for clave, valor in datos.items() if clave in campos}
+
+
+# Campos que toda respuesta mínima incluye, además de los que cambiaron.
+CAMPOS_RESPUESTA_MINIMA = ("id", "numero_nota", "ultima_modificacion")
+
+
+def pide_respuesta_minima(request):
+    """
+    'Prefer: return=minimal' (RFC 7240) o ?respuesta=minima en create, update y
+    cambiar_estado: responder sin el detalle completo (ver respuesta_minima()).
+    """
+    if request.query_params.get("respuesta") == "minima":
+        return True
+    for preferencia in request.headers.get("Prefer", "").split(","):
+        if preferencia.split(";")[0].replace(" ", "").lower() == "return=minimal":
+            return True
+    return False
+
+
+def respuesta_minima(nota, cambiados, registros, codigo=status.HTTP_200_OK, headers=None):
+    """
+    Respuesta de escritura con Prefer: return=minimal: CAMPOS_RESPUESTA_MINIMA,
+    los campos que cambiaron (los de escritura 'x_id' se devuelven como 'x') y
+    los registros de historial recién creados en `historial_nuevo`. Se serializa
+    la instancia en memoria: no se consultan historial ni adjuntos, así el costo
+    no crece con el historial de la nota.
+    """
+    legibles = _campos_legibles(NotaDetalleSerializer)
+    campos = [*CAMPOS_RESPUESTA_MINIMA]
+    for nombre in cambiados:
+        if nombre not in legibles:
+            nombre = nombre.removesuffix("_id")
+        if nombre in legibles and nombre not in NotaDetalleSerializer.RELACIONES:
+            campos.append(nombre)
+    if "estado" in campos or "fecha_limite" in campos:
+        campos.append("atrasada")
+    datos = NotaDetalleSerializer(nota, campos=campos).data
+    datos["historial_nuevo"] = HistorialNotaSerializer(registros, many=True).data
+    response = Response(datos, status=codigo, headers=headers)
+    response["Preference-Applied"] = "return=minimal"
+    return response
+
+
+def consultas_resumen(usuario):
+    """
+    Consultas del resumen del tablero (se evalúan en la vista sync o async):
+    - visibles + contadores: un único aggregate con COUNT ... FILTER por estado.
+    - ultimas: 5 notas visibles más recientes.
+    - pendientes: 5 notas pendientes más recientes del usuario.
+    ultimas y pendientes son filas de valores_lista_notas() (ver filas_lista_notas()).
+    Returns: (visibles, contadores, ultimas, pendientes)
+    """
+    visibles = Nota.objects.all()
+    if not usuario.puede_ver_todas_las_notas():
+        visibles = visibles.filter(Q(responsable=usuario) | Q(creado_por=usuario))
+    hoy = timezone.now().date()
+    inicio_mes = timezone.make_aware(
+        datetime.combine(timezone.localdate().replace(day=1), time.min)
+    )
+    contadores = {
+        "ingresadas": Count("id", filter=Q(estado=EstadoChoices.INGRESADA)),
+        "sin_asignar": Count(
+            "id", filter=Q(estado=EstadoChoices.INGRESADA, responsable__isnull=True)
+        ),
+        "en_proceso": Count("id", filter=Q(estado=EstadoChoices.EN_PROCESO)),
+        "en_espera": Count("id", filter=Q(estado=EstadoChoices.EN_ESPERA)),
+        "atrasadas": Count(
+            "id",
+            filter=Q(fecha_limite__lt=hoy)
+            & ~Q(estado__in=[EstadoChoices.ARCHIVADA, EstadoChoices.ANULADA]),
+        ),
+        "resueltas_mes": Count(
+            "id",
+            filter=Q(
+                estado__in=[EstadoChoices.RESUELTA, EstadoChoices.ARCHIVADA],
+                fecha_ingreso__gte=inicio_mes,
+            ),
+        ),
+        "mis_asignadas": Count(
+            "id", filter=Q(responsable=usuario, estado=EstadoChoices.ASIGNADA)
+        ),
+        "mis_en_proceso": Count(
+            "id", filter=Q(responsable=usuario, estado=EstadoChoices.EN_PROCESO)
+        ),
+        "mis_en_espera": Count(
+            "id", filter=Q(responsable=usuario, estado=EstadoChoices.EN_ESPERA)
+        ),
+    }
+    ultimas = valores_lista_notas(visibles.order_by("-fecha_ingreso"))[:5]
+    pendientes = valores_lista_notas(
+        Nota.objects.filter(
+            responsable=usuario,
+            estado__in=[EstadoChoices.ASIGNADA, EstadoChoices.EN_PROCESO, EstadoChoices.EN_ESPERA],
+        ).order_by("-fecha_ingreso")
+    )[:5]
+    return visibles, contadores, ultimas, pendientes
 
 
 class NotaViewSet(viewsets.ModelViewSet):
@@ -42,13 +240,18 @@ class NotaViewSet(viewsets.ModelViewSet):
     ViewSet para gestionar notas.
 
     Acciones disponibles:
-    - list: Lista todas las notas con filtros
+    - list: Lista todas las notas con filtros (?incluir_archivo=true suma el archivo frío)
     - create: Crea una nueva nota
     - retrieve: Obtiene el detalle de una nota
     - update/partial_update: Actualiza una nota
     - cambiar_estado: Cambia el estado de una nota (acción custom)
+    - cambiar_estado_masivo: Cambia el estado de varias notas (acción custom)
     - pendientes: Lista notas pendientes del usuario actual (acción custom)
     - atrasadas: Lista notas atrasadas (acción custom)
+    - resumen: Contadores del tablero (acción custom)
+
+    Con LECTURAS_ASYNC (ASGI) los GET de list, retrieve, pendientes y resumen los
+    atiende notas/vistas_async.py; esta clase sigue resolviendo el resto.
     """
 
     serializer_class = NotaCreateSerializer
@@ -65,7 +268,9 @@ class NotaViewSet(viewsets.ModelViewSet):
             return [EstaAutenticado(), EsDirectorJefeOAdmin()]
         if self.action == "cambiar_estado":
             return [EstaAutenticado()]
-        if self.action in ("pendientes", "atrasadas"):
+        if self.action == "cambiar_estado_masivo":
+            return [EstaAutenticado(), EsDirectorJefeOAdmin()]
+        if self.action in ("pendientes", "atrasadas", "resumen"):
             return [EstaAutenticado()]
         return [EstaAutenticado()]
 
@@ -126,6 +331,91 @@ class NotaViewSet(viewsets.ModelViewSet):
     filter_backends = [SearchFilter]
     search_fields = ["numero_nota", "tema", "tarea_asignada", "remitente"]
 
+    def get_queryset_archivo(self):
+        """
+        Notas del archivo frío visibles para el usuario, con los mismos filtros
+        que get_queryset() que aplican a notas ARCHIVADAS.
+        """
+        user = self.request.user
+        params = self.request.query_params
+        queryset = NotaArchivada.objects.all()
+        if (
+            user.is_authenticated
+            and hasattr(user, "puede_ver_todas_las_notas")
+            and not user.puede_ver_todas_las_notas()
+        ):
+            queryset = queryset.filter(Q(responsable=user) | Q(creado_por=user))
+
+        # En el archivo solo hay notas ARCHIVADAS, que nunca están atrasadas
+        estado = params.get("estado", None)
+        atrasadas = params.get("atrasadas", "")
+        if (estado and estado != EstadoChoices.ARCHIVADA) or atrasadas.lower() == "true":
+            return queryset.none()
+
+        responsable_id = params.get("responsable", None)
+        if responsable_id:
+            queryset = queryset.filter(responsable_id=responsable_id)
+        prioridad = params.get("prioridad", None)
+        if prioridad:
+            queryset = queryset.filter(prioridad=prioridad)
+        return SearchFilter().filter_queryset(self.request, queryset, self)
+
+    @lectura_en_replica
+    def list(self, request, *args, **kwargs):
+        """
+        Lista las notas con filtros (lee de la réplica si hay, ver config/routers.py).
+        Las filas se arman con valores_lista_notas(): mismo formato que
+        NotaListSerializer sin instanciar Nota ni Agente por fila.
+        ?fields=id,tema,estado devuelve (y lee de la base) solo esos campos.
+        Con ?incluir_archivo=true también incluye las notas del archivo frío,
+        ordenadas junto con las activas por fecha_ingreso.
+        """
+        campos = campos_pedidos(request.query_params, NotaListSerializer)
+        if request.query_params.get("incluir_archivo", "").lower() != "true":
+            filas = valores_lista_notas(self.filter_queryset(self.get_queryset()), campos)
+            pagina = self.paginate_queryset(filas)
+            if pagina is not None:
+                return self.get_paginated_response(filas_lista_notas(pagina, campos))
+            return Response(filas_lista_notas(filas, campos))
+
+        activas = self.filter_queryset(self.get_queryset())
+        claves = (
+            activas.order_by()
+            .values("id", "fecha_ingreso")
+            .annotate(en_archivo=Value(False))
+            .union(
+                self.get_queryset_archivo()
+                .order_by()
+                .values("id", "fecha_ingreso")
+                .annotate(en_archivo=Value(True)),
+                all=True,
+            )
+            .order_by("-fecha_ingreso", "-id")
+        )
+        pagina = self.paginate_queryset(claves)
+        filas = pagina if pagina is not None else list(claves)
+
+        ids_activas = [f["id"] for f in filas if not f["en_archivo"]]
+        ids_archivo = [f["id"] for f in filas if f["en_archivo"]]
+        serializadas = {
+            item["id"]: item
+            for item in filas_lista_notas(
+                valores_lista_notas(activas.filter(pk__in=ids_activas), campos), campos
+            )
+        }
+        resumenes = dict(
+            NotaArchivada.objects.filter(pk__in=ids_archivo).values_list("id", "resumen")
+        )
+        data = [
+            {**recortar_campos(resumenes[f["id"]], campos), "en_archivo": True}
+            if f["en_archivo"]
+            else {**serializadas[f["id"]], "en_archivo": False}
+            for f in filas
+        ]
+        if pagina is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
     @transaction.atomic
     def create(self, request, *args, **kwargs):
         """
@@ -133,31 +423,43 @@ class NotaViewSet(viewsets.ModelViewSet):
         No se modifica request.data; el serializer recibe el payload tal cual.
         numero_nota se genera en Nota.save() si no tiene número formal.
         Estado inicial INGRESADA; se crea registro en historial.
+        Con Prefer: return=minimal responde solo los campos enviados y el
+        historial nuevo (ver respuesta_minima()).
         """
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         nota = serializer.save()
 
+        registros = []
         if request.user.is_authenticated:
-            crear_registro_historial(
-                nota=nota,
-                usuario=request.user,
-                tipo_evento=TipoEventoChoices.CREACION,
-                estado_nuevo=EstadoChoices.INGRESADA,
-                descripcion_cambio="Nota creada en el sistema",
-            )
-            if nota.estado == EstadoChoices.ASIGNADA:
-                crear_registro_historial(
+            with HistorialBuffer():
+                registros.append(crear_registro_historial(
                     nota=nota,
                     usuario=request.user,
-                    tipo_evento=TipoEventoChoices.CAMBIO_ESTADO,
-                    estado_anterior=EstadoChoices.INGRESADA,
-                    estado_nuevo=EstadoChoices.ASIGNADA,
-                    responsable_nuevo=nota.responsable,
-                    descripcion_cambio="Nota asignada al momento de la creación",
-                )
+                    tipo_evento=TipoEventoChoices.CREACION,
+                    estado_nuevo=EstadoChoices.INGRESADA,
+                    descripcion_cambio="Nota creada en el sistema",
+                ))
+                if nota.estado == EstadoChoices.ASIGNADA:
+                    registros.append(crear_registro_historial(
+                        nota=nota,
+                        usuario=request.user,
+                        tipo_evento=TipoEventoChoices.CAMBIO_ESTADO,
+                        estado_anterior=EstadoChoices.INGRESADA,
+                        estado_nuevo=EstadoChoices.ASIGNADA,
+                        responsable_nuevo=nota.responsable,
+                        descripcion_cambio="Nota asignada al momento de la creación",
+                    ))
 
         headers = self.get_success_headers(serializer.data)
+        if pide_respuesta_minima(request):
+            return respuesta_minima(
+                nota,
+                ["estado", *serializer.validated_data],
+                registros,
+                codigo=status.HTTP_201_CREATED,
+                headers=headers,
+            )
         return Response(
             NotaDetalleSerializer(nota).data,
             status=status.HTTP_201_CREATED,
@@ -167,15 +469,28 @@ class NotaViewSet(viewsets.ModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         """
         Retorna el detalle de una nota incluyendo historial y adjuntos.
+        ?fields=id,estado,responsable devuelve solo esos campos y ?expand=historial
+        agrega solo esa relación: las relaciones no pedidas no se consultan.
+        Si la nota fue movida al archivo frío, responde con el detalle archivado.
         """
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
+        campos = campos_pedidos(request.query_params, NotaDetalleSerializer)
+        try:
+            instance = self.get_object()
+        except Http404:
+            lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            archivada = self.get_queryset_archivo().filter(pk=lookup).first()
+            if archivada is None:
+                raise
+            return Response({**recortar_campos(archivada.detalle, campos), "en_archivo": True})
+        serializer = self.get_serializer(instance, campos=campos)
         return Response(serializer.data)
 
     @transaction.atomic
     def update(self, request, *args, **kwargs):
         """
         Actualiza una nota y registra los cambios en el historial.
+        Con Prefer: return=minimal responde solo los campos cuyo valor cambió y
+        el registro de historial nuevo (ver respuesta_minima()).
         """
         partial = kwargs.pop("partial", False)
         instance = self.get_object()
@@ -216,13 +531,21 @@ class NotaViewSet(viewsets.ModelViewSet):
                     "nuevo": str(responsable_nuevo),
                 }
 
+        # Valores previos de los campos enviados, para la respuesta mínima
+        anteriores = {
+            campo: getattr(instance, campo, None) for campo in serializer.validated_data
+        }
+
         # Guardar cambios
         self.perform_update(serializer)
 
-        # Refrescar instancia para obtener valores actualizados
-        instance.refresh_from_db()
+        minima = pide_respuesta_minima(request)
+        if not minima:
+            # Refrescar instancia para obtener valores actualizados
+            instance.refresh_from_db()
 
         # Crear registro en historial si hay cambios
+        registros = []
         if campos_modificados and request.user.is_authenticated:
             tipo_evento = TipoEventoChoices.ACTUALIZACION
             if "estado" in campos_modificados:
@@ -233,7 +556,7 @@ class NotaViewSet(viewsets.ModelViewSet):
                 else:
                     tipo_evento = TipoEventoChoices.ASIGNACION
 
-            crear_registro_historial(
+            registros.append(crear_registro_historial(
                 nota=instance,
                 usuario=request.user,
                 tipo_evento=tipo_evento,
@@ -255,8 +578,14 @@ class NotaViewSet(viewsets.ModelViewSet):
                 ),
                 descripcion_cambio=f'Actualización de campos: {", ".join(campos_modificados.keys())}',
                 campos_modificados=campos_modificados,
-            )
-
+            ))
+
+        if minima:
+            cambiados = [
+                campo for campo, valor in anteriores.items()
+                if getattr(instance, campo, None) != valor
+            ]
+            return respuesta_minima(instance, [*cambiados, *campos_modificados], registros)
         return Response(NotaDetalleSerializer(instance).data)
 
     @transaction.atomic
@@ -265,6 +594,8 @@ class NotaViewSet(viewsets.ModelViewSet):
         """
         Acción custom para cambiar el estado de una nota.
         Valida las transiciones permitidas y crea registro en historial.
+        Con Prefer: return=minimal responde estado, responsable (si cambió) y el
+        registro de historial nuevo (ver respuesta_minima()).
         """
         nota = self.get_object()
         serializer = NotaCambioEstadoSerializer(data=request.data)
@@ -324,61 +655,19 @@ class NotaViewSet(viewsets.ModelViewSet):
 
         nota.save()
 
-        # Determinar tipo de evento
-        tipo_evento = TipoEventoChoices.CAMBIO_ESTADO
-        if estado_nuevo == EstadoChoices.ARCHIVADA:
-            tipo_evento = TipoEventoChoices.ARCHIVADO
-        elif responsable_nuevo_id and responsable_anterior:
-            tipo_evento = TipoEventoChoices.REASIGNACION
-        elif responsable_nuevo_id and not responsable_anterior:
-            tipo_evento = TipoEventoChoices.ASIGNACION
-
-        # Construir descripción según tipo de evento
-        if tipo_evento == TipoEventoChoices.REASIGNACION:
-            nombre_anterior = (
-                responsable_anterior.nombre_completo
-                if responsable_anterior
-                else "Sin asignar"
-            )
-            nombre_nuevo = (
-                responsable_nuevo.nombre_completo
-                if responsable_nuevo
-                else "Sin asignar"
-            )
-            descripcion_cambio = f"Reasignada de {nombre_anterior} a {nombre_nuevo}"
-        elif tipo_evento == TipoEventoChoices.ASIGNACION:
-            nombre_nuevo = (
-                responsable_nuevo.nombre_completo
-                if responsable_nuevo
-                else "Sin asignar"
-            )
-            descripcion_cambio = f"Asignada a {nombre_nuevo}"
-        elif tipo_evento == TipoEventoChoices.ARCHIVADO:
-            descripcion_cambio = motivo if motivo else "Nota archivada"
-        else:
-            if estado_nuevo == EstadoChoices.EN_ESPERA:
-                descripcion_cambio = (
-                    f"Puesta en espera: {motivo}" if motivo else "Puesta en espera"
-                )
-            elif (
-                estado_nuevo == EstadoChoices.EN_PROCESO
-                and estado_actual == EstadoChoices.EN_ESPERA
-            ):
-                descripcion_cambio = "Retomada"
-            elif estado_nuevo == EstadoChoices.EN_PROCESO:
-                descripcion_cambio = "Proceso iniciado"
-            elif estado_nuevo == EstadoChoices.RESUELTA:
-                descripcion_cambio = "Marcada como resuelta"
-            else:
-                descripcion_cambio = (
-                    motivo
-                    if motivo
-                    else f"Cambio de estado de {estado_actual} a {estado_nuevo}"
-                )
+        # Determinar tipo de evento y descripción
+        tipo_evento, descripcion_cambio = describir_cambio_estado(
+            estado_actual,
+            estado_nuevo,
+            motivo=motivo,
+            responsable_anterior=responsable_anterior,
+            responsable_nuevo=responsable_nuevo,
+        )
 
         # Crear registro en historial
+        registros = []
         if request.user.is_authenticated:
-            crear_registro_historial(
+            registros.append(crear_registro_historial(
                 nota=nota,
                 usuario=request.user,
                 tipo_evento=tipo_evento,
@@ -389,27 +678,159 @@ class NotaViewSet(viewsets.ModelViewSet):
                     responsable_nuevo if responsable_nuevo_id else responsable_anterior
                 ),
                 descripcion_cambio=descripcion_cambio,
-            )
+            ))
+
+        # El mail se encola en la misma transacción; lo envía procesar_jobs.
+        if estado_nuevo == EstadoChoices.RESUELTA:
+            notificar_nota(nota, "RESUELTA", usuario=request.user)
 
+        if pide_respuesta_minima(request):
+            cambiados = ["estado", "responsable"] if responsable_nuevo_id else ["estado"]
+            return respuesta_minima(nota, cambiados, registros)
         return Response(NotaDetalleSerializer(nota).data, status=status.HTTP_200_OK)
 
+    @transaction.atomic
+    @action(detail=False, methods=["post"])
+    def cambiar_estado_masivo(self, request):
+        """
+        Cambia el estado de varias notas en una sola operación.
+        Cada nota se valida contra las transiciones permitidas; las válidas se
+        actualizan con bulk_update y su historial se inserta con bulk_create.
+        Devuelve un resultado compacto por id.
+        """
+        serializer = NotaCambioEstadoMasivoSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        ids = list(dict.fromkeys(serializer.validated_data["ids"]))
+        estado_nuevo = serializer.validated_data["estado_nuevo"]
+        motivo = serializer.validated_data.get("motivo", "")
+        responsable_nuevo_id = serializer.validated_data.get("responsable_nuevo", None)
+
+        responsable_nuevo = None
+        if responsable_nuevo_id:
+            from django.contrib.auth import get_user_model
+
+            responsable_nuevo = get_object_or_404(
+                get_user_model(), id=responsable_nuevo_id
+            )
+
+        notas = {
+            nota.pk: nota
+            for nota in self.get_queryset()
+            .filter(pk__in=ids)
+            .select_for_update(of=("self",))
+        }
+
+        ahora = timezone.now()
+        actualizadas = []
+        resultados = []
+        # El historial de todas las notas se inserta con un único bulk_create
+        with HistorialBuffer():
+            for nota_id in ids:
+                nota = notas.get(nota_id)
+                if nota is None:
+                    resultados.append(
+                        {"id": nota_id, "ok": False, "error": "Nota no encontrada"}
+                    )
+                    continue
+
+                estado_actual = nota.estado
+                if not es_transicion_permitida(estado_actual, estado_nuevo):
+                    resultados.append(
+                        {
+                            "id": nota_id,
+                            "ok": False,
+                            "error": f"No se puede cambiar de {estado_actual} a {estado_nuevo}",
+                        }
+                    )
+                    continue
+
+                responsable_anterior = nota.responsable
+                tipo_evento, descripcion_cambio = describir_cambio_estado(
+                    estado_actual,
+                    estado_nuevo,
+                    motivo=motivo,
+                    responsable_anterior=responsable_anterior,
+                    responsable_nuevo=responsable_nuevo,
+                )
+
+                nota.estado = estado_nuevo
+                if responsable_nuevo:
+                    nota.responsable = responsable_nuevo
+                nota.ultima_modificacion = ahora
+                actualizadas.append(nota)
+
+                if request.user.is_authenticated:
+                    crear_registro_historial(
+                        nota=nota,
+                        usuario=request.user,
+                        tipo_evento=tipo_evento,
+                        estado_anterior=estado_actual,
+                        estado_nuevo=estado_nuevo,
+                        responsable_anterior=responsable_anterior,
+                        responsable_nuevo=responsable_nuevo or responsable_anterior,
+                        descripcion_cambio=descripcion_cambio,
+                    )
+                resultados.append(
+                    {
+                        "id": nota_id,
+                        "ok": True,
+                        "estado_anterior": estado_actual,
+                        "estado": estado_nuevo,
+                    }
+                )
+
+            if actualizadas:
+                Nota.objects.bulk_update(
+                    actualizadas, ["estado", "responsable", "ultima_modificacion"]
+                )
+
+        if estado_nuevo == EstadoChoices.RESUELTA:
+            for nota in actualizadas:
+                notificar_nota(nota, "RESUELTA", usuario=request.user)
+
+        return Response(
+            {"actualizadas": len(actualizadas), "resultados": resultados},
+            status=status.HTTP_200_OK,
+        )
+
     @action(detail=False, methods=["get"])
     def pendientes(self, request):
         """
         Lista las notas asignadas al usuario actual con estado:
         ASIGNADA, EN_PROCESO, EN_ESPERA
         """
-        queryset = Nota.objects.filter(
-            responsable=request.user,
-            estado__in=[
-                EstadoChoices.ASIGNADA,
-                EstadoChoices.EN_PROCESO,
-                EstadoChoices.EN_ESPERA,
-            ],
-        ).order_by("-fecha_ingreso")
+        return Response(filas_lista_notas(valores_lista_notas(self.get_queryset_pendientes())))
+
+    def get_queryset_pendientes(self):
+        """Notas ASIGNADA, EN_PROCESO o EN_ESPERA del usuario actual."""
+        return (
+            Nota.objects.filter(
+                responsable=self.request.user,
+                estado__in=[
+                    EstadoChoices.ASIGNADA,
+                    EstadoChoices.EN_PROCESO,
+                    EstadoChoices.EN_ESPERA,
+                ],
+            )
+            .select_related("responsable")
+            .order_by("-fecha_ingreso")
+        )
 
-        serializer = NotaListSerializer(queryset, many=True)
-        return Response(serializer.data)
+    @action(detail=False, methods=["get"])
+    def resumen(self, request):
+        """
+        Contadores del tablero y las últimas notas (ingresadas y pendientes propias)
+        en una sola petición. Ver consultas_resumen().
+        """
+        visibles, contadores, ultimas, pendientes = consultas_resumen(request.user)
+        return Response(
+            {
+                **visibles.aggregate(**contadores),
+                "ultimas": filas_lista_notas(ultimas),
+                "pendientes": filas_lista_notas(pendientes),
+            }
+        )
 
     @action(detail=False, methods=["get"])
     def atrasadas(self, request):
@@ -430,14 +851,15 @@ class NotaViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(Q(responsable=user) | Q(creado_por=user))
         queryset = queryset.order_by("fecha_limite")
 
-        serializer = NotaListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(filas_lista_notas(valores_lista_notas(queryset)))
 
+    @transaction.atomic
     @action(detail=True, methods=["post"], url_path="adjuntos")
     def adjuntos(self, request, pk=None):
         """
         Crea un adjunto para la nota (POST multipart con archivo).
         URL: POST /api/notas/{id}/adjuntos/
+        La referencia al contenido y el Adjunto se confirman juntos.
         """
         nota = self.get_object()
         data = request.data.copy()
@@ -449,6 +871,81 @@ class NotaViewSet(viewsets.ModelViewSet):
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=True, methods=["post"], url_path="adjuntos/cargas")
+    def iniciar_carga_adjunto(self, request, pk=None):
+        """
+        Inicia la subida por partes de un adjunto grande (ver notas/cargas.py).
+        URL: POST /api/notas/{id}/adjuntos/cargas/
+        Body: {nombre_archivo, tamaño_bytes, tipo_mime?, tipo_adjunto?, sha256?}
+        """
+        nota = self.get_object()
+        serializer = CargaAdjuntoSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            carga = iniciar_carga(nota, request.user, **serializer.validated_data)
+        except ErrorCarga as e:
+            return _respuesta_error_carga(e)
+        return Response(CargaAdjuntoSerializer(carga).data, status=status.HTTP_201_CREATED)
+
+
+def _respuesta_error_carga(error):
+    data = {"error": str(error)}
+    if error.recibidos is not None:
+        data["recibidos"] = error.recibidos
+    return Response(data, status=error.status)
+
+
+class CargaAdjuntoViewSet(
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Subidas por partes en curso del usuario actual.
+    - retrieve: estado de la subida (`recibidos` = offset para reanudar)
+    - update (PUT): recibe una parte cruda con Content-Range
+    - completar: verifica el SHA-256 y crea el Adjunto (acción custom)
+    - destroy: cancela la subida y borra el archivo parcial
+    """
+
+    serializer_class = CargaAdjuntoSerializer
+    permission_classes = [EstaAutenticado, PuedeVerNotas]
+
+    def get_queryset(self):
+        return CargaAdjunto.objects.filter(usuario=self.request.user)
+
+    def update(self, request, *args, **kwargs):
+        """
+        URL: PUT /api/cargas-adjuntos/{id}/
+        Headers: Content-Range: bytes {inicio}-{fin}/{total}; opcional
+        X-Contenido-Sha256 con el hash de la parte.
+        El cuerpo se lee como flujo: no pasa por los parsers de DRF.
+        """
+        carga = self.get_object()
+        try:
+            escribir_parte(
+                carga,
+                request.stream,
+                request.headers.get("Content-Range"),
+                request.headers.get("X-Contenido-Sha256", ""),
+            )
+        except ErrorCarga as e:
+            return _respuesta_error_carga(e)
+        return Response(self.get_serializer(carga).data)
+
+    @action(detail=True, methods=["post"])
+    def completar(self, request, pk=None):
+        """URL: POST /api/cargas-adjuntos/{id}/completar/"""
+        carga = self.get_object()
+        try:
+            adjunto = completar_carga(carga, request.user)
+        except ErrorCarga as e:
+            return _respuesta_error_carga(e)
+        return Response(AdjuntoSerializer(adjunto).data, status=status.HTTP_201_CREATED)
+
+    def perform_destroy(self, instance):
+        cancelar_carga(instance)
+
 
 class HistorialNotaViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -461,7 +958,10 @@ class HistorialNotaViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [EstaAutenticado, PuedeVerNotas]
 
     def get_queryset(self):
-        """Filtra por nota y por visibilidad (empleado solo ve historial de sus notas)."""
+        """
+        Filtra por nota y por visibilidad (empleado solo ve historial de sus notas).
+        Filtros: nota, desde, hasta (fechas YYYY-MM-DD)
+        """
         user = self.request.user
         queryset = HistorialNota.objects.select_related(
             "nota", "usuario", "responsable_anterior", "responsable_nuevo"
@@ -477,6 +977,7 @@ class HistorialNotaViewSet(viewsets.ReadOnlyModelViewSet):
         nota_id = self.request.query_params.get("nota", None)
         if nota_id:
             queryset = queryset.filter(nota_id=nota_id)
+        queryset = _filtrar_rango_fecha_hora(queryset, self.request.query_params)
         return queryset.order_by("-fecha_hora")
 
 
@@ -484,6 +985,8 @@ class AdjuntoViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar adjuntos de notas.
     Solo se ven adjuntos de notas que el usuario puede ver.
+    - descargar: entrega el archivo con control de permisos (acción custom)
+    - miniatura / vista_previa: PNG de la primera página (acciones custom)
     """
 
     queryset = Adjunto.objects.all()
@@ -493,7 +996,7 @@ class AdjuntoViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Filtra por nota y por visibilidad (empleado solo ve adjuntos de sus notas)."""
         user = self.request.user
-        queryset = Adjunto.objects.select_related("nota", "subido_por").all()
+        queryset = Adjunto.objects.select_related("nota", "subido_por", "blob").all()
         if (
             user.is_authenticated
             and hasattr(user, "puede_ver_todas_las_notas")
@@ -507,15 +1010,69 @@ class AdjuntoViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(nota_id=nota_id)
         return queryset.order_by("-fecha_subida")
 
+    @transaction.atomic
     def perform_create(self, serializer):
         """
         Asigna el usuario actual al adjunto al crearlo.
+        La referencia al contenido y el Adjunto se confirman juntos.
         """
         # TODO: Implementar subida de archivos cuando se configure MEDIA_ROOT
         serializer.save(
             subido_por=self.request.user if self.request.user.is_authenticated else None
         )
 
+    @action(detail=True, methods=["get"])
+    def descargar(self, request, pk=None):
+        """
+        Entrega el archivo del adjunto verificando que el usuario pueda ver la nota.
+        URL: GET /api/adjuntos/{id}/descargar/ (?descargar=true fuerza la descarga)
+        Soporta Range, ETag / If-None-Match; con Nginx delega la transferencia
+        vía X-Accel-Redirect.
+        """
+        adjunto = self.get_object()
+        como_descarga = request.query_params.get("descargar", "").lower() == "true"
+        respuesta = respuesta_adjunto(request, adjunto, como_descarga=como_descarga)
+        if respuesta is None:
+            return Response(
+                {"error": "Archivo no encontrado"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return respuesta
+
+    @action(detail=True, methods=["get"])
+    def miniatura(self, request, pk=None):
+        """
+        Miniatura PNG de la primera página (generada en segundo plano).
+        URL: GET /api/adjuntos/{id}/miniatura/
+        """
+        return self._respuesta_miniatura(request, vista_previa=False)
+
+    @action(detail=True, methods=["get"], url_path="vista-previa")
+    def vista_previa(self, request, pk=None):
+        """
+        Vista previa PNG en baja resolución de la primera página.
+        URL: GET /api/adjuntos/{id}/vista-previa/
+        """
+        return self._respuesta_miniatura(request, vista_previa=True)
+
+    def _respuesta_miniatura(self, request, vista_previa):
+        respuesta = respuesta_miniatura(request, self.get_object(), vista_previa=vista_previa)
+        if respuesta is None:
+            return Response(
+                {"error": "Miniatura no disponible"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return respuesta
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """
+        Elimina el adjunto y resta una referencia a su contenido.
+        El archivo en disco se borra con limpiar_blobs cuando queda sin referencias.
+        """
+        blob = instance.blob
+        instance.delete()
+        if blob is not None:
+            liberar_blob(blob)
+
 
 class SectorViewSet(viewsets.ModelViewSet):
     """
@@ -551,6 +1108,7 @@ class SectorViewSet(viewsets.ModelViewSet):
 
 @api_view(["GET"])
 @permission_classes([EstaAutenticado, IsAdministrador])
+@lectura_en_replica
 def reporte_notas_por_sector(request):
     """
     GET /api/reportes/notas-por-sector/
@@ -577,6 +1135,7 @@ def reporte_notas_por_sector(request):
 
 @api_view(["GET"])
 @permission_classes([EstaAutenticado, IsAdministrador])
+@lectura_en_replica
 def reporte_notas_por_operador(request):
     """
     GET /api/reportes/notas-por-operador/
@@ -607,27 +1166,154 @@ def reporte_notas_por_operador(request):
     return Response(resultado)
 
 
+class AuditoriaPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) para la auditoría: cada página continúa desde
+    el último fecha_hora visto, sin OFFSET, así el costo no crece con la antigüedad.
+    """
+
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = ("-fecha_hora", "-id")
+
+
+def _id_param(param, valor):
+    """Id positivo de un query param (?usuario=, ?nota=, ?sector=)."""
+    try:
+        numero = int(valor)
+    except ValueError:
+        numero = 0
+    if not 0 < numero < 2**63:
+        raise ValidationError({param: "Id inválido, debe ser un número entero positivo."})
+    return numero
+
+
+def _auditoria_queryset(params):
+    """
+    Registros de HistorialNota para auditoría como diccionarios (sin instanciar modelos).
+    Filtros: usuario, tipo_evento, nota, sector (sector de origen de la nota),
+    desde, hasta (fechas YYYY-MM-DD). Cada filtro tiene índice que lo respalda.
+    """
+    queryset = HistorialNota.objects.all()
+    for param, campo in (
+        ("usuario", "usuario_id"),
+        ("nota", "nota_id"),
+        ("sector", "nota__sector_origen_id"),
+    ):
+        valor = params.get(param)
+        if valor:
+            queryset = queryset.filter(**{campo: _id_param(param, valor)})
+    tipo_evento = params.get("tipo_evento")
+    if tipo_evento:
+        queryset = queryset.filter(tipo_evento=tipo_evento)
+    queryset = _filtrar_rango_fecha_hora(queryset, params)
+    return queryset.values(
+        "id",
+        "fecha_hora",
+        "nota_id",
+        "usuario_id",
+        "tipo_evento",
+        "descripcion_cambio",
+        nota_numero=F("nota__numero_nota"),
+        usuario_nombre=Concat(
+            "usuario__apellido", Value(", "), "usuario__nombres", output_field=CharField()
+        ),
+    )
+
+
+def _fila_auditoria(r):
+    return {
+        "id": r["id"],
+        "fecha_hora": r["fecha_hora"].isoformat() if r["fecha_hora"] else None,
+        "usuario": r["usuario_nombre"] if r["usuario_id"] else "—",
+        "nota": r["nota_numero"] or "—",
+        "nota_id": r["nota_id"],
+        "tipo_evento": r["tipo_evento"] or "",
+        "descripcion_cambio": r["descripcion_cambio"] or "",
+    }
+
+
 @api_view(["GET"])
 @permission_classes([EstaAutenticado, IsAdministrador])
+@lectura_en_replica
 def auditoria_list(request):
     """
     GET /api/auditoria/
-    Devuelve los últimos 100 registros de HistorialNota.
+    Devuelve registros de HistorialNota paginados por cursor (100 por página,
+    ?page_size= hasta 500), del más reciente al más antiguo.
+    Filtros: usuario, tipo_evento, nota, sector, desde, hasta (fechas YYYY-MM-DD)
     """
-    registros = HistorialNota.objects.select_related("nota", "usuario").order_by(
-        "-fecha_hora"
-    )[:100]
-    resultado = []
-    for r in registros:
-        resultado.append(
-            {
-                "id": r.id,
-                "fecha_hora": r.fecha_hora.isoformat() if r.fecha_hora else None,
-                "usuario": r.usuario.nombre_completo if r.usuario else "—",
-                "nota": r.nota.numero_nota if r.nota else "—",
-                "nota_id": r.nota_id if r.nota_id else None,
-                "tipo_evento": r.tipo_evento or "",
-                "descripcion_cambio": r.descripcion_cambio or "",
-            }
-        )
-    return Response(resultado)
+    paginator = AuditoriaPagination()
+    registros = paginator.paginate_queryset(
+        _auditoria_queryset(request.query_params), request
+    )
+    return paginator.get_paginated_response([_fila_auditoria(r) for r in registros])
+
+
+class _Eco:
+    """Buffer mínimo para csv.writer: devuelve la línea en lugar de acumularla."""
+
+    def write(self, valor):
+        return valor
+
+
+@api_view(["GET"])
+@permission_classes([EstaAutenticado, IsAdministrador])
+def auditoria_exportar(request):
+    """
+    GET /api/auditoria/exportar/
+    Exporta a CSV los registros de auditoría con los mismos filtros que
+    /api/auditoria/. La respuesta se genera en streaming, sin cargar todo en memoria.
+    Lee de la réplica si hay: las filas se consultan al recorrer la respuesta,
+    después de que la vista (y ReplicaMiddleware) ya terminaron, así que el
+    generador fija él mismo la réplica y la cookie de escritura reciente.
+    """
+    registros = _auditoria_queryset(request.query_params).order_by("-fecha_hora", "-id")
+    writer = csv.writer(_Eco())
+    encabezado = ["id", "fecha_hora", "usuario", "nota", "nota_id", "tipo_evento", "descripcion_cambio"]
+
+    escritura_reciente = COOKIE_ESCRITURA in request.COOKIES
+
+    def filas():
+        yield writer.writerow(encabezado)
+        with en_replica(), primaria_forzada(escritura_reciente):
+            for r in registros.iterator(chunk_size=2000):
+                fila = _fila_auditoria(r)
+                if r["fecha_hora"]:
+                    fila["fecha_hora"] = timezone.localtime(r["fecha_hora"]).isoformat()
+                yield writer.writerow([fila[c] for c in encabezado])
+
+    response = StreamingHttpResponse(filas(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = 'attachment; filename="auditoria.csv"'
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([EstaAutenticado, IsAdministrador])
+def perfil_peticion(request, pk):
+    """
+    GET /api/perfiles/{id}/
+    Perfil guardado por PerfiladoMiddleware (link del encabezado X-Perfil):
+    texto del perfilador, consultas SQL y las repetidas (posible N+1).
+    """
+    perfil = get_object_or_404(PerfilPeticion, pk=pk)
+    return Response(
+        {
+            "id": perfil.id,
+            "fecha": perfil.fecha.isoformat(),
+            "metodo": perfil.metodo,
+            "ruta": perfil.ruta,
+            "vista": perfil.vista,
+            "estado": perfil.estado,
+            "duracion_ms": perfil.duracion_ms,
+            "motor": perfil.motor,
+            "perfil": perfil.perfil,
+            "cantidad_consultas": len(perfil.consultas),
+            "consultas_repetidas": [
+                {"veces": veces, "sql": sql} for veces, sql in consultas_repetidas(perfil.consultas)
+            ],
+            "consultas": perfil.consultas,
+        }
+    )
+
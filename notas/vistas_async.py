@@ -0,0 +1,198 @@
+"""
+Versiones async de los GET más consultados (listado y detalle de notas,
+pendientes, resumen del tablero y catálogo de sectores).
+
+Con ASGI (uvicorn) una vista sync ocupa un hilo durante toda la petición; estas
+vistas usan el ORM async y liberan el event loop mientras esperan a la base, así
+un mismo worker atiende muchos clientes lentos a la vez.
+
+No duplican reglas: cada lectura instancia el ViewSet de DRF correspondiente y
+reutiliza su get_queryset(), filtros, permisos, paginación y serializers; solo
+cambia cómo se evalúan las consultas. Los demás métodos (POST, PATCH, ...) y los
+casos poco frecuentes (?incluir_archivo=true, sufijo .json) siguen en el ViewSet.
+
+Se activan con LECTURAS_ASYNC (config/asgi.py lo activa por defecto).
+"""
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Prefetch
+from django.http import Http404
+from django.urls import URLPattern
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from config.routers import en_replica
+
+from .models import Adjunto, HistorialNota
+from .serializers import (
+    NotaDetalleSerializer,
+    NotaListSerializer,
+    SectorSerializer,
+    filas_lista_notas,
+    valores_lista_notas,
+)
+from .views import NotaViewSet, SectorViewSet, campos_pedidos, consultas_resumen, recortar_campos
+
+
+def _instanciar(clase, accion, request, kwargs):
+    vista = clase(action_map={'get': accion}, args=(), kwargs=kwargs, format_kwarg=None)
+    vista.request = vista.initialize_request(request, **kwargs)
+    vista.headers = vista.default_response_headers
+    return vista
+
+
+async def _leer(clase, accion, request, lectura, kwargs):
+    """
+    Ejecuta `lectura(vista)` con el mismo ciclo que APIView.dispatch (autenticación,
+    permisos, manejo de excepciones). `lectura` devuelve Response, o None para
+    delegar en la vista sync.
+    """
+    # El usuario se resuelve acá: DRF lo lee de forma sync desde request.user.
+    request.user = getattr(request, '_cached_user', None) or await request.auser()
+    vista = _instanciar(clase, accion, request, kwargs)
+    try:
+        vista.initial(vista.request)
+        respuesta = await lectura(vista)
+        if respuesta is None:
+            return None
+    except Exception as exc:
+        respuesta = vista.handle_exception(exc)
+    return vista.finalize_response(vista.request, respuesta)
+
+
+async def _paginar(vista, queryset):
+    """Equivalente async de GenericAPIView.paginate_queryset(). Returns: lista o None."""
+    paginador = vista.paginator
+    if paginador is None:
+        return None
+    tamaño = paginador.get_page_size(vista.request)
+    if not tamaño:
+        return None
+    paginas = paginador.django_paginator_class(queryset, tamaño)
+    paginas.count = await queryset.acount()
+    numero = paginador.get_page_number(vista.request, paginas)
+    try:
+        numero = paginas.validate_number(numero)
+    except InvalidPage as exc:
+        raise NotFound(paginador.invalid_page_message.format(page_number=numero, message=str(exc)))
+    inicio = (numero - 1) * tamaño
+    objetos = [objeto async for objeto in queryset[inicio:inicio + tamaño]]
+    paginador.page = Page(objetos, numero, paginas)
+    paginador.request = vista.request
+    return objetos
+
+
+async def _listar(vista, queryset, serializer_class):
+    pagina = await _paginar(vista, queryset)
+    if pagina is not None:
+        return vista.get_paginated_response(serializer_class(pagina, many=True).data)
+    objetos = [objeto async for objeto in queryset]
+    return Response(serializer_class(objetos, many=True).data)
+
+
+async def _lista_notas(vista):
+    if vista.request.query_params.get('incluir_archivo', '').lower() == 'true':
+        return None
+    campos = campos_pedidos(vista.request.query_params, NotaListSerializer)
+    filas = valores_lista_notas(vista.filter_queryset(vista.get_queryset()), campos)
+    with en_replica():
+        pagina = await _paginar(vista, filas)
+        if pagina is not None:
+            return vista.get_paginated_response(filas_lista_notas(pagina, campos))
+        return Response(filas_lista_notas([fila async for fila in filas], campos))
+
+
+PRECARGAS_DETALLE = {
+    'historial': lambda: Prefetch(
+        'historial',
+        queryset=HistorialNota.objects.select_related(
+            'usuario', 'responsable_anterior', 'responsable_nuevo'
+        ).order_by('-fecha_hora'),
+        to_attr='historial_ordenado',
+    ),
+    'adjuntos': lambda: Prefetch(
+        'adjuntos',
+        queryset=Adjunto.objects.select_related('blob', 'subido_por').order_by('-fecha_subida'),
+        to_attr='adjuntos_ordenados',
+    ),
+}
+
+
+async def _detalle_nota(vista):
+    lookup = vista.kwargs[vista.lookup_url_kwarg or vista.lookup_field]
+    campos = campos_pedidos(vista.request.query_params, NotaDetalleSerializer)
+    # Solo se precargan las relaciones que se van a serializar (?fields= / ?expand=).
+    queryset = vista.filter_queryset(vista.get_queryset()).prefetch_related(
+        *(precarga() for nombre, precarga in PRECARGAS_DETALLE.items() if campos is None or nombre in campos)
+    )
+    nota = await queryset.filter(pk=lookup).afirst()
+    if nota is None:
+        archivada = await vista.get_queryset_archivo().filter(pk=lookup).afirst()
+        if archivada is None:
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        return Response({**recortar_campos(archivada.detalle, campos), 'en_archivo': True})
+    vista.check_object_permissions(vista.request, nota)
+    return Response(vista.get_serializer(nota, campos=campos).data)
+
+
+async def _pendientes(vista):
+    filas = valores_lista_notas(vista.get_queryset_pendientes())
+    return Response(filas_lista_notas([fila async for fila in filas]))
+
+
+async def _resumen(vista):
+    visibles, contadores, ultimas, pendientes = consultas_resumen(vista.request.user)
+    return Response(
+        {
+            **await visibles.aaggregate(**contadores),
+            'ultimas': filas_lista_notas([fila async for fila in ultimas]),
+            'pendientes': filas_lista_notas([fila async for fila in pendientes]),
+        }
+    )
+
+
+async def _lista_sectores(vista):
+    return await _listar(vista, vista.filter_queryset(vista.get_queryset()), SectorSerializer)
+
+
+# Nombre de ruta del router -> (ViewSet, acción, lectura async)
+LECTURAS = {
+    'nota-list': (NotaViewSet, 'list', _lista_notas),
+    'nota-detail': (NotaViewSet, 'retrieve', _detalle_nota),
+    'nota-pendientes': (NotaViewSet, 'pendientes', _pendientes),
+    'nota-resumen': (NotaViewSet, 'resumen', _resumen),
+    'sector-list': (SectorViewSet, 'list', _lista_sectores),
+}
+
+
+def con_lectura_async(vista_sync, clase, accion, lectura):
+    """Vista async que atiende los GET con `lectura` y delega el resto en `vista_sync`."""
+    delegar = sync_to_async(vista_sync)
+
+    async def vista(request, *args, **kwargs):
+        if request.method == 'GET' and 'format' not in kwargs:
+            respuesta = await _leer(clase, accion, request, lectura, kwargs)
+            if respuesta is not None:
+                return respuesta
+        return await delegar(request, *args, **kwargs)
+
+    # Igual que APIView.as_view(): DRF hace su propia verificación CSRF.
+    vista.csrf_exempt = True
+    # Para identificar la vista en las métricas (config/metricas.py).
+    vista.cls, vista.actions = clase, vista_sync.actions
+    return vista
+
+
+def con_lecturas_async(urlpatterns):
+    """Reemplaza en las rutas del router las vistas que tienen versión async."""
+    resultado = []
+    for patron in urlpatterns:
+        if isinstance(patron, URLPattern) and patron.name in LECTURAS:
+            patron = URLPattern(
+                patron.pattern,
+                con_lectura_async(patron.callback, *LECTURAS[patron.name]),
+                patron.default_args,
+                patron.name,
+            )
+        resultado.append(patron)
+    return resultado